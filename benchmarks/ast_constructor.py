@@ -0,0 +1,60 @@
+"""
+Micro-benchmark for the constructor of AST node classes.
+
+Compare the code-generated init methods with the generic implementation
+used by classes whose fields cannot be used as argument names.
+
+Each measurement builds a small tree, including its leaf nodes.
+
+Usage:
+    python benchmarks/ast_constructor.py
+"""
+import timeit
+
+from ox.ast.ast_meta import _node_init_method, _sexpr_init_method
+from ox.target.python.expr_ast import Atom, BinOp, GetAttr, Name
+from ox.target.python.operators import BinaryOp
+
+N = 100_000
+
+
+def build_binop():
+    return BinOp(BinaryOp.ADD, Name("x"), Atom(1))
+
+
+def build_getattr():
+    return GetAttr(Name("x"), "attr")
+
+
+def generic_init(cls):
+    meta = cls._meta
+    fn = _sexpr_init_method if meta.has_tag_field else _node_init_method
+    return fn(meta.children_fields, meta.attr_fields, {})
+
+
+def run(name, func):
+    elapsed = min(timeit.repeat(func, number=N, repeat=5))
+    print(f"    {name:<12} {N / elapsed:>12,.0f} trees/s")
+
+
+def main():
+    classes = [BinOp, GetAttr]
+    generated = {cls: cls._init for cls in classes}
+
+    print("generated __init__:")
+    run("BinOp", build_binop)
+    run("GetAttr", build_getattr)
+
+    try:
+        for cls in classes:
+            cls._init = generic_init(cls)
+        print("generic __init__:")
+        run("BinOp", build_binop)
+        run("GetAttr", build_getattr)
+    finally:
+        for cls, init in generated.items():
+            cls._init = init
+
+
+if __name__ == "__main__":
+    main()
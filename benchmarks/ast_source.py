@@ -0,0 +1,68 @@
+"""
+Benchmark source code generation for a large expression tree.
+
+Compare joining the token stream produced by tokens() with the emit() API
+used by source().
+
+Usage:
+    python benchmarks/ast_source.py
+"""
+import io
+import timeit
+
+from ox.ast import flatten_tokens, walk
+from ox.target.python.expr_ast import Atom, BinOp, GetAttr, Name, UnaryOp
+from ox.target.python.operators import UnaryOp as UnaryOpEnum
+
+N = 100_000
+OPS = ["+", "*", "-", "/"]
+
+
+def build_tree(n):
+    """
+    Build a balanced tree of binary operators with approximately n nodes.
+    """
+    items = []
+    for i in range(n * 3 // 8):
+        if i % 3 == 0:
+            items.append(GetAttr(Name(f"x{i}"), "real"))
+        elif i % 3 == 1:
+            items.append(UnaryOp(UnaryOpEnum.NEG, Name(f"y{i}")))
+        else:
+            items.append(Atom(i))
+    while len(items) > 1:
+        pairs = zip(items[::2], items[1::2])
+        new = [BinOp(OPS[i % 4], a, b) for i, (a, b) in enumerate(pairs)]
+        if len(items) % 2:
+            new.append(items[-1])
+        items = new
+    return items[0]
+
+
+def tokens_source(tree):
+    return "".join(flatten_tokens(tree.tokens(tree.print_context())))
+
+
+def stringio_source(tree):
+    buf = io.StringIO()
+    tree.emit(buf)
+    return buf.getvalue()
+
+
+def main():
+    tree = build_tree(N)
+    size = sum(1 for _ in walk(tree))
+    assert tokens_source(tree) == tree.source() == stringio_source(tree)
+
+    print(f"tree with {size} nodes:")
+    for name, func in [
+        ("tokens()", tokens_source),
+        ("emit(list)", lambda t: t.source()),
+        ("emit(StringIO)", stringio_source),
+    ]:
+        elapsed = min(timeit.repeat(lambda: func(tree), number=1, repeat=5))
+        print(f"    {name:<16} {elapsed * 1000:>8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Benchmark the lexer engines of ox.lexer on a large input.
+
+Compare the time to create a lexer and to tokenize a string with the default
+Lark engine and with the standalone regex engine.
+
+Usage:
+    python benchmarks/lexer_engines.py
+"""
+import random
+import timeit
+
+import ox
+
+N = 200_000
+
+
+def rules():
+    return dict(
+        NAME=r"[a-zA-Z_]\w*",
+        IF_2_=r"if",
+        INT={r"\d+": int},
+        FLOAT={r"\d+\.\d+": float},
+        OP=r"[-+*\/=<>]",
+        CTRL=r"[()\[\]{},;:]",
+        NEWLINE=r"\n+",
+        WS=r"[ \t]+",
+        ignore="WS",
+    )
+
+
+def make_source(n):
+    """
+    Random source with approximately n tokens.
+    """
+    rnd = random.Random(0)
+    words = ["if", "x", "foo_bar", "42", "3.14", "+", "=", "(", ")", "[", "]", ","]
+    parts = []
+    for i in range(n):
+        parts.append(rnd.choice(words))
+        parts.append("\n" if i % 10 == 9 else " ")
+    return "".join(parts)
+
+
+def main():
+    src = make_source(N)
+    lexers = {engine: ox.lexer(engine=engine, **rules()) for engine in ("lark", "re")}
+    tokens = [[(tk.type, tk.value) for tk in lex(src)] for lex in lexers.values()]
+    assert tokens[0] == tokens[1]
+
+    print(f"source with {len(tokens[0])} tokens ({len(src) // 1024} KiB):")
+    for engine, lex in lexers.items():
+        create = min(
+            timeit.repeat(
+                lambda: ox.lexer(engine=engine, cache=False, **rules()), number=1
+            )
+        )
+        scan = min(timeit.repeat(lambda: list(lex(src)), number=1, repeat=5))
+        print(
+            f"    {engine:<6} create {create * 1000:>7.1f} ms"
+            f"    scan {scan * 1000:>8.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
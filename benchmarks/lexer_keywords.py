@@ -0,0 +1,66 @@
+"""
+Benchmark lexing of a keyword-heavy language.
+
+Reserved words declared as literal rules are resolved with a lookup in the
+keyword table of the NAME rule. The same words wrapped in a non-capturing group
+are not recognized as literals and are compiled into the regex alternation,
+as before keyword tables were introduced.
+
+Usage:
+    python benchmarks/lexer_keywords.py
+"""
+import random
+import timeit
+
+import ox
+
+N = 200_000
+KEYWORDS = """
+and as assert async await break class continue def del elif else except
+finally for from global if import in is lambda nonlocal not or pass raise
+return try while with yield
+""".split()
+
+
+def rules(table=True):
+    if table:
+        keywords = {kw.upper(): kw for kw in KEYWORDS}
+    else:
+        keywords = {f"{kw.upper()}_2_": f"(?:{kw})" for kw in KEYWORDS}
+    return dict(
+        NAME=r"[a-zA-Z_]\w*",
+        INT=r"\d+",
+        OP=r"[-+*\/=<>.:]",
+        CTRL=r"[()\[\]{},;]",
+        NEWLINE=r"\n+",
+        WS=r"[ \t]+",
+        ignore="WS",
+        **keywords,
+    )
+
+
+def make_source(n):
+    """
+    Random source with approximately n tokens.
+    """
+    rnd = random.Random(0)
+    words = [*KEYWORDS, "x", "value", "42", "+", "=", "(", ")", ":", "."]
+    parts = []
+    for i in range(n):
+        parts.append(rnd.choice(words))
+        parts.append("\n" if i % 10 == 9 else " ")
+    return "".join(parts)
+
+
+def main():
+    src = make_source(N)
+    print(f"source with {N} tokens and {len(KEYWORDS)} keywords:")
+    for engine in ("lark", "re"):
+        for name, table in [("alternation", False), ("keyword table", True)]:
+            lex = ox.lexer(engine=engine, **rules(table))
+            scan = min(timeit.repeat(lambda: list(lex(src)), number=1, repeat=5))
+            print(f"    {engine:<6} {name:<14} {scan * 1000:>8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,77 @@
 """
 A simple compiler of compilers generator based on Lark-parser.
 """
-from .exceptions import *
-from .lexer import lexer, tokenize
+import sys
+from importlib import import_module
+from types import ModuleType
+
 from .logging import log
-from .parser import parser, parse
 
 __version__ = "2.0.0b0"
 __author__ = "Fábio Macêdo Mendes"
 __email__ = "fabiomacedomendes@gmail.com"
+
+# Public names and the submodules that define them. Those are only imported on
+# first access, so "import ox" does not pay for importing Lark.
+LAZY_ATTRIBUTES = {
+    "lexer": "lexer",
+    "tokenize": "lexer",
+    "parser": "parser",
+    "parse": "parser",
+    **dict.fromkeys(
+        [
+            "UnexpectedCharacters",
+            "UnexpectedInput",
+            "UnexpectedToken",
+            "GrammarError",
+            "LarkError",
+            "VisitError",
+            "LexError",
+            "ParseError",
+        ],
+        "exceptions",
+    ),
+}
+__all__ = ["log", *LAZY_ATTRIBUTES]
+
+
+class _Package(ModuleType):
+    """
+    Class of the ox module, which imports the names in LAZY_ATTRIBUTES on
+    first access.
+
+    The hooks are defined in the class instead of as module level functions,
+    since PEP 562 requires Python 3.7.
+
+    The class also keeps the ox.lexer and ox.parser functions bound after
+    their submodules are imported. These functions are the main public API
+    and share their names with the submodules that define them, so they
+    cannot be renamed. __getattr__ alone is not enough: it is only called for
+    missing names, and the import system binds a submodule to its package
+    with setattr() after importing it. Any "import ox.lexer" would then
+    replace ox.lexer by the module. The eager "from .lexer import lexer" used
+    before lazy imports masked this by rebinding the name after the import.
+
+    Only the lazily exported names that clash with a submodule are protected.
+    The submodules are still available in sys.modules.
+    """
+
+    def __getattr__(self, name):
+        try:
+            module = LAZY_ATTRIBUTES[name]
+        except KeyError:
+            raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+        value = getattr(import_module(f"{__name__}.{module}"), name)
+        self.__dict__[name] = value
+        return value
+
+    def __dir__(self):
+        return sorted({*self.__dict__, *LAZY_ATTRIBUTES})
+
+    def __setattr__(self, name, value):
+        if isinstance(value, ModuleType) and LAZY_ATTRIBUTES.get(name) == name:
+            return
+        super().__setattr__(name, value)
+
+
+sys.modules[__name__].__class__ = _Package
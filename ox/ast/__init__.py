@@ -3,5 +3,7 @@ from .ast_base import Tree, Node, AST
 from .ast_core import *
 from .ast_mixins import *
 from .ast_operator_mixins import *
+from .hashing import *
 from .token import Token
+from .traversal import *
 from .wrapper import unwrap, wrap
@@ -1,3 +1,6 @@
+from functools import lru_cache
+from typing import Iterator
+
 from sidekick import Maybe
 from sidekick import SExpr, Node as NodeBase, Leaf as LeafBase
 from sidekick.tree.node_base import NodeOrLeaf
@@ -7,9 +10,52 @@ from .children import ChildrenBase
 from .meta_attr import Meta
 from .print_context import PrintContext
 from .token import Token
-from .utils import wrap_tokens, from_template
+from .hashing import structural_hash
+from .node_cache import track_mutations
+from .traversal import fold
+from .utils import (
+    EMPTY_ATTRS,
+    ChunkedWriter,
+    attrs_property,
+    compile_template,
+    get_renderer,
+    wrap_parts,
+    wrap_tokens,
+)
+
+
+def render_parts(parts, context) -> Iterator[str]:
+    """
+    Iterate over the strings in a nested iterable of parts.
+
+    Parts are strings, AST nodes or iterables of parts. Nodes are expanded
+    into the result of their emit_parts() method, or into their cached
+    source code. An explicit stack is used, so rendering deep trees does not
+    recurse.
+    """
+    stack = [iter(parts)]
+    push = stack.append
+    pop = stack.pop
+
+    while stack:
+        for part in stack[-1]:
+            if isinstance(part, str):
+                yield part
+            elif isinstance(part, AST):
+                cached = getattr(part, "_source_cache", None)
+                if cached is not None and cached[0] == context.cache_key():
+                    yield cached[1]
+                    continue
+                push(iter(part.emit_parts(context)))
+                break
+            else:
+                push(iter(part))
+                break
+        else:
+            pop()
 
 
+@track_mutations
 class Tree(SExpr):
     """
     Generic AST type not directly associated with a standalone syntactic
@@ -24,6 +70,7 @@ class Tree(SExpr):
     _leaf_class = Token
 
 
+@track_mutations
 class AST(HasMetaMixin, NodeOrLeaf, metaclass=ASTMeta):
     """
     Base class for Node and Leaf syntax tree classes.
@@ -33,6 +80,10 @@ class AST(HasMetaMixin, NodeOrLeaf, metaclass=ASTMeta):
     __annotations__ = {}
 
     # Attributes
+    attrs = attrs_property()
+    _source_cache = None
+    _hash = None
+    _cache_slots = ()
     precedence_level = 0
     assumptions = None
     execution_context = None
@@ -73,7 +124,65 @@ class AST(HasMetaMixin, NodeOrLeaf, metaclass=ASTMeta):
         """
         if context is None:
             context = self.print_context()
-        return "".join(self.tokens(context))
+        cached = getattr(self, "_source_cache", None)
+        if cached is not None and cached[0] == context.cache_key():
+            return cached[1]
+
+        buf = []
+        key = "_source_cache" in self._cache_slots and context.cache_key()
+        self.emit(buf, context)
+        source = "".join(buf)
+        if key and key == context.cache_key():
+            self._source_cache = (key, source)
+        return source
+
+    def emit(self, buf, context=None):
+        """
+        Write source code representation of node to buffer.
+
+        Buffer can be a list of strings or a file-like object such as an
+        io.StringIO instance.
+        """
+        if context is None:
+            context = self.print_context()
+        write = buf.append if isinstance(buf, list) else buf.write
+        for part in render_parts(self.emit_parts(context), context):
+            write(part)
+
+    def write_source(self, file, context=None, buffer_size=64 * 1024):
+        """
+        Write source code representation of node to file.
+
+        Output is written in chunks of approximately buffer_size characters,
+        so the full source code is never kept in memory. Binary files receive
+        UTF-8 encoded data.
+
+        Return the number of characters written.
+        """
+        writer = ChunkedWriter(file, buffer_size)
+        self.emit(writer, context)
+        writer.flush()
+        return writer.written
+
+    def emit_parts(self, context):
+        """
+        Return an iterable of strings, child nodes and token streams that
+        compose the source code of node.
+
+        This is the result of :meth:`_tokens`, unless a subclass overrides
+        :meth:`tokens` after the last definition of :meth:`_tokens` in its
+        MRO. In that case, the token stream of :meth:`tokens` is used.
+        """
+        if _overrides_tokens(type(self)):
+            return self.tokens(context)
+        return self._tokens(context)
+
+    def child_parts(self, child, role):
+        """
+        Return a tuple with the child and its enclosing brackets, if
+        necessary, to be used in the result of :meth:`_tokens`.
+        """
+        return wrap_parts(child, self.wrap_child_tokens(child, role))
 
     def child_tokens(self, child, role, context):
         """
@@ -97,20 +206,40 @@ class AST(HasMetaMixin, NodeOrLeaf, metaclass=ASTMeta):
         """
         Return an iterator over tokens for the output source code.
 
-        Tokens can be joined together to construct the source code
-        representation of element.
+        Tokens are strings that can be joined together to construct the source
+        code representation of element.
 
-        Subclasses should override tokens_for_context instead of this method.
+        Built-in nodes implement :meth:`_tokens` instead, which yields child
+        nodes and nested token streams, so rendering deep trees does not
+        recurse. Subclasses may override either method.
         """
-        if self._meta.command:
-            data = {
-                f: self.child_tokens(getattr(self, f), f, ctx)
-                for f in self._meta.children_fields
-            }
-            yield ctx.start_line()
-            yield from from_template(self._meta.command, data)
-        else:
+        return render_parts(self._tokens(ctx), ctx)
+
+    def _tokens(self, ctx: PrintContext):
+        """
+        Return an iterable of strings, child nodes and nested iterables of
+        those that compose the source code of node.
+
+        The default implementation renders Meta.command.
+        """
+        command = self._meta.command
+        if not command:
             raise NotImplementedError("tokens() method must be implemented in subclass")
+        data = {
+            f: self.child_parts(getattr(self, f), f) for f in self._meta.children_fields
+        }
+        return ctx.start_line(), self._template_parts(command, data, ctx)
+
+    def _template_parts(self, command, data, ctx):
+        """
+        Render template with a mapping from field names to parts.
+
+        Templates that cannot be rendered lazily are formatted with the
+        rendered source of each field.
+        """
+        if compile_template(command) is None:
+            data = {k: "".join(render_parts(v, ctx)) for k, v in data.items()}
+        return get_renderer(command)(data)
 
     def print_context(self, **kwargs):
         """
@@ -136,7 +265,8 @@ class Node(AST, NodeBase):
     Base class for structured AST types.
 
     Subclasses of this class have always a fixed number of children that are
-    also exposed as attributes.
+    also exposed as attributes. The children sequence is a view over those
+    attributes created on access.
     """
 
     __slots__ = ()
@@ -148,24 +278,60 @@ class Node(AST, NodeBase):
     class Meta:
         abstract = True
 
-    def _simplify_or_copy(self, recur):
-        """Common implementation for both methods"""
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if self.__class__ is other.__class__:
+            for attr in self._meta.slot_fields:
+                if getattr(self, attr) != getattr(other, attr):
+                    return False
+            return super().__eq__(other)
+        return NotImplemented
+
+    def __hash__(self):
+        return structural_hash(self)
+
+    def _repr_attrs(self):
+        items = [(f, getattr(self, f)) for f in self._meta.slot_fields]
+        items.extend(self._attrs.items())
+        return ", ".join(f"{k}={v!r}" for k, v in items)
+
+    def __copy__(self):
+        # Children have a single parent, so copies cannot share them
+        return self.copy()
+
+    def __reduce_ex__(self, protocol):
+        meta = self._meta
+        state = {"_attrs": self._attrs}
+        if meta.has_tag_field:
+            state["_tag"] = self._tag
+        state.update((attr, getattr(self, attr)) for attr in meta.slot_fields)
+        return _restore_node, (type(self), list(self._children), state)
 
+    def _rebuild(self, children):
+        """
+        Return a shallow copy of node with the given list of children.
+        """
         meta = self._meta
-        new = object.__new__(type(self))
+        cls = type(self)
+        new = cls.__new__(cls)
         new._parent = None
-        new._attrs = self._attrs.copy()
-        new._children = new._children_class(new)
+        new._attrs = self._attrs if self._attrs is EMPTY_ATTRS else self._attrs.copy()
+        if not meta.children_fields:
+            new._children = ()
         if meta.has_tag_field:
             new._tag = self._tag
-        for attr in meta.children_fields:
-            setattr(new, attr, recur(getattr(self, attr)))
+        for attr in meta.slot_fields:
+            setattr(new, attr, getattr(self, attr))
+        for attr, child in zip(meta.children_fields, children):
+            child._parent = new
+            setattr(new, attr, child)
         return new
 
-    def copy(self):
-        return self._simplify_or_copy(lambda x: x.copy())
-
-    def simplify(self):
+    def _simplify_with(self, children):
+        """
+        Simplify node, given the list of its simplified children.
+        """
         args = []
         for child in self.children:
             value = child.static_value()
@@ -175,7 +341,13 @@ class Node(AST, NodeBase):
                 break
         else:
             return self.from_static_children(*args)
-        return self._simplify_or_copy(lambda x: x.simplify())
+        return self._rebuild(children)
+
+    def copy(self):
+        return fold(self, _copy_node)
+
+    def simplify(self):
+        return fold(self, _simplify_node)
 
 
 class Leaf(AST, LeafBase):
@@ -188,3 +360,55 @@ class Leaf(AST, LeafBase):
 
     class Meta:
         abstract = True
+
+    def __reduce_ex__(self, protocol):
+        # Copies and unpickled leaves are detached from their parents
+        func, args, (_, slots), *rest = object.__reduce_ex__(self, 2)
+        state = {k: v for k, v in slots.items() if k not in self._cache_slots}
+        state["_parent"] = None
+        return (func, args, (None, state), *rest)
+
+
+#
+# Utility functions
+#
+@lru_cache(maxsize=None)
+def _overrides_tokens(cls):
+    """
+    True if the tokens() method of cls is more derived than _tokens().
+    """
+    for base in cls.__mro__:
+        ns = vars(base)
+        if "tokens" in ns:
+            return base is not AST
+        if "_tokens" in ns:
+            return False
+    return False
+
+
+def _restore_node(cls, children, state):
+    """
+    Create node of class cls from its children and the state collected by
+    Node.__reduce_ex__.
+
+    Copies and unpickled nodes are detached from their parents.
+    """
+    template = cls.__new__(cls)
+    template._parent = None
+    if not cls._meta.children_fields:
+        template._children = ()
+    for attr, value in state.items():
+        setattr(template, attr, value)
+    return template._rebuild(children)
+
+
+def _copy_node(node, children):
+    if isinstance(node, Node):
+        return node._rebuild(children)
+    return node.copy()
+
+
+def _simplify_node(node, children):
+    if isinstance(node, Node):
+        return node._simplify_with(children)
+    return node.simplify()
@@ -1,5 +1,6 @@
 from sidekick.tree import SExprBase
 from .ast_base import AST, Leaf, Node
+from .traversal import traverse
 
 __all__ = ["Expr", "ExprLeaf", "ExprNode", "Stmt", "StmtLeaf", "StmtNode"]
 
@@ -21,6 +22,7 @@ class Expr(AST):
 
     class Meta:
         abstract = True
+        hash_cache = True
 
     #
     # Construction of sub-nodes
@@ -83,10 +85,19 @@ class Expr(AST):
         vars = set(include)
         if self.is_leaf:
             return vars
-        for child in self.children:
-            xs = child.free_vars(exclude, include)
-            xs.difference_update(exclude)
-            vars.update(xs)
+
+        # Collect variables from leaves and from nodes that override this
+        # method, without recursing into the default implementation.
+        def enter(node):
+            if node is self:
+                return True
+            if node.is_leaf or type(node).free_vars is not Expr.free_vars:
+                xs = node.free_vars(exclude, include)
+                xs.difference_update(exclude)
+                vars.update(xs)
+                return False
+
+        traverse(self, enter)
         return vars
 
 
@@ -110,7 +121,8 @@ class ExprNode(Node, SExprBase, Expr):
     class Meta:
         abstract = True
 
-    __eq__ = SExprBase.__eq__
+    __eq__ = Node.__eq__
+    __hash__ = Node.__hash__
 
     def __repr__(self):
         args = []
@@ -130,6 +142,7 @@ class Stmt(AST):
     class Meta:
         abstract = True
         root = True
+        hash_cache = True
 
 
 class StmtLeaf(Leaf, Stmt):
@@ -152,5 +165,6 @@ class StmtNode(Node, SExprBase, Stmt):
     class Meta:
         abstract = True
 
-    __eq__ = SExprBase.__eq__
+    __eq__ = Node.__eq__
+    __hash__ = Node.__hash__
     __repr__ = ExprNode.__repr__
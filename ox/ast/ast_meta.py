@@ -1,12 +1,19 @@
-from types import SimpleNamespace
+import keyword
+from types import MemberDescriptorType, SimpleNamespace
 from typing import Type
 
 from sidekick import Node, Leaf
 from .ast_meta_mixin import HasMetaMixin
-from .children import make_children_class
+from .children import ChildrenView, make_children_class
 from .meta_attr import is_ast_type
+from .node_cache import CACHE_OPTIONS, install_setattr_hook
+from .utils import EMPTY_ATTRS
 from ..logging import log
 
+# Init methods write fields with object.__setattr__, since a new node has no
+# cached values to invalidate
+_set = object.__setattr__
+
 
 class ASTMeta(type):
     """
@@ -14,10 +21,18 @@ class ASTMeta(type):
     """
 
     def __new__(mcs, name, bases, ns):
+        attr_slots = meta_option(bases, ns, "attr_slots", False)
+        cache_slots = tuple(
+            slot
+            for option, slot in CACHE_OPTIONS.items()
+            if meta_option(bases, ns, option, False)
+        )
         if "Meta" in ns:
             ns = dict(ns)
             del ns["Meta"]
-        set_class_slots(bases, ns)
+        set_class_slots(bases, ns, attr_slots)
+        if cache_slots:
+            set_cache_slots(bases, ns, cache_slots)
         return super().__new__(mcs, name, bases, ns)
 
     def __init__(cls, name, bases, ns):
@@ -33,6 +48,8 @@ class ASTMeta(type):
         cls._init = cls._make_init_method()
         if issubclass(cls, Node):
             cls._children_class = make_children_class(cls._meta)
+            if cls._meta.children_fields:
+                cls._children = ChildrenView(cls._children_class)
         cls.tag = tag_descriptor(cls)
         cls._meta_finalize()
         log.info(
@@ -56,7 +73,25 @@ class ASTMeta(type):
 #
 # Auxiliary functions
 #
-def set_class_slots(bases, ns):
+def meta_option(bases, ns, name, default=None):
+    """
+    Read option from the Meta declaration of a class that is not created yet.
+
+    Options not declared in the class body are inherited from the bases.
+    """
+    try:
+        return getattr(ns["Meta"], name)
+    except (KeyError, AttributeError):
+        pass
+    for base in bases:
+        try:
+            return getattr(base._meta, name)
+        except AttributeError:
+            pass
+    return default
+
+
+def set_class_slots(bases, ns, attr_slots=False):
     slots = ns.pop("__slots__", ...)
 
     # We can set slots to None to set the correct value
@@ -82,9 +117,51 @@ def set_class_slots(bases, ns):
     slots = tuple(k for k, v in annotations.items() if is_ast_type(v))
     if "tag" in annotations:
         slots = ("_tag", *slots)
+
+    if attr_slots:
+        slots += attr_slot_names(bases, ns, annotations)
     ns["__slots__"] = slots
 
 
+def set_cache_slots(bases, ns, cache_slots):
+    """
+    Add the slots required by classes with cached values.
+
+    Slots are created in the first Node or Leaf subclass, since abstract
+    classes in a hierarchy are mixed with those and cannot define a layout of
+    their own.
+    """
+    is_concrete = any(issubclass(b, (Node, Leaf)) for b in bases)
+    if is_concrete and "__slots__" in ns:
+        missing = [name for name in cache_slots if not has_slot(bases, name)]
+        ns["__slots__"] = (*ns["__slots__"], *missing)
+    ns["_cache_slots"] = cache_slots
+    install_setattr_hook()
+
+
+def attr_slot_names(bases, ns, annotations):
+    """
+    Names of attribute fields that should be stored in slots.
+
+    Fields defined in the class body or that already have a slot in some base
+    class are skipped.
+    """
+    slots = []
+    for k, v in annotations.items():
+        if is_ast_type(v) or k == "tag" or k in ns:
+            continue
+        if not has_slot(bases, k):
+            slots.append(k)
+    return tuple(slots)
+
+
+def has_slot(bases, name):
+    """
+    Return True if some base class stores the given attribute in a slot.
+    """
+    return any(isinstance(getattr(b, name, None), MemberDescriptorType) for b in bases)
+
+
 def make_abstract_init_method(cls):
     """
     Init method for abstract classes. It immediately raises a TypeError on
@@ -103,64 +180,130 @@ def make_leaf_init_method(cls):
     """
     Generic method for Leaf types.
     """
-    return Leaf.__init__
+    shared_attrs = getattr(cls._meta, "attr_slots", False)
+
+    def leaf_init(self, value, *, parent=None, **kwargs):
+        _set(self, "_value", value)
+        _set(self, "_attrs", (kwargs or EMPTY_ATTRS) if shared_attrs else kwargs)
+        _set(self, "_parent", parent)
+
+    return leaf_init
 
 
 def make_node_init_method(cls):
     """
-    Generic method for Node types.
+    Init method for Node types.
+
+    The method is generated from source code specialized for the fields of the
+    class, like in collections.namedtuple. Classes with field names that
+    cannot be used as arguments use a generic implementation.
     """
     meta = cls._meta
+    children, attrs = meta.children_fields, meta.attr_fields
+    if all(map(is_init_argument, (*children, *attrs))):
+        return _codegen_init_method(cls, children, attrs, meta.has_tag_field)
     fn = _sexpr_init_method if meta.has_tag_field else _node_init_method
-    return fn(meta.children_fields, meta.attr_fields, {})
+    shared_attrs = getattr(meta, "attr_slots", False)
+    return fn(children, attrs, {}, meta.slot_fields, shared_attrs)
 
 
-def _sexpr_init_method(children, attrs, defaults):
-    node_init = _node_init_method(children, attrs, defaults)
+def _codegen_init_method(cls, children, attrs, has_tag):
+    meta = cls._meta
+    slots = meta.slot_fields
+    args = ["tag"] if has_tag else []
+    args.extend((*children, *attrs))
+    lines = ["_set(self, '_tag', tag)"] if has_tag else []
+    if not children:
+        lines.append("_set(self, '_children', ())")
+    lines.append("_set(self, '_parent', parent)")
+    for name in children:
+        lines.extend(
+            [
+                f"if {name}._parent is not None:",
+                f"    msg = f'node already has parent: {{{name}._parent!r}}'",
+                "    raise ValueError(msg)",
+                f"_set({name}, '_parent', self)",
+                f"_set(self, {name!r}, {name})",
+            ]
+        )
+    for name in attrs:
+        if name in slots:
+            lines.append(f"_set(self, {name!r}, {name})")
+        else:
+            lines.append(f"kwargs[{name!r}] = {name}")
+    if getattr(meta, "attr_slots", False):
+        lines.append("_set(self, '_attrs', kwargs or EMPTY_ATTRS)")
+    else:
+        lines.append("_set(self, '_attrs', kwargs)")
+
+    signature = "".join(f"{arg}, " for arg in args)
+    src = f"def _init(self, {signature}*, parent=None, **kwargs):\n"
+    src += "".join(f"    {line}\n" for line in lines)
+    ns = {"EMPTY_ATTRS": EMPTY_ATTRS, "_set": _set}
+    exec(src, ns)
+    init = ns["_init"]
+    init.__module__ = cls.__module__
+    init.__qualname__ = f"{cls.__qualname__}._init"
+    init._source = src
+    return init
+
+
+def _sexpr_init_method(children, attrs, defaults, slots=(), shared_attrs=False):
+    node_init = _node_init_method(children, attrs, defaults, slots, shared_attrs)
 
     def sexpr_init(self, tag, *args, **kwargs):
-        self._tag = tag
+        _set(self, "_tag", tag)
         node_init(self, *args, **kwargs)
 
     return sexpr_init
 
 
-def _node_init_method(children, attrs, defaults):
+def _node_init_method(children, attrs, defaults, slots=(), shared_attrs=False):
     n_children = len(children)
     n_attrs = len(attrs)
     n_args_max = n_children + n_attrs
     n_args_min = n_args_max - len(defaults)
 
-    # TODO: init method should be created by dynamic code evaluation like
-    # namedtuples. This is somewhat fragile, but it can significantly boost
-    # performance of the constructor
     def node_init(self, *args, parent=None, **kwargs):
         if len(args) > n_args_max:
             raise TypeError(f"expected at most {n_args_max} positional arguments.")
         elif len(args) < n_args_min:
             raise TypeError(f"expected at least {n_args_min} positional arguments.")
 
-        self._children = self._children_class(self)
-        self._parent = parent
+        if not n_children:
+            _set(self, "_children", ())
+        _set(self, "_parent", parent)
 
         # Init children nodes
         args_iter = iter(args)
         for attr, child in zip(children, args_iter):
             if child.parent is None:
-                child._parent = self
-                setattr(self, attr, child)
+                _set(child, "_parent", self)
+                _set(self, attr, child)
             else:
                 raise ValueError(f"node already has parent: {child.parent!r}")
 
         # Init attributes
         attrs_iter = iter(attrs)
         for attr, value in zip(attrs_iter, args_iter):
-            kwargs[attr] = value
-        self._attrs = kwargs
+            if attr in slots:
+                _set(self, attr, value)
+            else:
+                kwargs[attr] = value
+        _set(self, "_attrs", (kwargs or EMPTY_ATTRS) if shared_attrs else kwargs)
 
     return node_init
 
 
+def is_init_argument(name):
+    """
+    Return True if field name can be used as an argument of the generated
+    init method.
+    """
+    reserved = {"self", "tag", "parent", "kwargs"}
+    return name.isidentifier() and not keyword.iskeyword(name) and name not in reserved
+
+
 def tag_descriptor(cls):
     """
     A descriptor object for the tag field. It is set to None if object
@@ -1,6 +1,7 @@
 from sidekick import Just, Maybe, Node
 from .ast_core import ExprLeaf, ExprNode, Expr, StmtNode, Stmt
-from .utils import attr_property, from_template
+from .ast_base import render_parts
+from .utils import attr_property
 
 __all__ = [
     "NameMixin",
@@ -32,8 +33,8 @@ class NameMixin(ExprLeaf):
             value = value.value
         super().__init__(value, **kwargs)
 
-    def tokens(self, ctx):
-        yield self.value
+    def _tokens(self, ctx):
+        return (self.value,)
 
     def free_vars(self, include=(), exclude=()):
         xs = {self.value}
@@ -73,8 +74,8 @@ class AtomMixin(ExprLeaf):
     def static_value(self) -> Maybe:
         return Just(self.value)
 
-    def tokens(self, ctx):
-        yield str(self.value)
+    def _tokens(self, ctx):
+        return (str(self.value),)
 
 
 class VoidMixin(ExprLeaf):
@@ -93,8 +94,8 @@ class VoidMixin(ExprLeaf):
     def __bool__(self):
         return False
 
-    def tokens(self, ctx):
-        yield from ()
+    def _tokens(self, ctx):
+        return ()
 
     def copy(self):
         return type(self)(**self._attrs)
@@ -144,11 +145,9 @@ class GetAttrMixin(ExprNode):
         """
         return cls(expr, attr)
 
-    def tokens(self, ctx):
-        yield from from_template(
-            self._meta.command,
-            {"expr": self.child_tokens(self.expr, "expr", ctx), "attr": [self.attr]},
-        )
+    def _tokens(self, ctx):
+        data = {"expr": self.child_parts(self.expr, "expr"), "attr": self.attr}
+        return self._template_parts(self._meta.command, data, ctx)
 
 
 class GetItemMixin(ExprNode):
@@ -170,14 +169,12 @@ class GetItemMixin(ExprNode):
         """
         return cls(expr, item)
 
-    def tokens(self, ctx):
-        yield from from_template(
-            self._meta.command,
-            {
-                "expr": self.child_tokens(self.expr, "expr", ctx),
-                "index": self.child_tokens(self.index, "index", ctx),
-            },
-        )
+    def _tokens(self, ctx):
+        data = {
+            "expr": self.child_parts(self.expr, "expr"),
+            "index": self.child_parts(self.index, "index"),
+        }
+        return self._template_parts(self._meta.command, data, ctx)
 
 
 #
@@ -194,10 +191,9 @@ class StmtExprMixin(StmtNode):
         abstract = True
         command = "{expr}"
 
-    def tokens(self, ctx):
-        expr = self.child_tokens(self.expr, "expr", ctx)
-        yield ctx.start_line()
-        yield from from_template(self._meta.command, {"expr": expr})
+    def _tokens(self, ctx):
+        data = {"expr": self.child_parts(self.expr, "expr")}
+        return ctx.start_line(), self._template_parts(self._meta.command, data, ctx)
 
 
 class BlockMixin(Node, Stmt):
@@ -210,19 +206,19 @@ class BlockMixin(Node, Stmt):
         line_end = ""
         block_separators = ["", ""]
 
-    def tokens(self, ctx):
+    def _tokens(self, ctx):
         children = iter(self.children)
         line_end = self._meta.line_end
 
         try:
             first = next(children)
-            yield from first.tokens(ctx)
+            yield first
             yield line_end
         except StopIteration:
             yield from self.tokens_empty_block(ctx)
         for child in children:
             yield "\n"
-            yield from child.tokens(ctx)
+            yield child
             yield line_end
 
     def tokens_empty_block(self, ctx):
@@ -238,11 +234,14 @@ class BlockMixin(Node, Stmt):
         Respect language block syntax conventions (e.g.,  Python uses semi-colon
         followed by indentation, while C-family uses braces and indentation).
         """
+        return render_parts(self._tokens_as_block(ctx), ctx)
+
+    def _tokens_as_block(self, ctx):
         start, end = self._meta.separators
         yield start
         yield "\n"
         ctx.indent()
-        yield from self.tokens(ctx)
+        yield self.emit_parts(ctx)
         ctx.dedent()
         yield end
         yield "\n"
@@ -255,9 +254,9 @@ class BodyElseMixin(StmtNode):
     class Meta:
         abstract = True
 
-    def tokens(self, ctx):
-        yield from self.body.tokens_as_block(ctx)
+    def _tokens(self, ctx):
+        yield self.body._tokens_as_block(ctx)
         if len(self.other.children) != 0:
             yield ctx.start_line()
             yield "else"
-            yield from self.other.tokens_as_block(ctx)
+            yield self.other._tokens_as_block(ctx)
@@ -53,6 +53,28 @@ class ChildrenBase(MutableSequence):
         raise size_error()
 
 
+class ChildrenView:
+    """
+    Class attribute that exposes the child fields of a node as a sequence.
+
+    Views are created on access, so fixed size nodes do not store a children
+    object.
+    """
+
+    __slots__ = ("children_class",)
+
+    def __init__(self, children_class):
+        self.children_class = children_class
+
+    def __get__(self, obj, cls=None):
+        if obj is None:
+            return self
+        return self.children_class(obj)
+
+    def __set__(self, obj, value):
+        raise AttributeError("children of fixed size nodes cannot be replaced")
+
+
 def make_children_class(meta, base=ChildrenBase):
     """
     Create an specialized children class for the given meta object.
@@ -0,0 +1,171 @@
+"""
+Structural hashing and hash-consing of AST nodes.
+
+Structurally equal trees have equal hashes. Hashes are computed from the
+bottom up with an explicit stack and are stored in nodes of classes that
+declare ``hash_cache = True`` in their Meta class. Attribute mappings can be
+modified in place, so they are not part of the hash.
+"""
+from collections import defaultdict
+from typing import Dict, List
+
+from .traversal import fold
+
+__all__ = ["structural_hash", "HashCons", "common_subexpressions"]
+
+
+def structural_hash(node) -> int:
+    """
+    Return a hash of node that is equal for all structurally equal trees.
+
+    Subtrees with a cached hash are not visited.
+    """
+    value = getattr(node, "_hash", None)
+    if value is not None:
+        return value
+
+    stack = [(node, iter(node._children), [])]
+    push = stack.append
+
+    while True:
+        parent, children, hashes = stack[-1]
+        for child in children:
+            value = getattr(child, "_hash", None)
+            if value is None:
+                if child._children:
+                    push((child, iter(child._children), []))
+                    break
+                value = _hash_node(child, ())
+            hashes.append(value)
+        else:
+            stack.pop()
+            value = _hash_node(parent, hashes)
+            if not stack:
+                return value
+            stack[-1][2].append(value)
+
+
+def _hash_node(node, hashes):
+    key = node_key(node, attrs=False)
+    value = hash((type(node), *map(_hash_value, key), *hashes))
+    if "_hash" in getattr(node, "_cache_slots", ()):
+        object.__setattr__(node, "_hash", value)
+    return value
+
+
+def _hash_value(value):
+    try:
+        return hash(value)
+    except TypeError:
+        return hash(type(value))
+
+
+def node_key(node, attrs=True) -> tuple:
+    """
+    Return a tuple with the contents of node, excluding its children.
+
+    The attribute mapping is only included if attrs is True.
+    """
+    if hasattr(node, "_value"):
+        return node._value, getattr(node, "_type", None)
+    meta = getattr(node, "_meta", None)
+    if meta is None:
+        key = [node.tag]
+    else:
+        key = [node._tag] if meta.has_tag_field else []
+        key.extend(getattr(node, attr) for attr in meta.slot_fields)
+    if attrs and node._attrs:
+        key.append(tuple(sorted(node._attrs.items())))
+    return tuple(key)
+
+
+class HashCons:
+    """
+    Interning table for AST nodes.
+
+    Each structurally distinct subtree registered in the table receives a
+    small integer id. Ids are computed from the ids of the children, so two
+    subtrees are equal if and only if their ids are equal, and checking
+    equality takes constant time after the subtrees are numbered.
+
+    A node can only have a single parent, hence equal subtrees are shared by
+    reference to a canonical node rather than by reusing the same instance in
+    different places of a tree. The table does not track mutations: subtrees
+    should not be modified after they are registered.
+
+    Examples:
+        >>> from ox.ast import Tree
+        >>> table = HashCons()
+        >>> table.id(Tree("+", [1, 2])) == table.id(Tree("+", [1, 2]))
+        True
+    """
+
+    def __init__(self):
+        self.nodes: List = []
+        self._ids: Dict[tuple, int] = {}
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def id(self, node) -> int:
+        """
+        Register node and all of its subtrees and return the id of node.
+        """
+        return fold(node, self._register)
+
+    def intern(self, node):
+        """
+        Return the canonical node that is structurally equal to node.
+
+        The first registered subtree is used as the canonical one.
+        """
+        return self.nodes[self.id(node)]
+
+    def ids(self, node) -> Dict[int, int]:
+        """
+        Return a mapping from the id() of each subtree of node to its id in
+        the table.
+        """
+        result = {}
+
+        def register(node, children):
+            result[id(node)] = value = self._register(node, children)
+            return value
+
+        fold(node, register)
+        return result
+
+    def _register(self, node, children):
+        try:
+            key = (type(node), node_key(node), *children)
+            hash(key)
+        except TypeError:
+            key = (type(node), object())
+        try:
+            return self._ids[key]
+        except KeyError:
+            self._ids[key] = value = len(self.nodes)
+            self.nodes.append(node)
+            return value
+
+
+def common_subexpressions(node, min_size=2) -> List[list]:
+    """
+    Return groups of structurally equal subtrees that occur more than once in
+    node.
+
+    Only subtrees with at least min_size nodes are considered. Groups are
+    listed in the order their first subtree appears in a post-order traversal.
+    """
+    table = HashCons()
+    groups = defaultdict(list)
+
+    def register(node, children):
+        value = table._register(node, [v for v, _ in children])
+        size = 1 + sum(n for _, n in children)
+        if size >= min_size:
+            groups[value].append(node)
+        return value, size
+
+    fold(node, register)
+    return [group for group in groups.values() if len(group) > 1]
@@ -1,6 +1,7 @@
 import inspect
 from enum import Enum
 from functools import singledispatch
+from types import MemberDescriptorType
 from typing import Optional, Type, Dict, Callable, Union, Tuple
 
 from sidekick import lazy
@@ -61,6 +62,18 @@ class Meta:
         attrs = tuple(f for f in self.fields if f not in children)
         return attrs[1:] if attrs and attrs[0] == "tag" else attrs
 
+    @lazy
+    def slot_fields(self) -> Tuple[str, ...]:
+        """
+        Tuple of attribute fields that are stored in slots.
+        """
+        cls = self.type
+        return tuple(
+            f
+            for f in self.attr_fields
+            if isinstance(getattr(cls, f, None), MemberDescriptorType)
+        )
+
     @lazy
     def wrapper_roles(self):
         """
@@ -0,0 +1,123 @@
+"""
+Caches of values derived from the contents of AST nodes.
+
+Node classes opt in by declaring options in their Meta class:
+
+source_cache:
+    The result of node.source() is stored in the node. Rendering the node
+    again, or any tree that contains it, reuses the stored string if the print
+    context has the same settings.
+hash_cache:
+    The structural hash of the node is computed only once.
+
+Assigning a field of any node, or modifying the children list of a node with a
+variable number of children, invalidates the caches of the node and of all its
+ancestors. This is done for all nodes, since a node without caches may be part
+of a tree whose root caches its source code or hash. The __setattr__ hook that
+tracks mutations is installed when the first class with cached values is
+created. Generated init methods bypass it, since new nodes have nothing to
+invalidate.
+
+Cache slots are left empty until a value is stored, so readers must use
+getattr() with a default of None.
+"""
+# Meta options and the slots that store the corresponding cached values
+CACHE_OPTIONS = {"source_cache": "_source_cache", "hash_cache": "_hash"}
+
+# Attributes that do not change the contents of a node
+UNTRACKED_ATTRIBUTES = frozenset(["_parent", *CACHE_OPTIONS.values()])
+
+# Base classes that receive the __setattr__ hook
+TRACKED_CLASSES = []
+
+
+def node_cache_setattr(self, name, value):
+    """
+    __setattr__ method for AST nodes.
+
+    Lists of children are stored as ChildrenList instances.
+    """
+    if name == "_children" and type(value) is list:
+        value = ChildrenList(self, value)
+    object.__setattr__(self, name, value)
+    if name not in UNTRACKED_ATTRIBUTES:
+        invalidate_caches(self)
+
+
+def track_mutations(cls):
+    """
+    Class decorator that registers a base class of tree nodes whose mutations
+    must invalidate cached values.
+
+    Classes must be registered before any class with cached values is
+    created.
+    """
+    TRACKED_CLASSES.append(cls)
+    return cls
+
+
+def install_setattr_hook():
+    """
+    Install node_cache_setattr in all classes registered with
+    track_mutations().
+    """
+    for cls in TRACKED_CLASSES:
+        if cls.__dict__.get("__setattr__") is not node_cache_setattr:
+            cls.__setattr__ = node_cache_setattr
+
+
+def invalidate_caches(node):
+    """
+    Discard the cached values of node and all of its ancestors.
+    """
+    while node is not None:
+        for name in getattr(node, "_cache_slots", ()):
+            object.__setattr__(node, name, None)
+        node = getattr(node, "_parent", None)
+
+
+class ChildrenList(list):
+    """
+    List of children that invalidates the caches of its owner node when it is
+    modified.
+    """
+
+    __slots__ = ("_owner",)
+
+    def __init__(self, owner, children=()):
+        super().__init__(children)
+        self._owner = owner
+
+    def __reduce__(self):
+        return list, (list(self),)
+
+
+def _invalidating_method(name):
+    method = getattr(list, name)
+
+    def invalidating(self, *args, **kwargs):
+        result = method(self, *args, **kwargs)
+        invalidate_caches(self._owner)
+        return result
+
+    invalidating.__name__ = name
+    invalidating.__qualname__ = f"ChildrenList.{name}"
+    return invalidating
+
+
+for _name in (
+    "__setitem__",
+    "__delitem__",
+    "__iadd__",
+    "__imul__",
+    "append",
+    "extend",
+    "insert",
+    "pop",
+    "remove",
+    "clear",
+    "reverse",
+    "sort",
+):
+    setattr(ChildrenList, _name, _invalidating_method(_name))
+del _name
@@ -26,3 +26,11 @@ class PrintContext:
         Return the indentation string for the current level.
         """
         return self.indentation * self.indent_level
+
+    def cache_key(self):
+        """
+        Return a value that identifies the current settings of the context.
+
+        Cached source code is only reused by contexts with equal keys.
+        """
+        return type(self), tuple(sorted(vars(self).items()))
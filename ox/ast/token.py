@@ -1,17 +1,22 @@
 from sidekick import Leaf
-from .utils import attr_property
+from .utils import EMPTY_ATTRS, attrs_property
 
 
 # noinspection PyShadowingBuiltins
 class Token(Leaf):
     """
     Leaf class used to represent tokens.
+
+    Source positions are stored in slots and tokens without extra attributes
+    share an empty attribute mapping. Tokens created from an OffsetToken keep
+    only the offsets and compute (line, column) positions on demand.
     """
 
-    __slots__ = ("_type",)
+    __slots__ = ("_type", "_start", "_end", "_lines")
     type = property(lambda self: self._type)
-    start = attr_property("pos")
-    end = attr_property("end_pos")
+    start = property(lambda self: self._position(self._start))
+    end = property(lambda self: self._position(self._end))
+    attrs = attrs_property()
 
     @property
     def string(self):
@@ -22,32 +27,42 @@ class Token(Leaf):
 
     @string.setter
     def string(self, value):
-        self._attrs["string"] = str(value)
+        self.attrs["string"] = str(value)
 
     @classmethod
     def from_lark_token(cls, tk):
         """
         Initialize node from Lark token.
         """
-        new = cls(
-            tk.value,
-            type=tk.type,
-            start=(tk.line, tk.column),
-            end=(tk.end_line, tk.end_column),
-        )
+        lines = getattr(tk, "lines", None)
+        if lines is not None:
+            new = cls(tk.value, type=tk.type, start=tk.pos_in_stream, end=tk.end_pos)
+            new._lines = lines
+        else:
+            new = cls(
+                tk.value,
+                type=tk.type,
+                start=(tk.line, tk.column),
+                end=(tk.end_line, tk.end_column),
+            )
         string = str(tk)
         if string != tk.value:
             new.string = string
         return new
 
     def __init__(self, value, type="TOKEN", start=None, end=None, **attrs):
-        if start is not None:
-            attrs["start"] = start
-        if end is not None:
-            attrs["end"] = end
-        super().__init__(value)
-        self._attrs = attrs
+        self._value = value
+        self._attrs = attrs or EMPTY_ATTRS
+        self._parent = None
         self._type = type
+        self._start = start
+        self._end = end
+        self._lines = None
+
+    def _position(self, offset):
+        if self._lines is None or offset is None:
+            return offset
+        return self._lines.position(offset)
 
     def __str__(self):
         return self.string
@@ -57,18 +72,31 @@ class Token(Leaf):
             return self._value == other._value and self.type == other.type
         return self._value.__eq__(other)
 
+    __hash__ = Leaf.__hash__
+
     def _repr_node(self):
         return f"{self.type}({self._value!r})"
 
     def _repr_attrs(self):
-        return ", ".join(filter(None, [f"{self.type!r}", super()._repr_attrs()]))
+        data = [f"{self.type!r}"]
+        if self._start is not None:
+            data.append(f"start={self.start!r}")
+        if self._end is not None:
+            data.append(f"end={self.end!r}")
+        data.append(super()._repr_attrs())
+        return ", ".join(filter(None, data))
 
     def _repr_as_child(self):
-        if self.type == "TOKEN" and not self._attrs:
+        if self.type == "TOKEN" and not self.has_attrs:
             return repr(self._value)
         return self._repr()
 
+    @property
+    def has_attrs(self):
+        return bool(self._attrs) or self._start is not None or self._end is not None
+
     def copy(self) -> "Token":
-        new: Token = super().copy()
-        new._type = self._type
+        attrs = {} if self._attrs is EMPTY_ATTRS else self._attrs
+        new = type(self)(self._value, self._type, self._start, self._end, **attrs)
+        new._lines = self._lines
         return new
@@ -0,0 +1,139 @@
+"""
+Tree traversal with an explicit stack.
+
+Functions in this module do not recurse, so they work with trees of any depth
+and do not pay for a generator frame per level.
+"""
+from typing import Callable, Iterable, Iterator
+
+__all__ = ["walk", "traverse", "fold", "flatten_tokens"]
+
+
+def walk(node, order="pre") -> Iterator:
+    """
+    Iterate over all nodes of tree in depth first order.
+
+    Args:
+        node:
+            Root node of the tree.
+        order:
+            Either "pre", to yield each node before its children, or "post",
+            to yield it after its children.
+    """
+    if order == "pre":
+        return _walk(node, True)
+    elif order == "post":
+        return _walk(node, False)
+    raise ValueError(f"invalid order: {order!r}")
+
+
+def _walk(node, pre):
+    if pre:
+        yield node
+    stack = [(node, iter(node._children))]
+    push = stack.append
+
+    while stack:
+        parent, children = stack[-1]
+        for child in children:
+            if pre:
+                yield child
+            push((child, iter(child._children)))
+            break
+        else:
+            stack.pop()
+            if not pre:
+                yield parent
+
+
+def traverse(node, enter: Callable = None, exit: Callable = None):
+    """
+    Visit all nodes of tree calling the enter and exit hooks.
+
+    Args:
+        node:
+            Root node of the tree.
+        enter:
+            Called with each node before visiting its children. If it returns
+            False, the children are skipped, but exit is still called.
+        exit:
+            Called with each node after visiting its children.
+    """
+
+    def children_of(node):
+        if enter is not None and enter(node) is False:
+            return iter(())
+        return iter(node._children)
+
+    stack = [(node, children_of(node))]
+    push = stack.append
+
+    while stack:
+        parent, children = stack[-1]
+        for child in children:
+            push((child, children_of(child)))
+            break
+        else:
+            stack.pop()
+            if exit is not None:
+                exit(parent)
+
+
+def fold(node, func: Callable):
+    """
+    Compute a value for tree from the bottom up.
+
+    func(node, results) is called for each node with the list of values
+    computed for its children. The value computed for the root is returned.
+
+    Examples:
+        >>> from ox.ast import Tree
+        >>> tree = Tree("+", [1, Tree("*", [2, 3])])
+        >>> fold(tree, lambda node, results: 1 + sum(results))
+        5
+    """
+    stack = [(node, iter(node._children), [])]
+    push = stack.append
+
+    while True:
+        parent, children, results = stack[-1]
+        for child in children:
+            grandchildren = child._children
+            if grandchildren:
+                push((child, iter(grandchildren), []))
+                break
+            results.append(func(child, []))
+        else:
+            stack.pop()
+            value = func(parent, results)
+            if not stack:
+                return value
+            stack[-1][2].append(value)
+
+
+def flatten_tokens(tokens: Iterable) -> Iterator[str]:
+    """
+    Iterate over all strings in a nested stream of tokens.
+
+    Token streams produced by the tokens() method of AST nodes may contain
+    strings or other token streams. Yielding the stream of a child node
+    instead of delegating to it with "yield from" keeps the depth of the
+    generator chain constant.
+
+    Examples:
+        >>> ''.join(flatten_tokens(['(', iter(['a', ['+', 'b']]), ')']))
+        '(a+b)'
+    """
+    stack = [iter(tokens)]
+    push = stack.append
+    pop = stack.pop
+
+    while stack:
+        for tk in stack[-1]:
+            if isinstance(tk, str):
+                yield tk
+            else:
+                push(iter(tk))
+                break
+        else:
+            pop()
@@ -1,6 +1,35 @@
+import io
 from functools import lru_cache
+from string import Formatter
 from typing import Union, Sequence
 
+from .node_cache import invalidate_caches
+from .traversal import flatten_tokens
+
+
+class EmptyAttrs(dict):
+    """
+    Read-only empty mapping shared by nodes without attributes.
+
+    It is a dict, so lookups and comparisons are as fast as with regular
+    attribute mappings. Copies and unpickled objects refer to the shared
+    EMPTY_ATTRS instance.
+    """
+
+    __slots__ = ()
+
+    def __reduce__(self):
+        return "EMPTY_ATTRS"
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("EMPTY_ATTRS does not support item assignment")
+
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+
+EMPTY_ATTRS = EmptyAttrs()
+
 
 class NotImplementedDescriptor:
     """
@@ -44,6 +73,58 @@ def wrap_tokens(it, wrap: Union[bool, Sequence[str]] = True):
         yield from it
 
 
+def wrap_parts(part, wrap: Union[bool, Sequence[str]] = True) -> tuple:
+    """
+    Like :func:`wrap_tokens`, but return a tuple with part as a single
+    element, which can be a child node or a nested stream of parts.
+    """
+    if wrap is True:
+        return "(", part, ")"
+    elif wrap:
+        left, right = wrap
+        return left, part, right
+    return (part,)
+
+
+class ChunkedWriter:
+    """
+    Collect strings written to it and pass them to a file object in chunks of
+    at least buffer_size characters.
+
+    Binary files receive chunks encoded with the given encoding.
+    """
+
+    def __init__(self, file, buffer_size=64 * 1024, encoding="utf8"):
+        if buffer_size < 1:
+            raise ValueError("buffer_size must be positive")
+        binary = isinstance(file, (io.RawIOBase, io.BufferedIOBase))
+        self.file = file
+        self.encoding = encoding if binary else None
+        self.buffer_size = buffer_size
+        self.chunk = []
+        self.size = 0
+        self.written = 0
+
+    def write(self, data: str):
+        self.chunk.append(data)
+        self.size += len(data)
+        if self.size >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Write buffered data to file.
+        """
+        data = "".join(self.chunk)
+        self.chunk.clear()
+        self.written += self.size
+        self.size = 0
+        if data:
+            self.file.write(
+                data if self.encoding is None else data.encode(self.encoding)
+            )
+
+
 def from_template(command, ctx):
     """
     Render template in given context. Return an interator over all tokens
@@ -56,20 +137,59 @@ def from_template(command, ctx):
             of tokens used to construct the given string argument.
     """
     renderer = get_renderer(command)
-    return renderer(ctx)
+    return flatten_tokens(renderer(ctx))
 
 
 @lru_cache(256)
 def get_renderer(template):
     """
     Return the renderer function for the given string.
+
+    Templates are parsed only once into a sequence of literals and field names
+    and the resulting renderers yield the token streams of each field without
+    joining them into strings. Templates that use conversions, format specs,
+    positional or repeated fields are rendered with str.format.
+
+    Cache statistics are available from get_renderer.cache_info().
     """
+    parts = compile_template(template)
+    if parts is None:
+
+        def renderer_fallback(ctx):
+            data = {k: "".join(flatten_tokens(v)) for k, v in ctx.items()}
+            yield template.format(**data)
 
-    def renderer_fallback(ctx):
-        data = {k: "".join(v) for k, v in ctx.items()}
-        yield template.format(**data)
+        return renderer_fallback
 
-    return renderer_fallback
+    def renderer(ctx):
+        for literal, field in parts:
+            if literal:
+                yield literal
+            if field is not None:
+                yield ctx[field]
+
+    return renderer
+
+
+@lru_cache(256)
+def compile_template(template):
+    """
+    Split template into a tuple of (literal, field) pairs.
+
+    Return None if the template cannot be rendered lazily.
+
+    >>> compile_template("{lhs} + {rhs}")
+    (('', 'lhs'), (' + ', 'rhs'))
+    """
+    parts = []
+    seen = set()
+    for literal, field, spec, conversion in Formatter().parse(template):
+        if field is not None:
+            if spec or conversion or not field.isidentifier() or field in seen:
+                return None
+            seen.add(field)
+        parts.append((literal, field))
+    return tuple(parts)
 
 
 def attr_property(name, default=None, readonly=False):
@@ -86,11 +206,35 @@ def attr_property(name, default=None, readonly=False):
 
     @prop.setter
     def prop(self, value):
-        self.attr[name] = value
+        self.attrs[name] = value
+        invalidate_caches(self)
 
     return prop
 
 
+def attrs_property():
+    """
+    Expose the attribute mapping of a node as a property.
+
+    Nodes without attributes may share the read-only EMPTY_ATTRS mapping. It
+    is replaced by a new dictionary on access, so node.attrs can always be
+    mutated.
+    """
+
+    @property
+    def attrs(self):
+        attrs = self._attrs
+        if attrs is EMPTY_ATTRS:
+            attrs = self._attrs = {}
+        return attrs
+
+    @attrs.setter
+    def attrs(self, value):
+        self._attrs = dict(value)
+
+    return attrs
+
+
 def intersperse(sep, generators):
     """
     Intersperse tokens generated from all generators by the given separator.
@@ -105,3 +249,17 @@ def intersperse(sep, generators):
         for arg in generators:
             yield sep
             yield from arg
+
+
+def intersperse_parts(sep, parts):
+    """
+    Like :func:`intersperse`, but yield each part as a single element, which
+    can be a child node or a nested stream of parts.
+    """
+    parts = iter(parts)
+    for part in parts:
+        yield part
+        break
+    for part in parts:
+        yield sep
+        yield part
@@ -1,3 +1,4 @@
+from functools import partial
 from types import MappingProxyType
 
 from sidekick.tree import NodeOrLeaf
@@ -110,8 +111,8 @@ class WrapperMeta(type):
         from .ast_base import AST
 
         def bin_op(wrapped, other):
-            lhs: AST = unwrap(wrapped)
-            rhs = lhs._meta.coerce(unwrap(other))
+            lhs: AST = _take(wrapped)
+            rhs = lhs._meta.coerce(_take(other))
             if isinstance(rhs, lhs._meta.root):
                 return cls(fn(lhs, rhs))
             return NotImplemented
@@ -129,8 +130,8 @@ class WrapperMeta(type):
         from .ast_base import AST
 
         def bin_op(wrapped, other):
-            rhs: AST = unwrap(wrapped)
-            lhs = rhs._meta.coerce(unwrap(other))
+            rhs: AST = _take(wrapped)
+            lhs = rhs._meta.coerce(_take(other))
             return cls(fn(lhs, rhs))
 
         return bin_op
@@ -143,7 +144,7 @@ class WrapperMeta(type):
         from .ast_base import AST
 
         def unary_op(wrapped):
-            arg: AST = unwrap(wrapped)
+            arg: AST = _take(wrapped)
             return cls(fn(op, arg))
 
         return unary_op
@@ -157,8 +158,8 @@ class WrapperMeta(type):
             return None
 
         def __call__(*args, **kwargs):
-            args = map(unwrap, args)
-            kwargs = {k: unwrap(v) for k, v in kwargs.items()}
+            args = map(_take, args)
+            kwargs = {k: _take(v) for k, v in kwargs.items()}
             return cls(fn(*args, **kwargs))
 
         return __call__
@@ -172,7 +173,7 @@ class WrapperMeta(type):
             return None
 
         def __getitem__(self, idx):
-            return cls(fn(unwrap(self), unwrap(idx)))
+            return cls(fn(_take(self), _take(idx)))
 
         return __getitem__
 
@@ -185,7 +186,7 @@ class WrapperMeta(type):
             return None
 
         def __getattr__(self, attr):
-            return cls(fn(unwrap(self), unwrap(attr)))
+            return cls(fn(_take(self), _take(attr)))
 
         return __getattr__
 
@@ -201,12 +202,19 @@ class WrapperMeta(type):
 class Wrapper(metaclass=WrapperMeta):
     """
     Base Wrapper object class.
+
+    Wrapped trees are treated as immutable values. Operators on wrappers
+    share them in a copy-on-write fashion: the first time a detached tree is
+    used to build a new expression, it is inserted without copying. Later
+    uses of the same wrapper insert copies. :func:`unwrap` always returns a
+    copy of detached trees, since the caller may modify the result.
     """
 
-    __slots__ = ("__ref",)
+    __slots__ = ("__ref", "__lent")
 
     def __init__(self, obj):
         self.__ref = obj
+        self.__lent = False
 
     def __init_subclass__(cls, **kwargs):
         super().__init_subclass__()
@@ -273,10 +281,14 @@ def unwrap(obj: Wrapper):
     Remove ast from wrapper.
 
     Non-wrapped objects are returned as-is, making this function idempotent.
+    Detached trees are copied, so the result can be modified without
+    changing the wrapped expression.
     """
     if isinstance(obj, Wrapper):
         wrapped = obj._Wrapper__ref
-        if isinstance(wrapped, NodeOrLeaf) and wrapped.parent is None:
+        if isinstance(wrapped, NodeOrLeaf) and (
+            wrapped.parent is None or obj._Wrapper__lent
+        ):
             return wrapped.copy()
         return wrapped
     return obj
@@ -288,18 +300,41 @@ def unwrap_nested(obj: Wrapper):
 
     Non-wrapped objects are returned as-is, making this function idempotent.
     """
-    fn = unwrap_nested
+    return _map_nested(unwrap, obj)
+
+
+# noinspection PyUnresolvedReferences,PyProtectedMember
+def _take(obj):
+    """
+    Like unwrap(), but hand over a detached tree without copying the first
+    time it is used. The result must be inserted in a new tree that is
+    wrapped again.
+    """
     if isinstance(obj, Wrapper):
         wrapped = obj._Wrapper__ref
-        if isinstance(wrapped, NodeOrLeaf) and wrapped.parent is None:
-            return wrapped.copy()
+        if isinstance(wrapped, NodeOrLeaf):
+            if obj._Wrapper__lent:
+                return wrapped.copy()
+            if wrapped.parent is None:
+                obj._Wrapper__lent = True
         return wrapped
+    return obj
+
+
+def _take_nested(obj):
+    return _map_nested(_take, obj)
+
+
+def _map_nested(func, obj):
+    fn = partial(_map_nested, func)
+    if isinstance(obj, Wrapper):
+        return func(obj)
     elif isinstance(obj, list):
-        return list(map(unwrap_nested, obj))
+        return list(map(fn, obj))
     elif isinstance(obj, tuple):
-        return tuple(map(unwrap_nested, obj))
+        return tuple(map(fn, obj))
     elif isinstance(obj, set):
-        return set(map(unwrap_nested, obj))
+        return set(map(fn, obj))
     elif isinstance(obj, dict):
         return {fn(k): fn(v) for k, v in obj.items()}
     return obj
@@ -0,0 +1,187 @@
+"""
+Persistent cache of compiled Lark parsers.
+
+Compiling a grammar into LALR tables is by far the most expensive step of
+creating a lexer or parser. This module stores the serialized tables in a
+content-addressed directory so later processes can skip the grammar compiler.
+
+The cache location is controlled by the OX_CACHE_DIR environment variable.
+"""
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+from pathlib import Path
+
+from lark import Lark, __version__ as lark_version
+from lark.grammar import Rule
+from lark.lexer import TerminalDef
+
+from .logging import log
+
+CACHE_ENV = "OX_CACHE_DIR"
+CACHE_FORMAT = 1
+CACHE_SUFFIX = ".lark.pickle"
+
+# Options that do not change the parse tables. They are re-injected after
+# loading since they usually reference functions that cannot be pickled.
+RUNTIME_OPTIONS = {"transformer", "postlex", "lexer_callbacks", "tree_class"}
+
+
+def cache_dir(cache=None):
+    """
+    Return the cache directory for the given cache argument or None if caching
+    is disabled.
+
+    Args:
+        cache:
+            None uses the directory in the OX_CACHE_DIR environment variable,
+            if set, and disables caching otherwise. True uses OX_CACHE_DIR or
+            a default location in the user cache dir. False disables caching
+            and a string or Path selects the cache directory explicitly.
+    """
+    if cache is False:
+        return None
+    elif cache is None or cache is True:
+        path = os.environ.get(CACHE_ENV)
+        if path:
+            return Path(path).expanduser()
+        elif cache is None:
+            return None
+        base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+        return Path(base) / "ox"
+    return Path(cache).expanduser()
+
+
+def grammar_key(grammar: str, options: dict) -> str:
+    """
+    Content-addressed key for the given grammar and Lark options.
+    """
+    static = {k: v for k, v in options.items() if k not in RUNTIME_OPTIONS}
+    data = [CACHE_FORMAT, lark_version, grammar, sorted(static.items())]
+    data = json.dumps(data, default=repr, sort_keys=True)
+    return hashlib.sha256(data.encode("utf8")).hexdigest()
+
+
+def is_cacheable(options: dict) -> bool:
+    """
+    Return True if a Lark instance created with the given options can be
+    stored in the cache.
+    """
+    return (
+        options.get("parser", "earley") == "lalr"
+        and not options.get("edit_terminals")
+        and not options.get("postlex")
+    )
+
+
+def load_lark(grammar, cache=None, **options) -> Lark:
+    """
+    Create a Lark instance, reusing compiled tables from cache if possible.
+
+    Accept the same arguments as the Lark constructor, with an additional
+    cache argument as in :func:`cache_dir`.
+    """
+    if hasattr(grammar, "read"):
+        grammar = grammar.read()
+
+    path = cache_dir(cache)
+    if path is None or not is_cacheable(options):
+        return Lark(grammar, **options)
+
+    path = path / (grammar_key(grammar, options) + CACHE_SUFFIX)
+    try:
+        with open(path, "rb") as fd:
+            data, memo = pickle.load(fd)
+        return deserialize_lark(data, memo, options)
+    except FileNotFoundError:
+        log.debug(f"cache miss: {path}")
+    except Exception as exc:
+        log.info(f"invalid cache file {path}: {exc}")
+
+    lark = Lark(grammar, **options)
+    try:
+        save_lark(lark, path)
+    except OSError as exc:
+        log.info(f"could not write cache file {path}: {exc}")
+    return lark
+
+
+def save_lark(lark: Lark, path: Path):
+    """
+    Save serialized Lark tables to the given path.
+
+    File is written atomically, so concurrent processes never observe a
+    partially written cache entry.
+    """
+    data, memo = serialize_lark(lark)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=str(path.parent), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            pickle.dump((data, memo), file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, str(path))
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def serialize_lark(lark: Lark):
+    """
+    Serialize Lark instance into a (data, memo) pair of plain Python objects.
+
+    Runtime options are stripped from the result.
+    """
+    data, memo = lark.memo_serialize([TerminalDef, Rule])
+    options = data["options"]
+    data["options"] = {k: v for k, v in options.items() if k not in RUNTIME_OPTIONS}
+    return data, memo
+
+
+def deserialize_lark(data, memo, options) -> Lark:
+    """
+    Re-create Lark instance from serialized data.
+
+    Options must contain the runtime options (transformer, lexer callbacks,
+    etc) since those are not stored with the data.
+    """
+    callbacks = options.get("lexer_callbacks") or {}
+    data = dict(data)
+    data["options"] = {
+        **data["options"],
+        "lexer_callbacks": callbacks,
+        "tree_class": options.get("tree_class"),
+    }
+    namespace = {"Rule": Rule, "TerminalDef": TerminalDef}
+    transformer = options.get("transformer")
+    lark = Lark.deserialize(data, namespace, memo, transformer=transformer)
+
+    # Lark does not restore lexer callbacks nor the attributes required by the
+    # Lark.lex() method.
+    frontend = lark.parser
+    lexer_conf = frontend.lexer_conf
+    lexer_conf.callbacks = callbacks
+    if callbacks:
+        frontend.init_lexer()
+    lark.lexer_conf = lexer_conf
+    lark.terminals = lexer_conf.tokens
+    lark.ignore_tokens = lexer_conf.ignore
+    lark._terminals_dict = {t.name: t for t in lark.terminals}
+    return lark
+
+
+def clear_cache(cache=True) -> int:
+    """
+    Remove all cached grammars from the cache directory.
+
+    Return the number of removed entries.
+    """
+    path = cache_dir(cache)
+    if path is None or not path.exists():
+        return 0
+    n = 0
+    for entry in path.glob("*" + CACHE_SUFFIX):
+        entry.unlink()
+        n += 1
+    return n
@@ -1,3 +1,15 @@
+"""
+Command line interface for ox.
+"""
+
+import argparse
+import importlib
+import importlib.util
+import os
+import sys
+from pathlib import Path
+
+
 def parser_interact(lexer, parser, *args):
     """
     Keep asking a new expression and prints the resulting parse tree.
@@ -38,5 +50,78 @@ def lexer_interact(lexer):
             break
 
 
-def main():
-    raise SystemExit("Cli is not yet implemented")
+def load_source(source):
+    """
+    Load object from a "module[:attr]" or "path/to/file.py[:attr]" string.
+
+    If attr is not given, return the single parser defined in module.
+    """
+    from .parser import LarkParser
+
+    path, _, attr = source.partition(":")
+    if path.endswith(".py") or os.path.exists(path):
+        name = Path(path).stem
+        spec = importlib.util.spec_from_file_location(name, path)
+        mod = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(mod)
+    else:
+        mod = importlib.import_module(path)
+
+    if attr:
+        return mod, attr, getattr(mod, attr)
+    parsers = [(k, v) for k, v in vars(mod).items() if isinstance(v, LarkParser)]
+    if len(parsers) != 1:
+        raise SystemExit(f"{source}: could not find a single parser, specify attr")
+    ((attr, value),) = parsers
+    return mod, attr, value
+
+
+def freeze_command(args):
+    """
+    Implement the "ox freeze" command.
+    """
+    from .freeze import freeze
+
+    mod, attr, parser = load_source(args.source)
+    src = freeze(parser, name=args.name or attr, module=mod.__name__)
+    if args.output in (None, "-"):
+        sys.stdout.write(src)
+    else:
+        with open(args.output, "w", encoding="utf8") as fd:
+            fd.write(src)
+
+
+def make_argparser():
+    """
+    Create argument parser for the ox command.
+    """
+    argparser = argparse.ArgumentParser(prog="ox", description=__doc__)
+    commands = argparser.add_subparsers(dest="command")
+    commands.required = True
+
+    freeze = commands.add_parser(
+        "freeze",
+        help="compile parser into a standalone module",
+        description="Emit a standalone module that creates parser from "
+        "precomputed tables, without invoking Lark's grammar compiler.",
+    )
+    freeze.add_argument("source", help='module or file with parser ("mod[:attr]")')
+    freeze.add_argument("-o", "--output", help="output file (default: stdout)")
+    freeze.add_argument("-n", "--name", help="name of the parser in output module")
+    freeze.set_defaults(func=freeze_command)
+    return argparser
+
+
+def main(argv=None):
+    """
+    Entry point for the ox command.
+    """
+    args = make_argparser().parse_args(argv)
+    try:
+        args.func(args)
+    except ValueError as exc:
+        raise SystemExit(f"error: {exc}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,335 @@
+"""
+Ahead-of-time compilation of ox parsers into standalone Python modules.
+
+A frozen module stores the precomputed LALR tables, the lexer regexes and the
+source code of all callback functions. Importing it creates a ready parser
+without invoking Lark's grammar compiler.
+"""
+
+import builtins
+import inspect
+import io
+import textwrap
+import tokenize
+import types
+from pprint import pformat
+
+from .cache import serialize_lark, deserialize_lark
+from .lexer import make_callbacks
+from .parser import LarkParser, make_transformer
+
+CONSTANT_TYPES = (type(None), bool, int, float, complex, str, bytes)
+CONTAINER_TYPES = (tuple, list, set, frozenset, dict)
+
+TEMPLATE = '''\
+"""
+Frozen parser generated from {source} by "ox freeze".
+
+Do not edit this file by hand. Regenerate it from the source grammar instead.
+"""
+from ox.freeze import load_frozen
+
+{definitions}
+
+RULE_FUNCTIONS = {rule_functions}
+
+TOKEN_FUNCTIONS = {token_functions}
+
+KEYWORDS = {keywords}
+
+DATA = {data}
+
+MEMO = {memo}
+
+{name} = load_frozen(DATA, MEMO, RULE_FUNCTIONS, TOKEN_FUNCTIONS, KEYWORDS)
+'''
+
+
+def load_frozen(
+    data, memo, rule_functions, token_functions, keywords=None
+) -> LarkParser:
+    """
+    Create parser from the frozen tables, callbacks and keyword tables.
+
+    This is the function called by the modules created with :func:`freeze`.
+    """
+    callbacks = make_callbacks(token_functions, keywords)
+    options = {"lexer_callbacks": callbacks}
+    if rule_functions:
+        options["transformer"] = make_transformer(rule_functions)
+    parser = LarkParser.from_lark(deserialize_lark(data, memo, options))
+    parser.rule_functions = rule_functions
+    parser.token_functions = token_functions
+    parser.keywords = keywords or {}
+    return parser
+
+
+def freeze(parser: LarkParser, name="parser", module=None) -> str:
+    """
+    Return the source code of a standalone module that re-creates parser.
+
+    Args:
+        parser:
+            A parser created with :func:`ox.parser`.
+        name:
+            Name of the variable that holds the parser in the frozen module.
+        module:
+            Name of the module that defines the parser. Functions defined in
+            this module are copied as source code, since importing it would
+            compile the grammar again.
+    """
+    lark = parser.grammar
+    if lark.options.parser != "lalr":
+        raise ValueError("only LALR parsers can be frozen")
+
+    rule_functions = parser.rule_functions or {}
+    if lark.options.transformer is not None and not rule_functions:
+        raise ValueError("cannot freeze parser with a custom transformer")
+
+    emitter = Emitter(module)
+    rules = emitter.function_map(rule_functions, "rule")
+    tokens = emitter.function_map(parser.token_functions or {}, "token")
+    data, memo = serialize_lark(lark)
+
+    return TEMPLATE.format(
+        source=module or "<unknown>",
+        definitions="\n".join(emitter.lines).strip("\n"),
+        rule_functions=rules,
+        token_functions=tokens,
+        keywords=pformat(parser.keywords or {}),
+        data=pformat(data),
+        memo=pformat(memo),
+        name=name,
+    )
+
+
+class Emitter:
+    """
+    Collect definitions required to re-create a set of functions in a
+    standalone module.
+    """
+
+    def __init__(self, module=None):
+        self.module = module
+        self.lines = []
+        self.names = {}
+        self.bound = {}
+
+    def function_map(self, functions: dict, prefix) -> str:
+        """
+        Emit all functions in the mapping and return the source of a dict
+        literal that maps the original keys to the emitted expressions.
+        """
+        items = []
+        for key, func in functions.items():
+            expr = self.expr(func, f"_{prefix}_{key}")
+            items.append(f"    {key!r}: {expr},")
+        if not items:
+            return "{}"
+        return "\n".join(["{", *items, "}"])
+
+    def expr(self, obj, name=None) -> str:
+        """
+        Return a source code expression that evaluates to obj.
+
+        Objects that cannot be expressed as literals are bound to a name in the
+        module definitions.
+        """
+        if id(obj) in self.names:
+            return self.names[id(obj)]
+
+        qualname = getattr(obj, "__qualname__", None)
+        module = getattr(obj, "__module__", None)
+        if module == "builtins" and getattr(builtins, qualname, None) is obj:
+            return qualname
+        elif isinstance(obj, CONSTANT_TYPES):
+            return repr(obj)
+        elif isinstance(obj, CONTAINER_TYPES):
+            return self.container_expr(obj)
+        elif isinstance(obj, types.ModuleType):
+            name = self.bind(name or obj.__name__, obj)
+            self.lines.append(f"import {obj.__name__} as {name}")
+        elif isinstance(obj, types.FunctionType) and self.is_local(obj):
+            if obj.__name__ == "<lambda>":
+                name = self.bind(name or "_lambda", obj)
+            elif obj.__name__ in self.bound:
+                raise ValueError(f"name conflict while freezing {obj.__name__!r}")
+            else:
+                name = self.bind(obj.__name__, obj)
+            self.emit_globals(obj)
+            self.lines.extend(["", "", function_source(obj, name)])
+        elif is_importable(obj):
+            name = self.bind(name or qualname, obj)
+            self.lines.append(f"from {module} import {qualname} as {name}")
+        else:
+            raise ValueError(f"cannot freeze object: {obj!r}")
+        return name
+
+    def container_expr(self, obj) -> str:
+        """
+        Source code for a container literal.
+        """
+        if isinstance(obj, dict):
+            items = (f"{self.expr(k)}: {self.expr(v)}" for k, v in obj.items())
+            return "{%s}" % ", ".join(items)
+
+        items = ", ".join(map(self.expr, obj))
+        if isinstance(obj, list):
+            return f"[{items}]"
+        elif isinstance(obj, tuple):
+            return f"({items},)" if len(obj) == 1 else f"({items})"
+        elif isinstance(obj, set) and obj:
+            return "{%s}" % items
+        return "%s({%s})" % (type(obj).__name__, items)
+
+    def emit_globals(self, func):
+        """
+        Emit all global names referenced by function.
+        """
+        if func.__closure__:
+            raise ValueError(f"cannot freeze closure: {func.__qualname__}")
+
+        namespace = func.__globals__
+        for name in referenced_names(func.__code__):
+            if name not in namespace:
+                continue
+            value = namespace[name]
+            if name in self.bound:
+                if self.bound[name] is value:
+                    continue
+                raise ValueError(f"name conflict while freezing global {name!r}")
+            expr = self.expr(value, name)
+            if expr != name:
+                self.bound[name] = value
+                self.lines.append(f"{name} = {expr}")
+
+    def bind(self, name, obj) -> str:
+        """
+        Bind object to a fresh name derived from the given name.
+        """
+        name = "".join(c if c.isalnum() else "_" for c in name)
+        if name[0].isdigit():
+            name = "_" + name
+        new, i = name, 1
+        while new in self.bound or new == "load_frozen":
+            new, i = f"{name}_{i}", i + 1
+        self.bound[new] = obj
+        self.names[id(obj)] = new
+        return new
+
+    def is_local(self, func) -> bool:
+        """
+        True if function must be frozen from source code rather than imported.
+        """
+        return (
+            func.__module__ == self.module
+            or func.__name__ == "<lambda>"
+            or not is_importable(func)
+        )
+
+
+#
+# Utility functions
+#
+def function_source(func, name) -> str:
+    """
+    Return the source code for a statement that binds function to name.
+    """
+    try:
+        if func.__name__ == "<lambda>":
+            return f"{name} = {lambda_source(func)}"
+        return textwrap.dedent(inspect.getsource(func)).rstrip()
+    except OSError:
+        raise ValueError(f"source code not available for {func!r}")
+
+
+def lambda_source(func) -> str:
+    """
+    Extract source code of lambda function.
+
+    Each lambda that starts in the first line of the function is extended
+    token by token until its source compiles to the code of func.
+    """
+    code = func.__code__
+    lines, _ = inspect.findsource(code)
+    src = "".join(lines[code.co_firstlineno - 1 :])
+    tokens = source_tokens(src)
+    offsets = [0]
+    for line in src.splitlines(True):
+        offsets.append(offsets[-1] + len(line))
+
+    candidates = []
+    for i, tk in enumerate(tokens):
+        if tk.string == "lambda" and tk.start[0] == 1:
+            for end_tk in tokens[i + 1 :]:
+                row, col = end_tk.end
+                segment = src[tk.start[1] : offsets[row - 1] + col]
+                if compiles_to(segment, code):
+                    candidates.append(segment)
+                    break
+                if end_tk.type == tokenize.NEWLINE:
+                    break
+    if len(candidates) != 1:
+        raise ValueError(f"could not find the source of {func!r}")
+    (segment,) = candidates
+    return f"({segment})" if "\n" in segment else segment
+
+
+def source_tokens(src) -> list:
+    """
+    Tokenize source up to the first tokenization error.
+
+    Source may start in the middle of a statement, which may make indentation
+    inconsistent further down.
+    """
+    tokens = []
+    try:
+        for tk in tokenize.generate_tokens(io.StringIO(src).readline):
+            tokens.append(tk)
+    except (tokenize.TokenError, IndentationError):
+        pass
+    return tokens
+
+
+def compiles_to(src, code) -> bool:
+    """
+    Check if the source of a lambda expression compiles to the given code.
+    """
+    try:
+        consts = compile(f"({src})", "<lambda>", "eval").co_consts
+    except SyntaxError:
+        return False
+    lambda_code = next(c for c in consts if inspect.iscode(c))
+    return (
+        lambda_code.co_code == code.co_code
+        and lambda_code.co_varnames == code.co_varnames
+        and lambda_code.co_names == code.co_names
+    )
+
+
+def referenced_names(code):
+    """
+    Yield all global names referenced in code object and its nested code.
+    """
+    yield from code.co_names
+    for const in code.co_consts:
+        if inspect.iscode(const):
+            yield from referenced_names(const)
+
+
+def is_importable(obj) -> bool:
+    """
+    Check if object can be imported from its module by its qualified name.
+    """
+    module = getattr(obj, "__module__", None)
+    qualname = getattr(obj, "__qualname__", "")
+    if not module or module == "__main__" or "<" in qualname:
+        return False
+    try:
+        mod = __import__(module, fromlist=["_"])
+        value = mod
+        for part in qualname.split("."):
+            value = getattr(value, part)
+    except (ImportError, AttributeError):
+        return False
+    return value is obj
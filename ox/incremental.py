@@ -0,0 +1,316 @@
+"""
+Incremental parsing for editors and language servers.
+
+An IncrementalParser keeps the tokens of the last parsed source and a
+snapshot of the LALR parser stacks before each token. After an edit, parsing
+resumes from the snapshot before the first modified token and stops as soon as
+the parser reaches an old token after the edit in the same state it had
+before. From there on, only the reductions that involve the parser stack
+below that point are computed again.
+"""
+from lark import Token, UnexpectedCharacters, UnexpectedToken
+from lark.parsers.lalr_analysis import Shift
+
+from .lexer import Edit, StreamScanner, relex_start
+from .parser import LarkParser
+from .tokens import TokenList
+
+
+class IncrementalParser:
+    """
+    Parse a source and update the result after each text edit.
+
+    Parser stacks are stored as linked lists of [state, value, parent, height]
+    nodes, so snapshots share all common nodes. Values that do not depend on
+    the edited region are reused, which requires that rule functions do not
+    mutate their arguments. Reused values keep the tokens, and hence the
+    positions, from the parse that created them.
+
+    Tokens are chosen from the parser state, like in :meth:`LarkParser.parse`,
+    when the grammar uses the default contextual lexer.
+
+    Args:
+        parser:
+            A LALR parser created with :func:`ox.parser`.
+        source:
+            Initial source code.
+        start:
+            Start rule, for grammars with several start symbols.
+    """
+
+    def __init__(self, parser: LarkParser, source="", start=None):
+        lark = parser.grammar
+        if lark.options.parser != "lalr":
+            raise ValueError("incremental parsing requires a LALR parser")
+        if lark.options.postlex:
+            raise ValueError("incremental parsing does not support postlex")
+        if start is None:
+            start, *other = lark.options.start
+            if other:
+                raise ValueError("grammar has many starts: start must be given")
+
+        lalr = lark.parser.parser.parser
+        self.parser = parser
+        self.lexer = lark.parser.lexer
+        self.lexers = getattr(self.lexer, "lexers", None)
+        self.root_lexer = getattr(self.lexer, "root_lexer", self.lexer)
+        self.states = lalr.states
+        self.callbacks = lalr.callbacks
+        self.start_state = lalr.start_states[start]
+        self.source = ""
+        self.tokens = TokenList()
+        self.checkpoints = []
+        self.result = None
+        self.parse(source)
+
+    def parse(self, source):
+        """
+        Parse source from scratch and return the result.
+        """
+        return self._update(source, 0, len(source), 0)
+
+    def edit(self, offset, deleted=0, inserted=""):
+        """
+        Replace deleted characters at offset by the inserted string and return
+        the new parse result.
+
+        The previous state is kept if the edited source has a syntax error.
+        """
+        edit = Edit(offset, deleted, inserted)
+        if not 0 <= offset <= offset + deleted <= len(self.source):
+            raise ValueError(f"edit out of range: {edit}")
+
+        source = edit.apply(self.source)
+        return self._update(source, offset, offset + len(inserted), edit.delta)
+
+    def _update(self, source, offset, edit_end, delta):
+        """
+        Parse source after an edit that changed old text at offset into
+        source[offset:edit_end].
+
+        Old nodes are patched in place when the new parse reaches them. Those
+        changes are undone if parsing fails.
+        """
+        tokens, checkpoints = self.tokens, self.checkpoints
+        size = len(tokens)
+        start, pos, line, line_start = relex_start(tokens, offset)
+        stack = checkpoints[start] if checkpoints else [self.start_state, None, None, 0]
+
+        # Each replacement (lo, hi, new_tokens, new_checkpoints) substitutes
+        # the old checkpoints[lo:hi] and the tokens in the same range.
+        replacements = []
+        shifted = None
+        undo = []
+        try:
+            i = start
+            while True:
+                stack, new_tokens, new_checkpoints, sync, tk = self._relex(
+                    source, pos, line, line_start, stack, i, edit_end, delta
+                )
+                if sync is None:
+                    new_checkpoints.append(stack)
+                    replacements.append((i, size + 1, new_tokens, new_checkpoints))
+                    break
+                replacements.append((i, sync, new_tokens, new_checkpoints))
+                if shifted is None:
+                    shifted = tokens.shift(sync, delta, tk.line, tk.column)
+
+                stack, i = self._reuse(stack, sync, shifted, undo)
+                if i is None:
+                    break
+                # The parser state diverged: tokenize again after the
+                # last reused token, whose shift produced stack.
+                tk = shifted[i - 1]
+                pos = tk.pos_in_stream + len(tk)
+                line = tk.end_line
+                line_start = pos - tk.end_column + 1
+
+            new_tokens, new_checkpoints = self._splice(
+                start, replacements, tokens if shifted is None else shifted
+            )
+            result = self._finish(new_checkpoints[-1], new_tokens)
+        except BaseException:
+            for node, value, parent in reversed(undo):
+                node[1], node[2] = value, parent
+            raise
+
+        self.source, self.tokens, self.checkpoints = source, new_tokens, new_checkpoints
+        self.result = result
+        return result
+
+    def _splice(self, start, replacements, tokens):
+        """
+        Return the new token list and the new list of checkpoints.
+
+        Old tokens that were not replaced are taken from tokens, in which they
+        have already been moved to their new positions.
+        """
+        checkpoints = self.checkpoints
+        new_checkpoints = checkpoints[:start]
+        prev = start
+        for lo, hi, _, cps in replacements:
+            new_checkpoints.extend(checkpoints[prev:lo])
+            new_checkpoints.extend(cps)
+            prev = hi
+        new_checkpoints.extend(checkpoints[prev:])
+        for lo, hi, new, _ in reversed(replacements):
+            tokens = tokens.splice(lo, hi, new)
+        return tokens, new_checkpoints
+
+    def _relex(self, source, pos, line, line_start, stack, j, edit_end, delta):
+        """
+        Tokenize and parse source from pos.
+
+        Stop before the first token after edit_end that starts at the position
+        of an old token j' >= j that was parsed from a stack with the same state
+        and height.
+
+        Return the new stack, the new tokens and the checkpoints before each
+        of them, j' and the token found at its position, or None for both if
+        the end of input was reached.
+        """
+        old_tokens, old_checkpoints = self.tokens, self.checkpoints
+        size = len(old_tokens)
+        lexers = self.lexers
+        scanner = StreamScanner(self.root_lexer)
+        scan = scanner.scan(source, pos, line, line_start)
+        new_tokens, new_checkpoints = [], []
+        process = self._process
+
+        while True:
+            if lexers is not None:
+                scanner.lexer = lexer = lexers[stack[0]]
+                scanner.match = lexer.match
+            try:
+                tk = next(scan, None)
+            except UnexpectedCharacters as exc:
+                raise self._lexer_error(source, exc, stack[0])
+            if tk is None:
+                return stack, new_tokens, new_checkpoints, None, None
+
+            if tk.pos_in_stream >= edit_end:
+                old_pos = tk.pos_in_stream - delta
+                while j < size and old_tokens[j].pos_in_stream < old_pos:
+                    j += 1
+                if j < size and old_tokens[j].pos_in_stream == old_pos:
+                    old = old_checkpoints[j]
+                    if old[0] == stack[0] and old[3] == stack[3]:
+                        return stack, new_tokens, new_checkpoints, j, tk
+
+            new_checkpoints.append(stack)
+            new_tokens.append(tk)
+            stack = process(stack, tk)
+
+    def _reuse(self, stack, i, tokens, undo):
+        """
+        Continue parsing from an old checkpoint i whose top node has the same
+        state and height as stack.
+
+        The old top node takes the value and parent of the new stack and the
+        parser jumps to the token that pops it from the stack, repeating the
+        process for the node produced by that token.
+
+        Return the stack before the end of input and None, or the new stack
+        and the index of the next old checkpoint if parser states diverge.
+        """
+        checkpoints = self.checkpoints
+        end = len(checkpoints) - 1
+        while True:
+            node = checkpoints[i]
+            if stack is not node:
+                if node[0] != stack[0] or node[3] != stack[3]:
+                    return stack, i
+                undo.append((node, node[1], node[2]))
+                node[1], node[2] = stack[1], stack[2]
+
+            i = self._popped_at(node, i)
+            if i == end:
+                return checkpoints[i], None
+            stack = self._process(checkpoints[i], tokens[i])
+            i += 1
+
+    def _popped_at(self, node, i):
+        """
+        Return the index of the last old checkpoint, starting from i, in which
+        node is still in the stack.
+        """
+        checkpoints = self.checkpoints
+        height = node[3]
+
+        def contains(k):
+            top = checkpoints[k]
+            while top[3] > height:
+                top = top[2]
+            return top is node
+
+        # Exponential search: most nodes are popped after a few tokens
+        last = len(checkpoints) - 1
+        step = 1
+        while i + step <= last and contains(i + step):
+            i += step
+            step *= 2
+        hi = min(i + step, last + 1)
+        while hi - i > 1:
+            mid = (i + hi) // 2
+            if contains(mid):
+                i = mid
+            else:
+                hi = mid
+        return i
+
+    def _process(self, stack, token):
+        """
+        Apply all reductions triggered by token and shift it.
+        """
+        action = self._action
+        while True:
+            kind, arg = action(stack, token)
+            if kind is Shift:
+                return [arg, token, stack, stack[3] + 1]
+            stack = self._reduce(stack, arg)
+
+    def _finish(self, stack, tokens):
+        """
+        Reduce stack at the end of input and return the parse result.
+        """
+        if tokens:
+            end = Token.new_borrow_pos("$END", "", tokens[-1])
+        else:
+            end = Token("$END", "", 0, 1, 1)
+        while True:
+            kind, arg = self._action(stack, end)
+            if kind is Shift:
+                return stack[1]
+            stack = self._reduce(stack, arg)
+
+    def _action(self, stack, token):
+        state = stack[0]
+        try:
+            return self.states[state][token.type]
+        except KeyError:
+            expected = [s for s in self.states[state].keys() if s.isupper()]
+            raise UnexpectedToken(token, expected, state=state)
+
+    def _reduce(self, stack, rule):
+        values = []
+        for _ in rule.expansion:
+            values.append(stack[1])
+            stack = stack[2]
+        values.reverse()
+        value = self.callbacks[rule](values)
+        _, state = self.states[stack[0]][rule.origin.name]
+        return [state, value, stack, stack[3] + 1]
+
+    def _lexer_error(self, source, exc, state):
+        """
+        Report text matched by a terminal that is not accepted in the current
+        state as an unexpected token, like Lark's contextual lexer does.
+        """
+        if self.lexers is None:
+            return exc
+        match = self.root_lexer.match(source, exc.pos_in_stream)
+        if not match:
+            return exc
+        value, type_ = match
+        token = Token(type_, value, exc.pos_in_stream, exc.line, exc.column)
+        return UnexpectedToken(token, exc.allowed, state=state)
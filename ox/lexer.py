@@ -1,36 +1,744 @@
+import codecs
+import mmap
 import re
+from collections import namedtuple
+from functools import partial
 
-import sidekick as sk
-from lark import Lark, Token, Visitor, UnexpectedToken
-from typing import Callable, Any
+from lark import Lark, Token, Visitor, UnexpectedToken, UnexpectedCharacters
+from lark.exceptions import LexError
+from lark.lexer import PatternRE, TerminalDef, TraditionalLexer
+from sidekick import fn
+from typing import Callable, Any, AsyncIterator, Iterator, List
 
+from .cache import load_lark
 from .grammar import load_grammar
+from .lines import LineIndex
+from .partial import PrefixMatcher
+from .tokens import TokenList, TokenStream, scan_matches
 
-LARK_GRAMMAR = load_grammar("lark")
-TOKEN, = [x for x in LARK_GRAMMAR.terminals if x.name == "TOKEN"]
-TOKEN = TOKEN.pattern.to_regexp()
+# Same as the TOKEN terminal in Lark's own grammar. It is declared here to
+# avoid compiling the meta-grammar at import time.
+TOKEN = "_?[A-Z][_A-Z0-9]*"
 TOKEN_EXT = re.compile(r"(?P<skip>_)?(?P<name>" + TOKEN + r"?)(?P<priority>_\d+_)?")
 
+# Default size of chunks read from file objects and number of characters the
+# streaming lexer requires after a match before accepting it.
+CHUNK_SIZE = 64 * 1024
+LOOKAHEAD = 64
 
-class Lexer:
+# Sources scanned directly as binary data, without decoding to str.
+BYTES_TYPES = (bytes, bytearray, memoryview, mmap.mmap)
+
+
+class Lexer(fn):
     """
-    Base lexer class and interface.
+    Lexer created from token declarations.
+
+    Lexers are callable and accept a string, a file object or an iterable of
+    string chunks. Streams are tokenized incrementally, keeping in memory only
+    the current chunk and the unfinished token at its end.
     """
 
     grammar: str
+    functions: dict
     lexer_callbacks: dict
+    keywords: dict
+
+    # noinspection PyShadowingNames
+    def __init__(
+        self, lark: Lark, grammar: str, functions: dict = None, keywords: dict = None
+    ):
+        # fn.__init__ resets the instance __dict__
+        super().__init__(self.lex)
+        self.lark = lark
+        self.grammar = grammar
+        self.functions = functions or {}
+        self.keywords = keywords or {}
+        self.lexer_callbacks = lark.lexer_conf.callbacks
+        self._lexer = None
+
+    def lex(self, src) -> Iterator[Token]:
+        """
+        Return an iterator over tokens of the given source.
+        """
+        if isinstance(src, str):
+            return self.lark.lex(src)
+        elif isinstance(src, BYTES_TYPES):
+            return self.lex_bytes(src)
+        return self.lex_stream(src)
+
+    def lex_offsets(self, src: str) -> Iterator["OffsetToken"]:
+        """
+        Tokenize string without computing line and column numbers.
+
+        Produce OffsetToken instances that only store the start and end offsets
+        of each token. Lines and columns are computed on demand from a
+        LineIndex shared by all tokens of the source.
+        """
+        return OffsetScanner(self.traditional_lexer()).scan(src)
+
+    def lex_bytes(self, data) -> Iterator["LazyToken"]:
+        """
+        Tokenize UTF-8 encoded bytes, memoryview or mmap without decoding it.
+
+        Produce LazyToken instances that decode their value only when it is
+        accessed. Positions and columns are measured in bytes and character
+        classes such as \\w or \\s only match ASCII characters.
+        """
+        return BytesScanner(self.traditional_lexer()).scan(data)
+
+    def lex_stream(self, stream, chunk_size=CHUNK_SIZE) -> Iterator[Token]:
+        """
+        Tokenize a file object or an iterable of chunks of text.
+
+        Binary files and bytes chunks are decoded as UTF-8.
+        """
+        if hasattr(stream, "read"):
+            file = stream
+            chunks = iter(lambda: file.read(chunk_size), file.read(0))
+        else:
+            chunks = stream
+        scanner = self.scanner()
+        for chunk in chunks:
+            yield from scanner.feed(chunk)
+        yield from scanner.close()
+
+    async def aiter(self, stream, chunk_size=CHUNK_SIZE) -> AsyncIterator[Token]:
+        """
+        Asynchronously tokenize an asyncio.StreamReader or an async iterable
+        of chunks of text.
+
+        Tokens are yielded as soon as the data that completes them arrives.
+        Bytes chunks are decoded as UTF-8.
+        """
+        if hasattr(stream, "read"):
+            chunks = read_chunks(stream, chunk_size)
+        else:
+            chunks = stream
+        scanner = self.scanner()
+        async for chunk in chunks:
+            for tk in scanner.feed(chunk):
+                yield tk
+        for tk in scanner.close():
+            yield tk
+
+    def token_stream(self, src: str) -> TokenStream:
+        """
+        Tokenize string into a compact TokenStream.
+
+        Tokens are stored in arrays and only created when the stream is
+        indexed or iterated.
+        """
+        return TokenStream.scan(self.traditional_lexer(), src)
+
+    def relex(self, tokens, edit, source: str) -> "Relexed":
+        """
+        Update a list of tokens produced by this lexer after a text edit.
+
+        Only the region around the edit is tokenized again. The remaining
+        tokens are moved to their new positions lazily, when accessed.
+
+        Args:
+            tokens:
+                Tokens of the source before the edit.
+            edit:
+                An :class:`Edit` or a (offset, deleted, inserted) tuple.
+            source:
+                Source code after the edit.
+
+        Returns:
+            A (tokens, start, old_stop, new_stop) tuple, in which tokens is the
+            new :class:`ox.tokens.TokenList`. Only old tokens[start:old_stop]
+            were replaced by new tokens[start:new_stop], which is useful to
+            limit redrawing in syntax highlighters.
+        """
+        edit = Edit(*edit)
+        if not 0 <= edit.offset <= len(source) - len(edit.inserted):
+            raise ValueError(f"edit out of range: {edit}")
+        return relex_tokens(self.traditional_lexer(), tokens, source, edit)
+
+    def scanner(self, lookahead=LOOKAHEAD) -> "StreamScanner":
+        """
+        Return a push-based scanner that tokenizes text fed to it in chunks.
+        """
+        return StreamScanner(self.traditional_lexer(), lookahead=lookahead)
+
+    def traditional_lexer(self) -> TraditionalLexer:
+        """
+        Return the Lark lexer that holds the compiled regexes and callbacks.
+        """
+        if self._lexer is None:
+            conf = self.lark.lexer_conf
+            self._lexer = TraditionalLexer(
+                conf.tokens, ignore=conf.ignore, user_callbacks=conf.callbacks
+            )
+        return self._lexer
+
+
+class RegexLexer(Lexer):
+    """
+    Lexer that scans strings with a single regular expression.
+
+    Created by :func:`lexer` with engine="re". Rules are joined into a pattern
+    with one named group per token type, in the same order of precedence used
+    by Lark, and no Lark grammar or parser is built. Streams and binary
+    sources are scanned by the Lark lexer compiled from the same rules.
+    """
+
+    # noinspection PyMissingConstructor
+    def __init__(
+        self,
+        rules: List["Lex"],
+        grammar: str,
+        functions: dict = None,
+        keywords: dict = None,
+    ):
+        fn.__init__(self, self.lex)
+        self.lark = None
+        self.grammar = grammar
+        self.functions = functions or {}
+        self.keywords = keywords or {}
+        self.lexer_callbacks = make_callbacks(self.functions, self.keywords)
+        self._value_callbacks = make_callbacks(self.functions)
+        terminals = [rule.terminal_def() for rule in rules]
+        ignore = [rule.name for rule in rules if rule.ignore]
+        try:
+            self._lexer = TraditionalLexer(
+                terminals, ignore=ignore, user_callbacks=self.lexer_callbacks
+            )
+        except LexError as exc:
+            raise ValueError(f"invalid token declarations: {exc}")
+
+        terminals = self._lexer.terminals
+        self.regex = re.compile(
+            "|".join(f"(?P<{t.name}>{t.pattern.to_regexp()})" for t in terminals)
+        )
+        self.ignore_types = frozenset(ignore)
+        self.newline_types = frozenset(self._lexer.newline_types)
+
+    def lex(self, src) -> Iterator[Token]:
+        if isinstance(src, str):
+            return self.scan(src)
+        return super().lex(src)
+
+    def scan(self, src: str) -> Iterator[Token]:
+        """
+        Iterate over the tokens of a string.
+        """
+        new_str = str.__new__
+        callbacks = self._value_callbacks
+        keywords = self.keywords
+        ignore_types = self.ignore_types
+        last_token = None
+
+        def error(pos, line, column):
+            self._error(src, pos, line, column, last_token)
+
+        matches = scan_matches(
+            self._match,
+            src,
+            newline_types=self.newline_types,
+            skip_types=ignore_types - self.lexer_callbacks.keys(),
+            error=error,
+        )
+        for type_, value, pos, line, column, end_line, end_column in matches:
+            if type_ in keywords:
+                type_ = keywords[type_].get(value, type_)
+            if type_ in ignore_types:
+                if type_ in callbacks:
+                    callbacks[type_](Token(type_, value, pos, line, column))
+                continue
+
+            # Token.__new__ is a Python function: filling the slots here is
+            # about twice as fast.
+            tk = new_str(Token, value)
+            tk.type = type_
+            tk.value = value
+            tk.pos_in_stream = pos
+            tk.line = line
+            tk.column = column
+            tk.end_line = end_line
+            tk.end_column = end_column
+            if type_ in callbacks:
+                tk = callbacks[type_](tk)
+            last_token = tk
+            yield tk
+
+    def lex_offsets(self, src: str) -> Iterator["OffsetToken"]:
+        new_str = str.__new__
+        callbacks = self._value_callbacks
+        keywords = self.keywords
+        ignore_types = self.ignore_types
+        lines = LineIndex(src)
+        last_token = None
+
+        def error(pos, line, column):
+            self._error(src, pos, *lines.position(pos), last_token)
+
+        matches = scan_matches(
+            self._match,
+            src,
+            skip_types=ignore_types - self.lexer_callbacks.keys(),
+            error=error,
+        )
+        for type_, value, pos, *_ in matches:
+            if type_ in keywords:
+                type_ = keywords[type_].get(value, type_)
+            tk = new_str(OffsetToken, value)
+            tk.type = type_
+            tk.value = value
+            tk.pos_in_stream = pos
+            tk.size = len(value)
+            tk.lines = lines
+            if type_ not in ignore_types:
+                if type_ in callbacks:
+                    tk = callbacks[type_](tk)
+                last_token = tk
+                yield tk
+            elif type_ in callbacks:
+                callbacks[type_](tk)
+
+    def _match(self, text, pos):
+        m = self.regex.match(text, pos)
+        return m and (m.group(), m.lastgroup)
+
+    def _error(self, src, pos, line, column, last_token):
+        allowed = {t.name for t in self._lexer.terminals} - self.ignore_types
+        raise UnexpectedCharacters(
+            src,
+            pos,
+            line,
+            column,
+            allowed=allowed or {"<END-OF-FILE>"},
+            token_history=last_token and [last_token],
+        )
+
+
+class StreamScanner:
+    """
+    Incremental tokenizer for text received in chunks.
+
+    Tokens are emitted only when enough text follows them to guarantee that a
+    longer match is not possible. Patterns that look ahead more than
+    lookahead characters past the end of a match may produce different
+    tokens than the non-streaming lexer.
+
+    Text that cannot be the start of any token raises an error as soon as it
+    is fed, so the buffer never grows past the longest token.
+    """
+
+    newline = "\n"
+
+    def __init__(self, lexer: TraditionalLexer, lookahead=LOOKAHEAD):
+        self.lexer = lexer
+        self.match = lexer.match
+        self.lookahead = lookahead
+        self.newline_types = frozenset(lexer.newline_types)
+        self.ignore_types = frozenset(lexer.ignore_types)
+        self.buffer = ""
+        self.offset = 0
+        self.line = 1
+        self.line_start = 0
+        self.last_token = None
+        self._decoder = None
+        self._prefixes = None
+
+    def feed(self, chunk) -> List[Token]:
+        """
+        Add chunk to the input and return the list of completed tokens.
+        """
+        if isinstance(chunk, (bytes, bytearray)):
+            if self._decoder is None:
+                self._decoder = codecs.getincrementaldecoder("utf8")()
+            chunk = self._decoder.decode(chunk)
+        self.buffer += chunk
+        return list(self._scan(final=False))
+
+    def close(self) -> List[Token]:
+        """
+        Signal the end of input and return the remaining tokens.
+        """
+        if self._decoder is not None:
+            self.buffer += self._decoder.decode(b"", final=True)
+        return list(self._scan(final=True))
+
+    def scan(self, src, pos=0, line=1, line_start=0) -> Iterator[Token]:
+        """
+        Iterate over the tokens of a complete source.
+
+        Scanning may start at any token boundary pos, given the line number
+        and the position of the start of that line.
+        """
+        self.buffer = src
+        self.line = line
+        self.line_start = line_start
+        return self._scan(final=True, start=pos)
+
+    def make_token(self, type_, value, i, pos, line, column):
+        """
+        Create token for the match of value at index i of the buffer.
+        """
+        return Token(type_, value, pos, line, column)
+
+    def _scan(self, final, start=0):
+        buf = self.buffer
+        offset = self.offset
+        i = start
+        matches = scan_matches(
+            lambda buf, i: self._next_match(buf, i, final),
+            buf,
+            start,
+            self.line,
+            self.line_start - offset,
+            self.newline_types,
+            newline=self.newline,
+        )
+        for type_, value, i, line, column, end_line, end_column in matches:
+            t = self._accept(type_, value, i, line, column)
+            i += len(value)
+            self.line = end_line
+            self.line_start = offset + i - end_column + 1
+            if t:
+                t.end_line = end_line
+                t.end_column = end_column
+                yield t
+
+        self.buffer = buf[i:]
+        self.offset += i
+
+    def _next_match(self, buf, i, final):
+        """
+        Return the (value, type) pair matched at index i of the buffer, or None
+        if more input is required to decide.
+
+        Raise an error if the text at i cannot start a token, even after more
+        input arrives.
+        """
+        res = self.match(buf, i)
+        if not res:
+            if final or not self.prefixes.is_prefix(buf[i:]):
+                self._error(buf, i)
+            return None
+        if not final and i + len(res[0]) + self.lookahead >= len(buf):
+            return None
+        return res
+
+    def _accept(self, type_, value, i, line, column):
+        """
+        Run callbacks for the match at index i of the buffer.
+
+        Return the new token or None, if type_ is ignored.
+        """
+        callbacks = self.lexer.callback
+        pos = self.offset + i
+        if type_ in self.ignore_types:
+            if type_ in callbacks:
+                callbacks[type_](self.make_token(type_, value, i, pos, line, column))
+            return None
+
+        t = self.make_token(type_, value, i, pos, line, column)
+        if type_ in callbacks:
+            t = callbacks[type_](t)
+            if not isinstance(t, (Token, LazyToken)):
+                msg = "Callbacks must return a token (returned %r)" % t
+                raise ValueError(msg)
+        self.last_token = t
+        return t
+
+    @property
+    def prefixes(self) -> PrefixMatcher:
+        """
+        Matcher for the text that may still become a token with more input.
+        """
+        if self._prefixes is None:
+            patterns = [t.pattern.to_regexp() for t in self.lexer.terminals]
+            self._prefixes = PrefixMatcher(patterns)
+        return self._prefixes
+
+    def _error(self, buf, i):
+        lexer = self.lexer
+        allowed = {v for m, tfi in lexer.mres for v in tfi.values()}
+        allowed = (allowed - self.ignore_types) or {"<END-OF-FILE>"}
+        pos = self.offset + i
+        column = pos - self.line_start + 1
+        history = self.last_token and [self.last_token]
+        text, index = self._error_context(buf, i)
+        exc = UnexpectedCharacters(
+            text, index, self.line, column, allowed=allowed, token_history=history
+        )
+        exc.pos_in_stream = pos
+        raise exc
+
+    def _error_context(self, buf, i):
+        return buf, i
+
+
+class BytesScanner(StreamScanner):
+    """
+    Scanner for UTF-8 encoded binary sources.
+
+    The terminal regexes are recompiled as bytes patterns, so the input is
+    never decoded as a whole.
+    """
+
+    newline = b"\n"
+
+    def __init__(self, lexer: TraditionalLexer, lookahead=LOOKAHEAD):
+        super().__init__(lexer, lookahead)
+        self.buffer = b""
+        try:
+            self.mres = [
+                (re.compile(mre.pattern.encode("utf8"), mre.flags & ~re.UNICODE), tfi)
+                for mre, tfi in lexer.mres
+            ]
+        except re.error as exc:
+            raise ValueError(f"lexer cannot scan binary data: {exc}")
+        self.match = self.match_bytes
+
+    def match_bytes(self, stream, pos):
+        for mre, type_from_index in self.mres:
+            m = mre.match(stream, pos)
+            if m:
+                return m.group(0), type_from_index[m.lastindex]
+
+    def make_token(self, type_, value, i, pos, line, column):
+        return LazyToken(type_, self.buffer, i, i + len(value), pos, line, column)
+
+    def _error_context(self, buf, i):
+        before = str(buf[max(i - 40, 0) : i], "utf8", "replace")
+        after = str(buf[i : i + 40], "utf8", "replace")
+        return before + after, len(before)
+
+
+class OffsetScanner(StreamScanner):
+    """
+    Scanner that produces OffsetToken instances for a complete string.
 
-    def __init__(self, lex_func):
-        self._func = lex_func
+    Lines are not tracked during the scan. Positions of errors are computed
+    from the line index of the source.
+    """
+
+    def scan(self, src, pos=0, line=1, line_start=0) -> Iterator["OffsetToken"]:
+        self.lines = LineIndex(src)
+        return super().scan(src, pos, line, line_start)
+
+    def _scan(self, final, start=0):
+        buf = self.buffer
+        new_str = str.__new__
+        callbacks = self.lexer.callback
+        ignore_types = self.ignore_types
+        lines = self.lines
+        matches = scan_matches(
+            self.match,
+            buf,
+            start,
+            skip_types=ignore_types - callbacks.keys(),
+            error=lambda i, line, column: self._error(buf, i),
+        )
+        for type_, value, i, *_ in matches:
+            tk = new_str(OffsetToken, value)
+            tk.type = type_
+            tk.value = value
+            tk.pos_in_stream = i
+            tk.size = len(value)
+            tk.lines = lines
+            if type_ in callbacks:
+                tk = callbacks[type_](tk)
+                if not isinstance(tk, Token):
+                    msg = "Callbacks must return a token (returned %r)" % tk
+                    raise ValueError(msg)
+            if type_ not in ignore_types:
+                self.last_token = tk
+                yield tk
+
+    def _error(self, buf, i):
+        self.line = self.lines.line(i)
+        self.line_start = self.lines.starts[self.line - 1]
+        super()._error(buf, i)
+
+
+class OffsetToken(Token):
+    """
+    Lark token that stores only its start and end offsets in the source.
 
-    def __call__(self, src, fn=None):
-        tks = self._func(src)
-        return list(tks) if fn else tks
+    The line, column, end_line and end_column attributes are computed by
+    bisection in the LineIndex shared by all tokens of the same source.
+
+    Scanning is cheaper, since positions are never computed, but tokens are
+    not smaller than Lark tokens. The line index and the length of the
+    match are stored in the slots that Lark reserves for the line and
+    end_line attributes, so instances have the same layout, and lengths are
+    usually small cached ints. Memory is only saved for the line and column
+    numbers above 256, which Python does not cache. The LineIndex keeps a
+    reference to the source until the first position is requested.
+    """
+
+    __slots__ = ()
+
+    # Reuse the slots of Lark tokens, which are shadowed by the properties
+    lines = Token.line
+    size = Token.end_line
+
+    end_pos = property(lambda self: self.pos_in_stream + self.size)
+
+    line = property(lambda self: self.lines.line(self.pos_in_stream))
+    column = property(lambda self: self.lines.column(self.pos_in_stream))
+    end_line = property(lambda self: self.lines.line(self.end_pos))
+    end_column = property(lambda self: self.lines.column(self.end_pos))
+
+    def __new__(cls, type_, value, start, end, lines: LineIndex):
+        self = str.__new__(cls, value)
+        self.type = type_
+        self.value = value
+        self.pos_in_stream = start
+        self.size = end - start
+        self.lines = lines
+        return self
 
+    def __reduce__(self):
+        args = (self.type, str(self), self.pos_in_stream, self.end_pos, self.lines)
+        return self.__class__, args, (None, {"value": self.value})
+
+    def __deepcopy__(self, memo):
+        return self.__copy__()
+
+    def __copy__(self):
+        new = self.__class__(
+            self.type, str(self), self.pos_in_stream, self.end_pos, self.lines
+        )
+        new.value = self.value
+        return new
+
+    @classmethod
+    def new_borrow_pos(cls, type_, value, borrow_t):
+        """
+        Create token with the positions of borrow_t.
+
+        Return a regular Lark token if borrow_t does not store offsets.
+        """
+        if isinstance(borrow_t, OffsetToken):
+            start, end = borrow_t.pos_in_stream, borrow_t.end_pos
+            return cls(type_, value, start, end, borrow_t.lines)
+        return Token.new_borrow_pos(type_, value, borrow_t)
+
+    def to_token(self) -> Token:
+        """
+        Convert to a Lark token with eagerly computed positions.
+        """
+        line, column = self.lines.position(self.pos_in_stream)
+        end_line, end_column = self.lines.position(self.end_pos)
+        tk = Token(self.type, str(self), self.pos_in_stream, line, column)
+        tk.value = self.value
+        tk.end_line = end_line
+        tk.end_column = end_column
+        return tk
+
+
+class LazyToken:
+    """
+    Token that refers to a slice of a bytes-like source.
 
-def lexer(grammar=None, *args, ignore=None, **kwargs) -> Lexer:
+    The token value is decoded only when it is accessed, either by the user or
+    by a token callback. Use the to_token() method to obtain a regular Lark
+    token.
+    """
+
+    __slots__ = (
+        "type",
+        "source",
+        "start",
+        "end",
+        "pos_in_stream",
+        "line",
+        "column",
+        "end_line",
+        "end_column",
+        "_value",
+    )
+
+    def __init__(self, type_, source, start, end, pos, line, column):
+        self.type = type_
+        self.source = source
+        self.start = start
+        self.end = end
+        self.pos_in_stream = pos
+        self.line = line
+        self.column = column
+        self.end_line = None
+        self.end_column = None
+        self._value = _lazy
+
+    def __str__(self):
+        return str(self.source[self.start : self.end], "utf8")
+
+    def __repr__(self):
+        return "Token(%s, %r)" % (self.type, self.value)
+
+    @property
+    def value(self):
+        if self._value is _lazy:
+            self._value = str(self)
+        return self._value
+
+    @value.setter
+    def value(self, value):
+        self._value = value
+
+    def to_token(self) -> Token:
+        """
+        Convert to a Lark token.
+        """
+        tk = Token(self.type, str(self), self.pos_in_stream, self.line, self.column)
+        tk.value = self.value
+        tk.end_line = self.end_line
+        tk.end_column = self.end_column
+        return tk
+
+
+_lazy = object()
+
+
+class Edit(namedtuple("Edit", ["offset", "deleted", "inserted"])):
+    """
+    Text edit that replaces deleted characters at offset by the inserted
+    string.
+    """
+
+    def apply(self, text: str) -> str:
+        """
+        Return the edited text.
+        """
+        return text[: self.offset] + self.inserted + text[self.offset + self.deleted :]
+
+    @property
+    def delta(self) -> int:
+        """
+        Change in text length.
+        """
+        return len(self.inserted) - self.deleted
+
+
+Relexed = namedtuple("Relexed", ["tokens", "start", "old_stop", "new_stop"])
+
+
+def lexer(
+    grammar=None, *args, ignore=None, cache=None, engine="lark", **kwargs
+) -> Lexer:
     """
     Create a lexer function from token declarations.
+
+    The compiled lexer tables may be stored in a persistent cache. See
+    :func:`ox.cache.cache_dir` for the accepted values of the cache argument.
+
+    Tokens declared by keyword can be scanned by a standalone regex engine by
+    passing engine="re". It produces the same tokens as the default "lark"
+    engine, but does not build a Lark parser and scans strings faster.
+
+    Rules for reserved words, such as IF="if", that are also matched by an
+    identifier rule, such as NAME=r"[a-z]+", are not compiled as separate
+    patterns. The identifier rule is matched and its value is looked up in a
+    keyword table, so "if" is an IF token and "iffy" a NAME. The tables are
+    stored in the keywords attribute of the lexer.
     """
 
     # Validate input
@@ -38,7 +746,7 @@ def lexer(grammar=None, *args, ignore=None, **kwargs) -> Lexer:
     rules = {k: v for k, v in kwargs.items() if k.isupper()}
     bad = {k for k in kwargs if k not in rules and not k.islower()}
     if args:
-        extra, = args
+        (extra,) = args
         rules.update(rules)
     if any(bad):
         raise TypeError(f"invalid arguments: {bad}")
@@ -49,23 +757,11 @@ def lexer(grammar=None, *args, ignore=None, **kwargs) -> Lexer:
     if isinstance(ignore, str):
         ignore = ignore.split(",")
 
-    # Create a Lark grammar for the given lexing rules
     if grammar:
-        return lexer_from_grammar(grammar, functions)
-    else:
-        lex_rules = [Lex.from_arg(k, v, ignore).check_valid() for k, v in rules.items()]
-        grammar = [rule.encode_lark() for rule in lex_rules]
-        ignore = [rule.name for rule in lex_rules if rule.ignore]
-        if ignore:
-            ignore_declaration = "\n".join(f"%ignore {name}" for name in ignore)
-            grammar.append(f"\n{ignore_declaration}")
-        grammar_source = "\n".join(grammar)
-        tokens = [lex.name for lex in lex_rules]
-
-        for rule in lex_rules:
-            if rule.transform:
-                functions.setdefault(rule.name, rule.transform)
-        return lexer_from_grammar(grammar_source, functions, token_names=tokens)
+        if engine != "lark":
+            raise ValueError(f"engine {engine!r} requires tokens declared by keyword")
+        return lexer_from_grammar(grammar, functions, cache=cache)
+    return lexer_from_rules(rules, functions, ignore, cache=cache, engine=engine)
 
 
 def tokenize(expr, **kwargs):
@@ -149,6 +845,19 @@ class Lex:
             raise ValueError(f"Invalid token name: {name!r}")
         return self
 
+    def is_literal(self) -> bool:
+        """
+        Return True if pattern only matches a word spelled literally.
+        """
+        return re.fullmatch(r"\w+", self.pattern) is not None
+
+    def terminal_def(self) -> TerminalDef:
+        """
+        Create the Lark terminal definition for rule.
+        """
+        priority = 1 if self.priority is None else self.priority
+        return TerminalDef(self.name, PatternRE(self.pattern), priority)
+
     def encode_lark(self) -> str:
         """
         Encode rule as a Lark token declaration.
@@ -181,7 +890,9 @@ class TokenVisitor(Visitor):
 #
 # Utility functions
 #
-def lexer_from_grammar(grammar: str, functions, token_names=None) -> Lexer:
+def lexer_from_grammar(
+    grammar: str, functions, token_names=None, cache=None, keywords=None
+) -> Lexer:
     """
     Create lexer from an incomplete Lark grammar.
     """
@@ -191,33 +902,212 @@ def lexer_from_grammar(grammar: str, functions, token_names=None) -> Lexer:
     token_names = " | ".join(token_names)
     full_grammar = "start : tk*\ntk : {}\n\n{}".format(token_names, grammar)
 
-    def lex(src):
-        return lex_function(src)
-
-    callbacks = {name: token_callback(fn) for name, fn in functions.items()}
+    callbacks = make_callbacks(functions, keywords)
     try:
-        lark = Lark(full_grammar, parser="lalr", lexer_callbacks=callbacks)
+        lark = load_lark(
+            full_grammar, cache=cache, parser="lalr", lexer_callbacks=callbacks
+        )
     except UnexpectedToken as exc:
         print("Error creating grammar:")
         print(full_grammar)
         print()
         raise ValueError(f"invalid token declarations: {exc}")
-    lex_function = lark.lex
-    lex.grammar = grammar
-    lex.lexer_callbacks = callbacks
-    return sk.fn(lex)
+    return Lexer(lark, grammar, functions, keywords)
+
+
+def lexer_from_rules(
+    rules: dict, functions, ignore=None, cache=None, engine="lark"
+) -> Lexer:
+    """
+    Create lexer from a mapping of token names to patterns.
+    """
+    if engine not in ("lark", "re"):
+        raise ValueError(f"invalid engine: {engine!r}")
+    lex_rules = [Lex.from_arg(k, v, ignore).check_valid() for k, v in rules.items()]
+    for rule in lex_rules:
+        if rule.transform:
+            functions.setdefault(rule.name, rule.transform)
+    tokens = [lex.name for lex in lex_rules]
+    lex_rules, keywords = keyword_tables(lex_rules, functions)
+
+    # Create a Lark grammar for the given lexing rules
+    grammar = [rule.encode_lark() for rule in lex_rules]
+    ignore = [rule.name for rule in lex_rules if rule.ignore]
+    if ignore:
+        ignore_declaration = "\n".join(f"%ignore {name}" for name in ignore)
+        grammar.append(f"\n{ignore_declaration}")
+    declared = [name for table in keywords.values() for name in table.values()]
+    if declared:
+        grammar.append(f"%declare {' '.join(declared)}")
+    grammar_source = "\n".join(grammar)
+
+    if engine == "re":
+        return RegexLexer(lex_rules, grammar_source, functions, keywords)
+    return lexer_from_grammar(
+        grammar_source, functions, token_names=tokens, cache=cache, keywords=keywords
+    )
+
+
+def keyword_tables(rules: List["Lex"], functions=()):
+    """
+    Remove rules for reserved words that are matched by an identifier rule.
+
+    Return the list of remaining rules and a mapping from the names of
+    identifier rules to tables of {keyword: token type}. Rules that are
+    ignored or have a token function are kept. As in Lark, reserved words with
+    a higher priority than the identifier rule are also kept, since they
+    match as prefixes of identifiers.
+    """
+    identifiers = [r for r in rules if not r.is_literal() and not r.ignore]
+    identifiers.sort(key=lambda r: terminal_order(r.terminal_def()))
+    keywords = {}
+    remaining = []
+    for rule in rules:
+        if rule.is_literal() and not rule.ignore and rule.name not in functions:
+            priority = rule.terminal_def().priority
+            for ident in identifiers:
+                table = keywords.get(ident.name, {})
+                if (
+                    rule.pattern not in table
+                    and priority <= ident.terminal_def().priority
+                    and re.fullmatch(ident.pattern, rule.pattern)
+                ):
+                    keywords[ident.name] = table
+                    table[rule.pattern] = rule.name
+                    break
+            else:
+                remaining.append(rule)
+        else:
+            remaining.append(rule)
+    return remaining, keywords
+
+
+def terminal_order(terminal: TerminalDef):
+    """
+    Sort key used by Lark lexers: terminals that come first have precedence.
+    """
+    pattern = terminal.pattern
+    return -terminal.priority, -pattern.max_width, -len(pattern.value), terminal.name
+
+
+def relex_tokens(lexer: TraditionalLexer, tokens, source, edit) -> Relexed:
+    """
+    Update list of tokens after the given edit.
+
+    Tokenization restarts at the last token that ends before the edit and
+    stops as soon as a new token starts at the position of an old token after
+    the edited region. Lexers are stateless, hence all remaining tokens are
+    the old ones with shifted positions, which are computed lazily by a
+    :class:`ox.tokens.TokenList`.
+
+    Args:
+        lexer:
+            Lark lexer that produced the old tokens.
+        tokens:
+            Old sequence of tokens.
+        source:
+            New source, after the edit was applied.
+        edit:
+            An :class:`Edit` instance.
+
+    Returns:
+        A (tokens, start, old_stop, new_stop) tuple, in which tokens is the new
+        TokenList and old tokens[start:old_stop] were replaced by new
+        tokens[start:new_stop].
+    """
+    tokens = TokenList(tokens)
+    size = len(tokens)
+    start, pos, line, line_start = relex_start(tokens, edit.offset)
+    edit_end = edit.offset + len(edit.inserted)
+    delta = edit.delta
+    new = []
+    j = start
+    for tk in StreamScanner(lexer).scan(source, pos, line, line_start):
+        if tk.pos_in_stream >= edit_end:
+            old_pos = tk.pos_in_stream - delta
+            while j < size and tokens[j].pos_in_stream < old_pos:
+                j += 1
+            if j < size and tokens[j].pos_in_stream == old_pos:
+                tokens = tokens.shift(j, delta, tk.line, tk.column)
+                stop = start + len(new)
+                return Relexed(tokens.splice(start, j, new), start, j, stop)
+        new.append(tk)
+    return Relexed(tokens.splice(start, size, new), start, size, start + len(new))
+
+
+def relex_start(tokens, offset):
+    """
+    Return the index of the token from which tokenization must restart after
+    an edit at offset, and the (pos, line, line_start) position of that token.
+
+    This is the last token that ends before offset, since the edit may extend
+    it.
+    """
+    # Binary search for the first token that ends after the edit offset
+    k, hi = 0, len(tokens)
+    while k < hi:
+        mid = (k + hi) // 2
+        if tokens[mid].pos_in_stream + len(tokens[mid]) < offset:
+            k = mid + 1
+        else:
+            hi = mid
+    if k == 0:
+        return 0, 0, 1, 0
+    tk = tokens[k - 1]
+    pos = tk.pos_in_stream
+    return k - 1, pos, tk.line, pos - tk.column + 1
+
+
+async def read_chunks(stream, chunk_size=CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """
+    Iterate over chunks read from an asyncio.StreamReader until EOF.
+    """
+    while True:
+        chunk = await stream.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
 
 
 def get_tokens(grammar):
-    ast = LARK_GRAMMAR.parse(grammar)
+    ast = load_grammar("lark").parse(grammar)
     visitor = TokenVisitor()
     visitor.visit(ast)
     return visitor.tokens
 
 
+def make_callbacks(functions, keywords=None) -> dict:
+    """
+    Create Lark lexer callbacks from token functions and keyword tables.
+    """
+    callbacks = {name: token_callback(fn) for name, fn in functions.items()}
+    for name, table in (keywords or {}).items():
+        callbacks[name] = keyword_callback(table, callbacks.get(name))
+    return callbacks
+
+
+def keyword_callback(table: dict, callback=None) -> Callable[[Token], Token]:
+    """
+    Callback that changes the type of tokens whose value is in table.
+
+    The optional callback is applied to tokens that are not keywords.
+    """
+    # Partials can be pickled with the parsers that use them
+    return partial(_keyword_token, table, callback)
+
+
+def _keyword_token(table, callback, tk: Token):
+    try:
+        tk.type = table[tk.value]
+    except KeyError:
+        return tk if callback is None else callback(tk)
+    return tk
+
+
 def token_callback(fn: Callable[[str], Any]) -> Callable[[Token], Token]:
-    def callback(tk: Token):
-        tk.value = fn(tk.value)
-        return tk
+    return partial(_convert_token, fn)
+
 
-    return callback
+def _convert_token(fn, tk: Token):
+    tk.value = fn(tk.value)
+    return tk
@@ -0,0 +1,75 @@
+"""
+Line and column lookups from character offsets.
+
+Tokens scanned with lazy positions only store their offsets in the source.
+Lines and columns are computed on demand by bisection in a table with the
+offsets of the start of each line, which is built on the first query.
+"""
+from array import array
+from bisect import bisect_right
+from typing import Tuple
+
+__all__ = ["LineIndex"]
+
+
+class LineIndex:
+    """
+    Map character offsets of a source string to (line, column) pairs.
+
+    Lines and columns start at 1, as in Lark tokens. The source is kept until
+    the first query and released after the table of line starts is built.
+
+    Examples:
+        >>> lines = LineIndex("foo\\nbar")
+        >>> lines.position(5)
+        (2, 2)
+    """
+
+    __slots__ = ("_source", "_starts")
+
+    def __init__(self, source):
+        self._source = source
+        self._starts = None
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __repr__(self):
+        return f"<LineIndex: {len(self)} lines>"
+
+    @property
+    def starts(self) -> array:
+        """
+        Array with the offset of the first character of each line.
+        """
+        if self._starts is None:
+            src, self._source = self._source, None
+            newline = b"\n" if isinstance(src, (bytes, bytearray)) else "\n"
+            starts = array("q", [0])
+            find = src.find
+            pos = find(newline)
+            while pos != -1:
+                starts.append(pos + 1)
+                pos = find(newline, pos + 1)
+            self._starts = starts
+        return self._starts
+
+    def line(self, offset: int) -> int:
+        """
+        Line number of the character at offset.
+        """
+        return bisect_right(self.starts, offset)
+
+    def column(self, offset: int) -> int:
+        """
+        Column of the character at offset.
+        """
+        return self.position(offset)[1]
+
+    def position(self, offset: int) -> Tuple[int, int]:
+        """
+        Line and column of the character at offset.
+        """
+        starts = self.starts
+        line = bisect_right(starts, offset)
+        return line, offset - starts[line - 1] + 1
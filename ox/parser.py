@@ -1,14 +1,24 @@
-from functools import lru_cache
+import asyncio
+import inspect
+import multiprocessing
+import pickle
+import threading
+from collections import OrderedDict, namedtuple
 from typing import TypeVar
 
-from lark import Lark, InlineTransformer
+from lark import Lark, InlineTransformer, ParseError
 from sidekick import fn
 
+from .cache import deserialize_lark, is_cacheable, load_lark, serialize_lark
 from .grammar import load_grammar, source
-from .lexer import Lexer
+from .lexer import Lexer, BYTES_TYPES
 
 AST = TypeVar("AST")
-LARK_GRAMMAR = load_grammar("lark-expansions")
+
+RegistryInfo = namedtuple("RegistryInfo", ["hits", "misses", "maxsize", "currsize"])
+
+# Parser used by the worker processes created by Parser.parse_many()
+WORKER_PARSER = None
 
 
 #
@@ -21,8 +31,9 @@ class Parser(fn):
 
     # noinspection PyShadowingNames
     def __init__(self, parser, lexer=None):
-        self._lexer = lexer
+        # fn.__init__ resets the instance __dict__
         super().__init__(parser)
+        self._lexer = lexer
 
     def lex(self, src):
         """
@@ -35,17 +46,236 @@ class Parser(fn):
             raise ValueError("parser does not have an associated lexer!")
         return self._lexer(src)
 
+    def parse_many(
+        self,
+        sources,
+        workers=None,
+        chunksize=16,
+        return_exceptions=False,
+        mp_context=None,
+    ):
+        """
+        Parse many sources in parallel using a pool of worker processes.
+
+        The parser is sent once to each worker. Results are yielded in the same
+        order as the sources.
+
+        Workers are forked where possible, which shares the parser without
+        pickling it. Other start methods require a picklable parser: see
+        :meth:`LarkParser.__reduce__`.
+
+        Args:
+            sources:
+                Iterable of sources.
+            workers:
+                Number of worker processes. Defaults to the number of CPUs. If
+                workers is 0, parse sources in the current process.
+            chunksize:
+                Number of sources sent to a worker at once.
+            return_exceptions:
+                If True, yield (index, result) pairs, in which result is the
+                exception raised while parsing the source, if any. Otherwise,
+                the first error aborts the iteration.
+            mp_context:
+                Multiprocessing context or start method used to create the
+                workers.
+        """
+        if workers == 0:
+            results = (parse_indexed(item, self) for item in enumerate(sources))
+            yield from iter_results(results, return_exceptions)
+            return
+
+        ctx = mp_context
+        if ctx is None:
+            methods = multiprocessing.get_all_start_methods()
+            ctx = "fork" if "fork" in methods else None
+        if ctx is None or isinstance(ctx, str):
+            ctx = multiprocessing.get_context(ctx)
+        with ctx.Pool(workers, initializer=init_worker, initargs=(self,)) as pool:
+            results = pool.imap(parse_indexed, enumerate(sources), chunksize)
+            yield from iter_results(results, return_exceptions)
+
+    async def parse_async(self, src, executor=None):
+        """
+        Parse source without blocking the event loop.
+
+        Source may be an asyncio.StreamReader or an async iterable of chunks,
+        which are read until the end, or any source accepted by the parser.
+        Parsing runs in the given executor or in the default executor of the
+        loop. Process pools require a picklable parser.
+        """
+        src = await read_source(src)
+        # get_running_loop() is not available in Python 3.6
+        loop = getattr(asyncio, "get_running_loop", asyncio.get_event_loop)()
+        return await loop.run_in_executor(executor, self, src)
+
+    async def parse_many_async(
+        self, sources, limit=8, executor=None, return_exceptions=False
+    ):
+        """
+        Parse many streams concurrently and return the list of results.
+
+        Args:
+            sources:
+                Iterable of sources accepted by :meth:`parse_async`.
+            limit:
+                Maximum number of sources that are read or parsed at once.
+            executor:
+                Executor used to parse sources.
+            return_exceptions:
+                If True, exceptions raised while reading or parsing a source
+                are returned in the list of results. Otherwise, the first
+                error is raised.
+        """
+        semaphore = asyncio.Semaphore(limit)
+
+        async def parse(src):
+            async with semaphore:
+                return await self.parse_async(src, executor)
+
+        tasks = [parse(src) for src in sources]
+        return await asyncio.gather(*tasks, return_exceptions=return_exceptions)
+
 
 class LarkParser(Parser):
     """
     A Lark-powered parser.
+
+    Compiled LALR tables are loaded from the persistent cache when it is
+    enabled. See :func:`ox.cache.cache_dir` for the accepted values of the
+    cache argument.
     """
 
     grammar: Lark
+    rule_functions: dict = None
+    token_functions: dict = None
+    keywords: dict = None
 
-    def __init__(self, grammar, **kwargs):
-        self.grammar = Lark(grammar, **kwargs)
-        super().__init__(self.grammar.parse, self.grammar.lex)
+    @classmethod
+    def from_lark(cls, lark: Lark) -> "LarkParser":
+        """
+        Create parser from an existing Lark instance.
+        """
+        new = cls.__new__(cls)
+        Parser.__init__(new, new.parse, Lexer(lark, None))
+        new.grammar = lark
+        return new
+
+    def __init__(self, grammar, cache=None, **kwargs):
+        lark = load_lark(grammar, cache=cache, **kwargs)
+        super().__init__(self.parse, Lexer(lark, None))
+        self.grammar = lark
+
+    def __reduce__(self):
+        """
+        Pickle parser as its serialized LALR tables.
+
+        Transformer, lexer callbacks and the functions passed to parser() are
+        pickled by reference and must be importable. Parsers that cannot be
+        stored in the persistent cache cannot be pickled either.
+        """
+        options = self.grammar.options
+        if not is_cacheable(options.options):
+            msg = "only LALR parsers without postlex or edit_terminals can be pickled"
+            raise TypeError(msg)
+        data, memo = serialize_lark(self.grammar)
+        runtime = {
+            "transformer": options.transformer,
+            "lexer_callbacks": options.lexer_callbacks,
+            "tree_class": options.tree_class,
+        }
+        state = {
+            "rule_functions": self.rule_functions,
+            "token_functions": self.token_functions,
+            "keywords": self.keywords,
+        }
+        return _restore_lark_parser, (data, memo, runtime, state)
+
+    def parse(self, src, start=None):
+        """
+        Parse source code.
+
+        Source can be a string or UTF-8 encoded bytes, memoryview or mmap. Binary
+        sources are tokenized without being decoded as a whole by LALR parsers
+        with the standard lexer. Other parsers, including the default
+        contextual lexer, choose tokens from the parser state and decode
+        binary sources before parsing.
+        """
+        if isinstance(src, BYTES_TYPES):
+            options = self.grammar.options
+            if options.parser != "lalr" or options.lexer != "standard":
+                return self.grammar.parse(str(src, "utf8"), start)
+            tokens = (tk.to_token() for tk in self._lexer.lex_bytes(src))
+            return parse_tokens(self.grammar, tokens, start)
+        return self.grammar.parse(src, start)
+
+
+class ParserRegistry:
+    """
+    Least recently used registry of parsers created from parser() arguments.
+
+    Parsers are keyed on a fingerprint of the grammar specification: the
+    grammar strings and rule declarations plus the identity of the functions
+    associated with each rule.
+
+    Args:
+        maxsize:
+            Maximum number of parsers kept in the registry.
+        cache:
+            Persistent cache option passed to new parsers. See
+            :func:`ox.cache.cache_dir` for accepted values.
+    """
+
+    def __init__(self, maxsize=128, cache=None):
+        self.maxsize = maxsize
+        self.cache = cache
+        self.hits = 0
+        self.misses = 0
+        self._parsers = OrderedDict()
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._parsers)
+
+    def get(self, *args, **kwargs) -> Parser:
+        """
+        Return parser for the given arguments, creating it if necessary.
+
+        Accept the same arguments as :func:`parser`.
+        """
+        key = fingerprint((args, kwargs))
+        with self._lock:
+            try:
+                value = self._parsers[key]
+            except KeyError:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._parsers.move_to_end(key)
+                return value
+
+        if self.cache is not None:
+            kwargs.setdefault("cache", self.cache)
+        value = parser(*args, **kwargs)
+        with self._lock:
+            self._parsers[key] = value
+            while len(self._parsers) > max(self.maxsize, 0):
+                self._parsers.popitem(last=False)
+        return value
+
+    def cache_info(self) -> RegistryInfo:
+        """
+        Return registry statistics, like functools.lru_cache.
+        """
+        return RegistryInfo(self.hits, self.misses, self.maxsize, len(self))
+
+    def cache_clear(self):
+        """
+        Remove all parsers and reset statistics.
+        """
+        with self._lock:
+            self._parsers.clear()
+            self.hits = self.misses = 0
 
 
 #
@@ -65,7 +295,7 @@ def parser(*args, **kwargs) -> Parser:
     options = extract_lark_options(kwargs)
     options.setdefault("parser", "lalr")
     lexer: Lexer = arg
-    rules, = args or (kwargs,)
+    (rules,) = args or (kwargs,)
     rule_map = {}
     grammar = "\n".join(["".join(grammar_rules(rules, rule_map)), lexer.grammar])
 
@@ -73,12 +303,18 @@ def parser(*args, **kwargs) -> Parser:
         options.setdefault("start", next(iter(rules)))
 
     if "transformer" not in options:
-        ns = {name: staticmethod(func) for name, func in rule_map.items()}
-        transformer_cls = type("Transformer", (InlineTransformer,), ns)
-        options.setdefault("transformer", transformer_cls())
+        options["transformer"] = make_transformer(rule_map)
 
     options.setdefault("lexer_callbacks", lexer.lexer_callbacks)
-    return LarkParser(grammar, **options)
+    if lexer.keywords:
+        # Keywords are declared without patterns and a contextual lexer would
+        # not try the identifier rules that produce them.
+        options.setdefault("lexer", "standard")
+    new = LarkParser(grammar, **options)
+    new.rule_functions = rule_map
+    new.token_functions = lexer.functions
+    new.keywords = lexer.keywords
+    return new
 
 
 def parse(src, *args, **kwargs):
@@ -86,10 +322,10 @@ def parse(src, *args, **kwargs):
     Parse string of source code with parser generated from arguments.
 
     This function is not as efficient as creating a parser using, but can be
-    reasonably effective in most situations by using a lru_cache strategy for
-    storing parsers.
+    reasonably effective in most situations since parsers are stored in
+    PARSER_REGISTRY.
     """
-    parser_func = get_parser_from_args(args, tuple(kwargs.items()))
+    parser_func = PARSER_REGISTRY.get(*args, **kwargs)
     return parser_func(src)
 
 
@@ -110,15 +346,171 @@ def extract_lark_options(kwargs):
             pass
     if "start" in kwargs and isinstance(kwargs["start"], (str, list)):
         options["start"] = kwargs.pop("start")
+    if "cache" in kwargs and not isinstance(kwargs["cache"], dict):
+        options["cache"] = kwargs.pop("cache")
     return options
 
 
-@lru_cache(16)
-def get_parser_from_args(args, kwargs):
+def parse_tokens(lark: Lark, tokens, start=None):
+    """
+    Parse a sequence of tokens with the LALR tables of a Lark instance.
+    """
+    if lark.options.parser != "lalr":
+        raise ValueError("can only parse tokens with LALR parsers")
+    if lark.options.postlex:
+        tokens = lark.options.postlex.process(tokens)
+    if start is None:
+        start, *other = lark.options.start
+        if other:
+            raise ValueError("grammar has many starts: start must be given")
+    return lark.parser.parser.parse(tokens, start)
+
+
+def fingerprint(obj):
+    """
+    Return a hashable key that identifies a parser() argument.
+
+    Strings and containers are compared by value, lexers by their grammar and
+    token functions and other objects (e.g., functions) by identity.
+    """
+    if isinstance(obj, (str, bytes, int, float, bool, type(None))):
+        return obj
+    elif isinstance(obj, dict):
+        return dict, tuple((fingerprint(k), fingerprint(v)) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple)):
+        return type(obj), tuple(map(fingerprint, obj))
+    elif isinstance(obj, Lexer):
+        return Lexer, obj.grammar, fingerprint(obj.functions)
+    try:
+        hash(obj)
+    except TypeError:
+        raise TypeError(f"cannot use {type(obj).__name__} as parser argument")
+    return obj
+
+
+PARSER_REGISTRY = ParserRegistry()
+
+
+def _restore_lark_parser(data, memo, options, state):
+    new = LarkParser.from_lark(deserialize_lark(data, memo, options))
+    for attr, value in state.items():
+        setattr(new, attr, value)
+    return new
+
+
+def init_worker(parser):
+    """
+    Initialize worker process created by Parser.parse_many().
+    """
+    global WORKER_PARSER
+    WORKER_PARSER = parser
+
+
+def parse_indexed(item, parser=None):
+    """
+    Parse (index, source) pair and return a (index, ok, result) tuple.
+
+    Exceptions raised in worker processes are prepared to be sent back to the
+    main process. See :class:`PickledException`.
+    """
+    idx, src = item
+    try:
+        return idx, True, (parser or WORKER_PARSER)(src)
+    except Exception as exc:
+        if parser is None:
+            exc = PickledException.wrap(exc)
+        return idx, False, exc
+
+
+class PickledException:
+    """
+    Pickle an exception as its class, args and picklable attributes.
+
+    Lark exceptions cannot be re-created from their args, but unpickling a
+    PickledException gives an exception of the original class, with the same
+    message and position. Exceptions whose class cannot be pickled are
+    converted to ParseError.
+    """
+
+    def __init__(self, exc):
+        self.exc = exc
+
+    @classmethod
+    def wrap(cls, exc):
+        """
+        Return exc, or a PickledException, whichever can be unpickled.
+        """
+        for obj in (exc, cls(exc)):
+            try:
+                pickle.loads(pickle.dumps(obj))
+            except Exception:
+                continue
+            return obj
+        return ParseError(f"{type(exc).__name__}: {exc}")
+
+    def __reduce__(self):
+        exc = self.exc
+        state = {k: v for k, v in vars(exc).items() if is_picklable(v)}
+        return _restore_exception, (type(exc), exc.args, state)
+
+
+def _restore_exception(cls, args, state):
+    exc = cls.__new__(cls)
+    exc.args = args
+    exc.__dict__.update(state)
+    return exc
+
+
+def is_picklable(obj):
+    """
+    Return True if obj can be pickled.
+    """
+    try:
+        pickle.dumps(obj)
+    except Exception:
+        return False
+    return True
+
+
+def iter_results(results, return_exceptions):
+    """
+    Yield results from a sequence of (index, ok, result) tuples.
+    """
+    for idx, ok, result in results:
+        if return_exceptions:
+            yield idx, result
+        elif ok:
+            yield result
+        else:
+            raise result
+
+
+async def read_source(src):
+    """
+    Read an asyncio.StreamReader or an async iterable of chunks until the end.
+
+    Other sources are returned unchanged.
+    """
+    if inspect.iscoroutinefunction(getattr(src, "read", None)):
+        return await src.read()
+    if hasattr(src, "__aiter__"):
+        chunks = [chunk async for chunk in src]
+        if chunks and isinstance(chunks[0], (bytes, bytearray)):
+            return b"".join(chunks)
+        return "".join(chunks)
+    return src
+
+
+def make_transformer(rule_map):
     """
-    Cached version of parser(), with a different signature.
+    Create a Lark transformer that calls the functions in the rule map for
+    the corresponding aliased rules.
     """
-    return parser(*args, **dict(kwargs))
+    ns = {name: staticmethod(func) for name, func in rule_map.items()}
+    # The class is created on the fly, so instances are pickled as the rule map
+    ns["__reduce__"] = lambda self: (make_transformer, (rule_map,))
+    transformer_cls = type("Transformer", (InlineTransformer,), ns)
+    return transformer_cls()
 
 
 def grammar_rules(rules, rule_map):
@@ -175,7 +567,7 @@ def iter_expansions(expr):
         yield expr
         return
 
-    tree = LARK_GRAMMAR.parse(expr)
+    tree = load_grammar("lark-expansions").parse(expr)
     if tree.data != "expansions":
         yield expr
         return
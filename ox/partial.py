@@ -0,0 +1,190 @@
+"""
+Partial matching of regular expressions.
+
+Python's re module cannot tell whether a string that does not match a pattern
+may still match after more characters are appended. This module builds, for
+each pattern, a second regex that matches all prefixes of the strings matched
+by the original one. Streaming scanners use it to reject input as soon as it
+cannot start a token, instead of buffering it until the end of the stream.
+
+Constructs that cannot be translated, such as backreferences, make the
+pattern accept any prefix. Lookarounds and anchors are dropped. The prefix
+regexes may therefore accept more than the exact set of prefixes, but they
+never reject a string that may still become a match.
+"""
+import re
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+__all__ = ["prefix_regex", "PrefixMatcher"]
+
+CATEGORIES = {
+    "CATEGORY_DIGIT": r"\d",
+    "CATEGORY_NOT_DIGIT": r"\D",
+    "CATEGORY_SPACE": r"\s",
+    "CATEGORY_NOT_SPACE": r"\S",
+    "CATEGORY_WORD": r"\w",
+    "CATEGORY_NOT_WORD": r"\W",
+}
+FLAGS = {re.IGNORECASE: "i", re.MULTILINE: "m", re.DOTALL: "s"}
+ANYTHING = "(?s:.*)"
+PATTERN_TYPE = type(re.compile(""))
+
+
+class Untranslatable(Exception):
+    """
+    Raised for regex constructs that have no prefix regex.
+    """
+
+
+class PrefixMatcher:
+    """
+    Check if a string can be extended to a match of any of the given regexes.
+
+    Examples:
+        >>> matcher = PrefixMatcher([r'"[^"]*"', r"\\d+"])
+        >>> matcher.is_prefix('"abc'), matcher.is_prefix("$")
+        (True, False)
+    """
+
+    def __init__(self, patterns):
+        self.regexes = []
+        for pattern in patterns:
+            flags = pattern.flags if isinstance(pattern, PATTERN_TYPE) else 0
+            try:
+                regex = re.compile(prefix_regex(pattern), flags)
+            except re.error:
+                regex = re.compile(ANYTHING)
+            self.regexes.append(regex)
+
+    def is_prefix(self, text) -> bool:
+        """
+        True if text is a prefix of a match of any of the regexes.
+        """
+        return any(regex.fullmatch(text) for regex in self.regexes)
+
+
+def prefix_regex(pattern) -> str:
+    """
+    Return a regex that matches all prefixes of matches of pattern.
+
+    Pattern may be a string or a compiled regex. Inline flags are kept, but
+    flags passed to re.compile() are not included in the result.
+    """
+    if isinstance(pattern, PATTERN_TYPE):
+        pattern = pattern.pattern
+        if isinstance(pattern, bytes):
+            pattern = pattern.decode("utf8")
+    parsed = sre_parse.parse(pattern)
+    state = getattr(parsed, "state", None) or parsed.pattern
+    try:
+        flags = "".join(c for flag, c in FLAGS.items() if state.flags & flag)
+        return (f"(?{flags})" if flags else "") + prefix(parsed)
+    except Untranslatable:
+        return ANYTHING
+
+
+def prefix(items) -> str:
+    """
+    Prefix regex for a sequence of parsed regex items.
+
+    The prefixes of AB are the prefixes of A and A followed by prefixes of B.
+    """
+    items = list(items)
+    if not items:
+        return ""
+    head, *tail = items
+    if not tail:
+        return prefix_item(*head)
+    return f"(?:{prefix_item(*head)}|{regex_item(*head)}{prefix(tail)})"
+
+
+def prefix_item(op, av) -> str:
+    name = op.name
+    if name in ("LITERAL", "NOT_LITERAL", "ANY", "IN"):
+        return f"(?:{regex_item(op, av)})?"
+    elif name in ("AT", "ASSERT", "ASSERT_NOT"):
+        return ""
+    elif name == "BRANCH":
+        return "(?:%s)" % "|".join(prefix(branch) for branch in av[1])
+    elif name == "SUBPATTERN":
+        return with_flags(av, prefix(av[-1]))
+    elif name in ("MAX_REPEAT", "MIN_REPEAT", "POSSESSIVE_REPEAT"):
+        lo, hi, item = av
+        if hi == 0:
+            return ""
+        body = regex(item)
+        count = "*" if hi == sre_parse.MAXREPEAT else "{0,%d}" % (hi - 1)
+        return f"(?:{body}){count}{prefix(item)}"
+    elif name == "ATOMIC_GROUP":
+        return prefix(av)
+    raise Untranslatable(name)
+
+
+def regex(items) -> str:
+    """
+    Regex for a sequence of parsed regex items.
+
+    Anchors and lookarounds are dropped, so the result may match more strings
+    than the original.
+    """
+    return "".join(regex_item(op, av) for op, av in items)
+
+
+def regex_item(op, av) -> str:
+    name = op.name
+    if name == "LITERAL":
+        return re.escape(chr(av))
+    elif name == "NOT_LITERAL":
+        return f"[^{re.escape(chr(av))}]"
+    elif name == "ANY":
+        return "."
+    elif name == "IN":
+        return charset(av)
+    elif name in ("AT", "ASSERT", "ASSERT_NOT"):
+        return ""
+    elif name == "BRANCH":
+        return "(?:%s)" % "|".join(regex(branch) for branch in av[1])
+    elif name == "SUBPATTERN":
+        return with_flags(av, regex(av[-1]))
+    elif name in ("MAX_REPEAT", "MIN_REPEAT", "POSSESSIVE_REPEAT"):
+        lo, hi, item = av
+        hi = "" if hi == sre_parse.MAXREPEAT else hi
+        return f"(?:{regex(item)}){{{lo},{hi}}}"
+    elif name == "ATOMIC_GROUP":
+        return f"(?:{regex(av)})"
+    raise Untranslatable(name)
+
+
+def charset(items) -> str:
+    parts = []
+    for op, av in items:
+        name = op.name
+        if name == "NEGATE":
+            parts.insert(0, "^")
+        elif name == "LITERAL":
+            parts.append(re.escape(chr(av)))
+        elif name == "RANGE":
+            parts.append(f"{re.escape(chr(av[0]))}-{re.escape(chr(av[1]))}")
+        elif name == "CATEGORY" and av.name in CATEGORIES:
+            parts.append(CATEGORIES[av.name])
+        else:
+            raise Untranslatable(name)
+    return "[%s]" % "".join(parts)
+
+
+def with_flags(subpattern, body) -> str:
+    """
+    Wrap body in a non-capturing group with the inline flags of subpattern.
+    """
+    add, remove = subpattern[1:3] if len(subpattern) == 4 else (0, 0)
+    if (add | remove) & ~sum(FLAGS):
+        raise Untranslatable("SUBPATTERN")
+    if not (add or remove):
+        return f"(?:{body})"
+    add = "".join(c for flag, c in FLAGS.items() if add & flag)
+    remove = "".join(c for flag, c in FLAGS.items() if remove & flag)
+    return f"(?{add}{'-' + remove if remove else ''}:{body})"
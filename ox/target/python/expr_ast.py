@@ -4,7 +4,7 @@ from sidekick import curry, uncons, Node
 from .operators import UnaryOp as UnaryOpEnum, BinaryOp as BinaryOpEnum, ComparisonOp
 from ... import ast
 from ...ast import Tree
-from ...ast.utils import wrap_tokens, attr_property, intersperse
+from ...ast.utils import wrap_parts, attr_property, intersperse_parts
 
 PyAtom = (type(None), type(...), bool, int, float, complex, str, bytes)
 PyAtomT = Union[None, bool, int, float, complex, str, bytes]  # ..., NotImplemented
@@ -154,9 +154,9 @@ class Atom(ast.AtomMixin, ExprLeaf):
     def _repr_as_child(self):
         return self._repr()
 
-    def tokens(self, ctx):
+    def _tokens(self, ctx):
         # Ellipsis is repr'd as "Ellipsis"
-        yield "..." if self.value is ... else repr(self.value)
+        return ("..." if self.value is ... else repr(self.value),)
 
 
 class Name(ast.NameMixin, ExprLeaf):
@@ -219,9 +219,8 @@ class UnaryOp(ast.UnaryOpMixin, ExprNode):
     class Meta:
         sexpr_skip = ("+", "-")
 
-    def tokens(self, ctx):
-        yield self.op.value
-        yield from self.expr.tokens(ctx)
+    def _tokens(self, ctx):
+        return self.op.value, self.expr
 
     def from_static_children(self, child):
         return to_expr(self.tag.function(child))
@@ -251,10 +250,12 @@ class BinOp(ast.BinaryOpMixin, ExprNode):
             return True
         return False
 
-    def tokens(self, ctx):
-        yield from self.child_tokens(self.lhs, "lhs", ctx)
-        yield f" {self.op.value} "
-        yield from self.child_tokens(self.rhs, "rhs", ctx)
+    def _tokens(self, ctx):
+        return (
+            *self.child_parts(self.lhs, "lhs"),
+            f" {self.op.value} ",
+            *self.child_parts(self.rhs, "rhs"),
+        )
 
 
 class Compare(ExprNode):
@@ -290,16 +291,15 @@ class Compare(ExprNode):
         self._tag = tag
         Node.__init__(self, children, **kwargs)
 
-    def child_tokens(self, child, role, ctx):
-        wrap = isinstance(child, (And, Or))
-        yield from wrap_tokens(child.tokens(ctx), wrap)
+    def wrap_child_tokens(self, child, role):
+        return isinstance(child, (And, Or))
 
-    def tokens(self, ctx):
-        first, rest = uncons(self.child_tokens(x, "child", ctx) for x in self._children)
-        yield from first
+    def _tokens(self, ctx):
+        first, rest = uncons(self.child_parts(x, "child") for x in self._children)
+        yield first
         for op, item in zip(self.op_list, rest):
             yield f" {op.value} "
-            yield from item
+            yield item
 
 
 class Starred(ExprNode):
@@ -313,10 +313,10 @@ class Starred(ExprNode):
     expr: Expr
     kwstar: bool = False
 
-    def tokens(self, ctx):
+    def _tokens(self, ctx):
         wrap = isinstance(self.expr, (And, Or))
         yield ("**" if self.kwstar else "*")
-        yield from wrap_tokens(self.expr.tokens(ctx), wrap)
+        yield wrap_parts(self.expr, wrap)
 
 
 class As(ExprNode):
@@ -327,10 +327,10 @@ class As(ExprNode):
     expr: Expr
     alias: Expr
 
-    def tokens(self, ctx):
-        yield from self.expr.tokens(ctx)
+    def _tokens(self, ctx):
+        yield self.expr
         yield " as "
-        yield from self.alias.tokens(ctx)
+        yield self.alias
 
 
 class Keyword(ExprNode):
@@ -346,10 +346,10 @@ class Keyword(ExprNode):
     def __init__(self, expr, name, **kwargs):
         super().__init__(expr, name, **kwargs)
 
-    def tokens(self, ctx):
+    def _tokens(self, ctx):
         yield self.name
         yield "="
-        yield from self.expr.tokens(ctx)
+        yield self.expr
 
 
 class GetAttr(ast.GetAttrMixin, ExprNode):
@@ -398,7 +398,7 @@ class Slice(ExprNode):
         step = step or Atom(None)
         super().__init__(start, stop, step, **kwargs)
 
-    def tokens(self, ctx):
+    def _tokens(self, ctx):
         is_none = lambda x: isinstance(x, Atom) and x.value is None
         start = self.start
         stop = self.stop
@@ -409,13 +409,13 @@ class Slice(ExprNode):
             return
 
         if not is_none(start):
-            yield from start.tokens(ctx)
+            yield start
         yield ":"
         if not is_none(stop):
-            yield from stop.tokens(ctx)
+            yield stop
         yield ":"
         if not is_none(step):
-            yield from step.tokens(ctx)
+            yield step
 
 
 class Call(ExprNode):
@@ -466,14 +466,14 @@ class Call(ExprNode):
         self.args.children.extend(args)
         return args
 
-    def tokens(self, ctx):
+    def _tokens(self, ctx):
         e = self.expr
         if isinstance(e, (BinOp, UnaryOp, And, Or)):
-            yield from wrap_tokens(self.expr.tokens(ctx))
+            yield wrap_parts(self.expr)
         elif isinstance(e, Atom) and isinstance(e.value, (int, float, complex)):
-            yield from wrap_tokens(self.expr.tokens(ctx))
+            yield wrap_parts(self.expr)
         else:
-            yield from self.expr.tokens(ctx)
+            yield self.expr
 
         children = iter(self.args.children)
 
@@ -483,10 +483,10 @@ class Call(ExprNode):
         except StopIteration:
             pass
         else:
-            yield from arg.tokens(ctx)
+            yield arg
             for arg in children:
                 yield ", "
-                yield from arg.tokens(ctx)
+                yield arg
         yield ")"
 
 
@@ -559,16 +559,14 @@ class Lambda(ExprNode):
         cls, expr, *args = args
         return cls(Tree("args", generate_def_args(*args, **kwargs)), expr)
 
-    def tokens(self, ctx):
+    def _tokens(self, ctx):
         if self.args.children:
             yield "lambda "
-            yield from intersperse(
-                ", ", map(lambda x: x.tokens(ctx), self.args.children)
-            )
+            yield intersperse_parts(", ", self.args.children)
             yield ": "
         else:
             yield "lambda: "
-        yield from self.expr.tokens(ctx)
+        yield self.expr
 
 
 def generate_def_args(*args, **kwargs):
@@ -632,17 +630,17 @@ class ArgDef(ExprNode):
         annotation = Void() if annotation is None else annotation
         super().__init__(name, default, annotation, **kwargs)
 
-    def tokens(self, ctx):
-        yield from self.arg.tokens(ctx)
+    def _tokens(self, ctx):
+        yield self.arg
         if self.annotation:
             yield ": "
-            yield from self.annotation.tokens(ctx)
+            yield self.annotation
             if self.default:
                 yield " = "
-                yield from self.default.tokens(ctx)
+                yield self.default
         if self.default:
             yield "="
-            yield from self.default.tokens(ctx)
+            yield self.default
 
     def __eq__(self, other):
         if (
@@ -663,13 +661,13 @@ class Ternary(ExprNode):
     then: Expr
     other: Expr
 
-    def tokens(self, ctx):
+    def _tokens(self, ctx):
         cond, then, other = self.cond, self.then, self.other
-        yield from wrap_tokens(then.tokens(ctx), wrap=isinstance(then, Ternary))
+        yield wrap_parts(then, wrap=isinstance(then, Ternary))
         yield " if "
-        yield from wrap_tokens(cond.tokens(ctx), wrap=isinstance(cond, Ternary))
+        yield wrap_parts(cond, wrap=isinstance(cond, Ternary))
         yield " else "
-        yield from other.tokens(ctx)
+        yield other
 
 
 class Container(ExprNode):
@@ -687,24 +685,19 @@ class Container(ExprNode):
     def __init__(self, children, **kwargs):
         Node.__init__(self, children, **kwargs)
 
-    def tokens(self, ctx):
+    def _tokens(self, ctx):
         left, right = self._meta.brackets
         sep = self._meta.separator
         yield left
         if self._children:
-            yield from intersperse(sep, (x.tokens(ctx) for x in self._children))
+            yield intersperse_parts(sep, self._children)
         yield right
 
-    def _simplify_or_copy(self, recur):
-        meta = self._meta
-        new = object.__new__(type(self))
-        new._parent = None
-        new._attrs = self._attrs.copy()
-        new._children = [c.copy() for c in self._children]
-        if meta.has_tag_field:
-            new._tag = self._tag
-        for attr in meta.children_fields:
-            setattr(new, attr, recur(getattr(self, attr)))
+    def _rebuild(self, children):
+        new = super()._rebuild(children)
+        new._children = list(children)
+        for child in children:
+            child._parent = new
         return new
 
 
@@ -716,16 +709,15 @@ class Tuple(Container):
     class Meta:
         brackets = "()"
 
-    def tokens(self, ctx, mode="std"):
+    def _tokens(self, ctx, mode="std"):
         if mode == "expr-list" or mode == "no-paren" and len(self.children) > 1:
-            children = map(lambda x: x.tokens(ctx), self._children)
-            yield from intersperse(", ", children)
+            yield intersperse_parts(", ", self._children)
         elif len(self.children) == 1:
             yield "("
-            yield from self.children[0].tokens(ctx)
+            yield self.children[0]
             yield ",)"
         else:
-            yield from super().tokens(ctx)
+            yield super()._tokens(ctx)
 
 
 class List(Container):
@@ -745,11 +737,11 @@ class Set(Container):
     class Meta:
         brackets = "{}"
 
-    def tokens(self, ctx):
+    def _tokens(self, ctx):
         if self.is_empty:
             yield "set()"
         else:
-            yield from super().tokens(ctx)
+            yield super()._tokens(ctx)
 
 
 class Dict(Container):
@@ -771,13 +763,13 @@ class Dict(Container):
             items.append(v)
         return cls(items, **kwargs)
 
-    def tokens(self, ctx):
+    def _tokens(self, ctx):
         children = iter(self._children)
         yield "{"
         for idx, k in enumerate(children):
             if idx:
                 yield ", "
-            yield from k.tokens(ctx)
+            yield k
             yield ": "
-            yield from next(children).tokens(ctx)
+            yield next(children)
         yield "}"
@@ -1,7 +1,7 @@
 from functools import partial
 
 from ox.ast import Tree
-from ox.ast.utils import intersperse
+from ox.ast.utils import intersperse_parts
 from ox.target.python.operators import Inplace as InplaceOpEnum
 from sidekick import curry, alias
 from .expr_ast import (
@@ -124,7 +124,7 @@ class Cmd(StmtLeaf):
             CmdEnum.CONTINUE: cls.Continue,
         }
 
-    def tokens(self, ctx):
+    def _tokens(self, ctx):
         yield self.value.value
 
 
@@ -175,19 +175,17 @@ class Function(StmtNode):
         annotation = Void() if annotation is None else annotation
         super().__init__(name, args, body, annotation, **kwargs)
 
-    def tokens(self, ctx):
+    def _tokens(self, ctx):
         yield "def "
-        yield from self.name.tokens(ctx)
+        yield self.name
         yield "("
         if self.args.children:
-            yield from intersperse(
-                ", ", map(lambda x: x.tokens(ctx), self.args.children)
-            )
+            yield intersperse_parts(", ", self.args.children)
         yield ")"
         if self.annotation:
             yield " -> "
-            yield from self.annotation.tokens(ctx)
-        yield from self.body.tokens_as_block(ctx)
+            yield self.annotation
+        yield self.body._tokens_as_block(ctx)
 
 
 class Del(StmtNode):
@@ -210,13 +208,13 @@ class Del(StmtNode):
 
         return {"del": del_statement}
 
-    def tokens(self, ctx):
+    def _tokens(self, ctx):
         if isinstance(self.expr, Tuple) and self.expr.children:
             yield ctx.start_line()
             yield "del "
-            yield from self.expr.tokens(ctx, mode="expr-list")
+            yield self.expr._tokens(ctx, mode="expr-list")
         else:
-            yield from super().tokens(ctx)
+            yield super()._tokens(ctx)
 
 
 class Assign(StmtNode):
@@ -232,11 +230,11 @@ class Assign(StmtNode):
         e = to_expr
         return {"=": lambda x, y: cls(e(x), e(y))}
 
-    def tokens(self, ctx):
+    def _tokens(self, ctx):
         yield ctx.start_line()
-        yield from self.lhs.tokens(ctx)
+        yield self.lhs
         yield " = "
-        yield from self.rhs.tokens(ctx)
+        yield self.rhs
 
 
 class Inplace(StmtNode):
@@ -257,11 +255,11 @@ class Inplace(StmtNode):
         sexprs.update({op.value: partial(fn, op) for op in InplaceOpEnum})
         return sexprs
 
-    def tokens(self, ctx):
+    def _tokens(self, ctx):
         yield ctx.start_line()
-        yield from self.lhs.tokens(ctx)
+        yield self.lhs
         yield f" {self.tag.value} "
-        yield from self.rhs.tokens(ctx)
+        yield self.rhs
 
 
 class ExprStmt(StmtNode):
@@ -271,9 +269,9 @@ class ExprStmt(StmtNode):
 
     expr: Expr
 
-    def tokens(self, ctx):
+    def _tokens(self, ctx):
         yield ctx.start_line()
-        yield from self.expr.tokens(ctx)
+        yield self.expr
 
 
 class If(ast.BodyElseMixin, Stmt):
@@ -295,14 +293,14 @@ class If(ast.BodyElseMixin, Stmt):
         other = Block([]) if other is None else other
         super().__init__(cond, block, other, **kwargs)
 
-    def tokens(self, ctx, _command="if "):
+    def _tokens(self, ctx, _command="if "):
         yield ctx.start_line() + _command
-        yield from self.cond.tokens(ctx)
+        yield self.cond
         if isinstance(self.other, If):
-            yield from self.body.tokens_as_block(ctx)
-            yield from self.other.tokens(ctx, "elif ")
+            yield self.body._tokens_as_block(ctx)
+            yield self.other._tokens(ctx, "elif ")
         else:
-            yield from super().tokens(ctx)
+            yield super()._tokens(ctx)
 
 
 class While(ast.BodyElseMixin, Stmt):
@@ -325,10 +323,10 @@ class While(ast.BodyElseMixin, Stmt):
         other = Block([]) if other is None else other
         super().__init__(expr, block, other, **kwargs)
 
-    def tokens(self, ctx):
+    def _tokens(self, ctx):
         yield ctx.start_line() + "while "
-        yield from self.cond.tokens(ctx)
-        yield from super().tokens(ctx)
+        yield self.cond
+        yield super()._tokens(ctx)
 
 
 class ImportFrom(StmtNode):
@@ -362,9 +360,9 @@ class ImportFrom(StmtNode):
         expr = Atom(...) if expr is None else expr
         super().__init__(mod, expr, level, **kwargs)
 
-    def tokens(self, ctx):
+    def _tokens(self, ctx):
         yield ctx.start_line()
         yield "from "
-        yield from self.mod.tokens(ctx)
+        yield self.mod
         yield " import "
-        yield from self.expr.tokens(ctx)
+        yield self.expr
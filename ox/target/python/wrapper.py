@@ -4,7 +4,7 @@ from .expr_ast import Name, Expr, PyAtom, Atom
 from .operators import Inplace as InplaceOpEnum
 from .stmt_ast import Stmt, Cmd, Block, Assign, Inplace
 from .utils import is_python_name
-from ...ast.wrapper import Wrapper, unwrap, unwrap_nested, wrap as _wrap
+from ...ast.wrapper import Wrapper, unwrap, unwrap_nested, wrap as _wrap, _take_nested
 
 wrap = lambda x: _wrap(x, Py)
 
@@ -15,7 +15,7 @@ class Py(Wrapper, roots=(Expr, Stmt)):
     """
 
     def __repr__(self):
-        ref = unwrap(self)
+        ref = self._Wrapper__ref
         if isinstance(ref, Atom):
             return f"py({ref.value!r})"
         src = ref.source().strip("\n")
@@ -33,8 +33,8 @@ class PyMagic:
     """
 
     def __call__(self, *args, **kwargs):
-        args = tuple(map(unwrap_nested, args))
-        kwargs = {k: unwrap_nested(v) for k, v in kwargs.items()}
+        args = tuple(map(_take_nested, args))
+        kwargs = {k: _take_nested(v) for k, v in kwargs.items()}
         return wrap(S(*args, **kwargs))
 
     def __getattr__(self, item):
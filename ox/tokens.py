@@ -0,0 +1,334 @@
+"""
+Compact token sequences.
+
+A TokenStream stores the type, position and line information of each token in
+parallel arrays instead of creating a Lark token for each match. Tokens are
+created on demand when the stream is indexed or iterated.
+
+A TokenList is the result of relexing after text edits: tokens after an edit
+are moved to their new positions only when they are accessed.
+"""
+from array import array
+from bisect import bisect_right
+from collections.abc import Sequence
+from operator import eq
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from lark import Token, UnexpectedCharacters
+from lark.lexer import TraditionalLexer
+
+
+class TokenStream(Sequence):
+    """
+    Sequence of tokens backed by parallel arrays.
+
+    Each token costs about 26 bytes of storage. Token values are slices of the
+    source string, except for tokens whose value was changed by a callback:
+    those are kept in the sparse ``values`` dictionary.
+
+    Use :meth:`ox.lexer.Lexer.token_stream` to create instances.
+    """
+
+    def __init__(self, source: str, type_names: List[str]):
+        self.source = source
+        self.type_names = list(type_names)
+        self.type_ids = array("H")
+        self.starts = array("q")
+        self.ends = array("q")
+        self.lines = array("I")
+        self.columns = array("I")
+        self.values = {}
+
+    def __len__(self):
+        return len(self.type_ids)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self.token(i) for i in range(*idx.indices(len(self)))]
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError("token index out of range")
+        return self.token(idx)
+
+    def __iter__(self):
+        return map(self.token, range(len(self)))
+
+    def __repr__(self):
+        return f"<TokenStream: {len(self)} tokens>"
+
+    def token(self, idx) -> Token:
+        """
+        Create Lark token at the given non-negative index.
+        """
+        start, end = self.starts[idx], self.ends[idx]
+        text = self.source[start:end]
+        line = end_line = self.lines[idx]
+        column = self.columns[idx]
+        newlines = text.count("\n")
+        if newlines:
+            end_line += newlines
+            end_column = len(text) - text.rindex("\n")
+        else:
+            end_column = column + len(text)
+
+        type_ = self.type_names[self.type_ids[idx]]
+        tk = Token(type_, text, start, line, column, end_line, end_column)
+        if idx in self.values:
+            tk.value = self.values[idx]
+        return tk
+
+    def type(self, idx) -> str:
+        """
+        Type of the token at the given index, without creating the token.
+        """
+        return self.type_names[self.type_ids[idx]]
+
+    def nbytes(self) -> int:
+        """
+        Memory used by the arrays that store token data.
+        """
+        arrays = [self.type_ids, self.starts, self.ends, self.lines, self.columns]
+        return sum(arr.itemsize * len(arr) for arr in arrays)
+
+    @classmethod
+    def scan(cls, lexer: TraditionalLexer, src: str) -> "TokenStream":
+        """
+        Tokenize string with a Lark lexer.
+
+        Callbacks are executed during scanning, since they can change the
+        type of tokens.
+        """
+        names = [t.name for t in lexer.terminals]
+        type_ids = {name: i for i, name in enumerate(names)}
+        new = cls(src, names)
+        add_type = new.type_ids.append
+        add_start = new.starts.append
+        add_end = new.ends.append
+        add_line = new.lines.append
+        add_column = new.columns.append
+        values = new.values
+
+        ignore_types = frozenset(lexer.ignore_types)
+        callbacks = lexer.callback
+
+        def error(pos, line, column):
+            allowed = {v for m, tfi in lexer.mres for v in tfi.values()}
+            allowed = (allowed - ignore_types) or {"<END-OF-FILE>"}
+            history = len(new) and [new.token(len(new) - 1)]
+            raise UnexpectedCharacters(
+                src, pos, line, column, allowed=allowed, token_history=history
+            )
+
+        matches = scan_matches(
+            lexer.match,
+            src,
+            newline_types=frozenset(lexer.newline_types),
+            skip_types=ignore_types - callbacks.keys(),
+            error=error,
+        )
+        for type_, value, pos, line, column, _, _ in matches:
+            if type_ in ignore_types:
+                callbacks[type_](Token(type_, value, pos, line, column))
+                continue
+            if type_ in callbacks:
+                tk = callbacks[type_](Token(type_, value, pos, line, column))
+                type_ = tk.type
+                if tk.value is not value:
+                    values[len(new)] = tk.value
+                if type_ not in type_ids:
+                    type_ids[type_] = len(new.type_names)
+                    new.type_names.append(type_)
+            add_type(type_ids[type_])
+            add_start(pos)
+            add_end(pos + len(value))
+            add_line(line)
+            add_column(column)
+
+        return new
+
+
+class TokenList(Sequence):
+    """
+    Immutable sequence of tokens made of segments of other token lists.
+
+    Each segment is a slice of a list of tokens, optionally moved by a shift.
+    Moved tokens are created when they are accessed, so splicing and shifting
+    cost O(number of segments) instead of O(number of tokens). The segments
+    are merged into a single list when there are more than max_segments.
+    """
+
+    max_segments = 64
+
+    def __init__(self, tokens=()):
+        if isinstance(tokens, TokenList):
+            segments = tokens._segments
+        else:
+            tokens = list(tokens)
+            segments = [(tokens, 0, len(tokens), None)] if tokens else []
+        self._set_segments(segments)
+
+    def _set_segments(self, segments):
+        if len(segments) > self.max_segments:
+            tokens = [tk for seg in segments for tk in _segment_tokens(*seg)]
+            segments = [(tokens, 0, len(tokens), None)]
+        self._segments = segments
+        self._ends = ends = []
+        size = 0
+        for _, lo, hi, _ in segments:
+            size += hi - lo
+            ends.append(size)
+
+    @classmethod
+    def _from_segments(cls, segments) -> "TokenList":
+        new = cls.__new__(cls)
+        new._set_segments(segments)
+        return new
+
+    def __len__(self):
+        return self._ends[-1] if self._ends else 0
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            start, stop, step = idx.indices(len(self))
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            return self._from_segments(self._cut(start, stop))
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError("token index out of range")
+        k = bisect_right(self._ends, idx)
+        tokens, lo, hi, shift = self._segments[k]
+        tk = tokens[lo + idx - (self._ends[k] - hi + lo)]
+        return tk if shift is None else _shift_token(tk, *shift)
+
+    def __iter__(self):
+        for seg in self._segments:
+            yield from _segment_tokens(*seg)
+
+    def __eq__(self, other):
+        if isinstance(other, (list, tuple, TokenList)):
+            return len(self) == len(other) and all(map(eq, self, other))
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"<TokenList: {len(self)} tokens, {len(self._segments)} segments>"
+
+    def splice(self, start, stop, tokens) -> "TokenList":
+        """
+        Return a copy in which self[start:stop] is replaced by tokens.
+        """
+        tokens = list(tokens)
+        new = [(tokens, 0, len(tokens), None)] if tokens else []
+        return self._from_segments(
+            [*self._cut(0, start), *new, *self._cut(stop, len(self))]
+        )
+
+    def shift(self, start, delta, line, column) -> "TokenList":
+        """
+        Return a copy in which tokens from start on are moved by delta
+        characters, so self[start] begins at the given line and column.
+
+        Columns change only for tokens in the line of self[start].
+        """
+        if start >= len(self):
+            return self
+        ref = self[start]
+        dl = line - ref.line
+        dc = column - ref.column
+        segments = self._cut(0, start)
+        for tokens, lo, hi, shift in self._cut(start, len(self)):
+            delta_, dl_, columns = shift or (0, 0, {})
+            if dc:
+                columns = dict(columns)
+                ref_line = ref.line - dl_
+                columns[ref_line] = columns.get(ref_line, 0) + dc
+            segments.append((tokens, lo, hi, (delta_ + delta, dl_ + dl, columns)))
+        return self._from_segments(segments)
+
+    def _cut(self, start, stop) -> list:
+        """
+        Return the segments of self[start:stop].
+        """
+        segments = []
+        begin = 0
+        for seg, end in zip(self._segments, self._ends):
+            if end > start and begin < stop:
+                tokens, lo, hi, shift = seg
+                new_lo = lo + max(start - begin, 0)
+                new_hi = hi - max(end - stop, 0)
+                segments.append((tokens, new_lo, new_hi, shift))
+            begin = end
+        return segments
+
+
+def _segment_tokens(tokens, lo, hi, shift):
+    if shift is None:
+        return iter(tokens[lo:hi])
+    delta, dl, columns = shift
+    return (_shift_token(tk, delta, dl, columns) for tk in tokens[lo:hi])
+
+
+def _shift_token(tk, delta, dl, columns) -> Token:
+    new = Token(
+        tk.type,
+        str(tk),
+        tk.pos_in_stream + delta,
+        tk.line + dl,
+        tk.column + columns.get(tk.line, 0),
+        tk.end_line + dl,
+        tk.end_column + columns.get(tk.end_line, 0),
+    )
+    new.value = tk.value
+    return new
+
+
+def scan_matches(
+    match: Callable,
+    text,
+    pos=0,
+    line=1,
+    line_start=0,
+    newline_types=(),
+    skip_types=(),
+    newline="\n",
+    error: Optional[Callable] = None,
+) -> Iterator[Tuple]:
+    """
+    Iterate over the successive matches of a lexer in text.
+
+    This is the scanning loop shared by all lexers in ox. match(text, pos)
+    must return a (value, type) pair, like the match method of Lark's
+    TraditionalLexer, or None.
+
+    Yield (type, value, pos, line, column, end_line, end_column) tuples for
+    each match, except those with a type in skip_types. Lines are counted in
+    the values of newline_types only. Positions, including line_start, are
+    indexes in text.
+
+    When match() returns None, error(pos, line, column) is called, if given,
+    and iteration stops.
+    """
+    size = len(text)
+    while pos < size:
+        res = match(text, pos)
+        if res is None:
+            if error is not None:
+                error(pos, line, pos - line_start + 1)
+            return
+        value, type_ = res
+        end = pos + len(value)
+        column = pos - line_start + 1
+        end_line = line
+        if type_ in newline_types:
+            newlines = value.count(newline)
+            if newlines:
+                end_line += newlines
+                line_start = pos + value.rindex(newline) + 1
+        if type_ not in skip_types:
+            yield type_, value, pos, line, column, end_line, end - line_start + 1
+        line = end_line
+        pos = end
@@ -1,8 +1,18 @@
+import copy
+import pickle
+
 import pytest
 from hypothesis import given
 from hypothesis import strategies as st
 
-from ox.ast import Expr, ExprNode, AtomMixin
+from ox.ast import Expr, ExprNode, AtomMixin, walk, traverse, fold, flatten_tokens
+from ox.ast import HashCons, common_subexpressions, structural_hash
+from ox.ast.ast_mixins import NameMixin
+from ox.ast.children import ChildrenView
+from ox import lexer
+from ox.ast.token import Token
+from ox.ast.utils import EMPTY_ATTRS, compile_template, get_renderer
+from ox.target.python import BinOp, GetAttr, List, Name, Return
 from sidekick.hypothesis.tree import kwargs
 from sidekick.tree import Leaf, Node, SExprBase
 
@@ -153,6 +163,38 @@ class TestCalcLanguageAST:
         assert a in e.children
         assert b in e.children
 
+    def test_children_are_views_over_fields(self):
+        a, b = Number(1), Number(2)
+        e = Add(a, b)
+        assert isinstance(Add.__dict__["_children"], ChildrenView)
+        assert e.children == [a, b]
+        assert len(e.children) == 2
+
+        c = Number(3)
+        e.children[1] = c
+        assert e.rhs is c
+        assert e.copy().children == [a, c]
+
+    def test_copy_deepcopy_and_pickle(self):
+        e = Add(Mul(Number(1), Number(2)), Number(3))
+        e.attrs["comment"] = ["x"]
+        for cp in [copy.copy(e), copy.deepcopy(e), pickle.loads(pickle.dumps(e))]:
+            assert cp == e and cp is not e and cp.lhs is not e.lhs
+            assert cp.parent is None
+            assert cp.lhs.parent is cp and cp.lhs.lhs.parent is cp.lhs
+            assert cp.children == [cp.lhs, cp.rhs]
+        assert copy.deepcopy(e).attrs["comment"] is not e.attrs["comment"]
+
+        sub = copy.deepcopy(e.lhs)
+        assert sub == e.lhs and sub.parent is None
+        assert e.lhs.parent is e
+
+    def test_copy_variadic_nodes(self):
+        e = List([Name("x"), BinOp("*", Name("a"), Name("b"))])
+        for cp in [copy.copy(e), copy.deepcopy(e), pickle.loads(pickle.dumps(e))]:
+            assert cp == e and cp.source() == "[x, a * b]"
+            assert all(child.parent is cp for child in cp.children)
+
     def test_has_a_single_coerce_function_per_root(self):
         assert Add._meta.coerce is Calc._meta.coerce
         assert Number._meta.coerce is Calc._meta.coerce
@@ -176,3 +218,313 @@ class TestASTInvariants:
         else:
             assert e.lhs == cp.lhs
             assert e.rhs == cp.rhs
+
+
+class TestNodeInit:
+    def test_init_method_is_generated_from_source(self):
+        assert "_set(lhs, '_parent', self)" in Add._init._source
+        assert Add._init.__qualname__ == "Add._init"
+
+    def test_generated_init_validates_arguments(self):
+        with pytest.raises(TypeError):
+            Add(Number(1))
+
+        with pytest.raises(TypeError):
+            Add(Number(1), Number(2), Number(3))
+
+    def test_generated_init_rejects_children_with_parent(self):
+        a = Number(1)
+        Add(a, Number(2))
+        with pytest.raises(ValueError):
+            Sub(a, Number(3))
+
+    def test_generated_init_accepts_parent_and_attributes(self):
+        parent = Add(Number(1), Number(2))
+        e = Mul(Number(3), Number(4), parent=parent, extra=42)
+        assert e.parent is parent
+        assert e.attrs == {"extra": 42}
+
+
+class TestTraversal:
+    def tree(self):
+        return Add(Mul(Number(1), Number(2)), Number(3))
+
+    def test_walk(self):
+        pre = [type(x).__name__ for x in walk(self.tree())]
+        post = [type(x).__name__ for x in walk(self.tree(), "post")]
+        assert pre == ["Add", "Mul", "Number", "Number", "Number"]
+        assert post == ["Number", "Number", "Mul", "Number", "Add"]
+
+        with pytest.raises(ValueError):
+            walk(self.tree(), "in")
+
+    def test_traverse_hooks(self):
+        events = []
+        name = lambda x: type(x).__name__
+
+        def enter(x):
+            events.append(("enter", name(x)))
+            return not isinstance(x, Mul)
+
+        traverse(self.tree(), enter, lambda x: events.append(("exit", name(x))))
+        assert events == [
+            ("enter", "Add"),
+            ("enter", "Mul"),
+            ("exit", "Mul"),
+            ("enter", "Number"),
+            ("exit", "Number"),
+            ("exit", "Add"),
+        ]
+
+    def test_fold(self):
+        ops = {Add: sum, Mul: lambda xs: xs[0] * xs[1]}
+        func = lambda x, xs: x.value if x.is_leaf else ops[type(x)](xs)
+        assert fold(self.tree(), func) == 5
+
+    def test_deep_tree(self):
+        tree = Number(0)
+        for i in range(1, 5000):
+            tree = Add(tree, Number(i))
+        assert fold(tree, lambda x, xs: x.value if x.is_leaf else sum(xs)) == 12497500
+        assert sum(1 for _ in walk(tree, "post")) == 9999
+
+    def test_flatten_tokens(self):
+        tokens = ["a", iter([" + ", ("b", [" * ", "c"])])]
+        assert "".join(flatten_tokens(tokens)) == "a + b * c"
+
+
+class TestTemplates:
+    def test_compile_template(self):
+        assert compile_template("{a}.{b}") == (("", "a"), (".", "b"))
+        render = get_renderer("{{{x}}}!")
+        assert "".join(flatten_tokens(render({"x": ["a"]}))) == "{a}!"
+        assert compile_template("{x!r}") is None
+        assert compile_template("{x:>4}") is None
+        assert compile_template("{0}") is None
+        assert compile_template("{x} {x}") is None
+
+    def test_renderer_yields_token_streams(self):
+        stream = iter(["a", "+", "b"])
+        tokens = list(get_renderer("({expr})")({"expr": stream}))
+        assert tokens == ["(", stream, ")"]
+        assert "".join(flatten_tokens(tokens)) == "(a+b)"
+
+    def test_fallback_renderer(self):
+        render = get_renderer("{x} = {x!r}")
+        assert list(render({"x": ["a", "b"]})) == ["ab = 'ab'"]
+
+    def test_renderers_are_cached(self):
+        hits = get_renderer.cache_info().hits
+        assert get_renderer("{a}.{b}") is get_renderer("{a}.{b}")
+        assert get_renderer.cache_info().hits > hits
+
+
+class Cached(Expr):
+    class Meta:
+        abstract = True
+        root = True
+        source_cache = True
+        hash_cache = True
+
+
+class CachedName(NameMixin, Cached):
+    class Meta:
+        types = (str,)
+
+
+class CachedAdd(ExprNode, Cached):
+    lhs: Cached
+    rhs: Cached
+
+    class Meta:
+        command = "{lhs} + {rhs}"
+
+
+class TestSourceCache:
+    def expr(self):
+        return CachedAdd(CachedAdd(CachedName("a"), CachedName("b")), CachedName("c"))
+
+    def test_source_is_cached(self, monkeypatch):
+        e = self.expr()
+        assert e.source() == "a + b + c"
+        assert e._source_cache[1] == "a + b + c"
+
+        monkeypatch.setattr(CachedAdd, "emit_parts", None)
+        assert e.source() == "a + b + c"
+
+    def test_subtree_cache_is_used_by_parent(self):
+        e = self.expr()
+        e.lhs.source()
+        e.lhs._source_cache = (e.print_context().cache_key(), "x")
+        assert e.source() == "x + c"
+
+    def test_cache_is_invalidated_on_mutation(self):
+        e = self.expr()
+        e.source()
+        e.rhs = CachedName("d")
+        assert e._source_cache is None
+        assert e.source() == "a + b + d"
+
+        e.children[1] = CachedName("e")
+        assert e.source() == "a + b + e"
+
+    def test_mutation_of_descendant_invalidates_ancestors(self):
+        e = self.expr()
+        e.source()
+        e.lhs.lhs = CachedName("z")
+        assert e._source_cache is None and e.lhs._source_cache is None
+        assert e.source() == "z + b + c"
+
+    def test_mutation_below_uncached_node_invalidates_ancestors(self):
+        e = CachedAdd(BinOp("-", Name("a"), Name("b")), CachedName("c"))
+        h = hash(e)
+        assert e.source() == "a - b + c"
+        e.lhs.lhs = Name("z")
+        assert e.source() == "z - b + c"
+        assert hash(e) != h
+
+    def test_mutation_of_children_list_invalidates_ancestors(self):
+        e = CachedAdd(CachedName("a"), List([Name("x")]))
+        other = e.copy()
+        assert e.source() == "a + [x]" and hash(e) == hash(other)
+        e.rhs.children.append(Name("y"))
+        assert e.source() == "a + [x, y]"
+        assert e != other
+        del e.rhs.children[0]
+        assert e.source() == "a + [y]"
+
+    def test_cache_is_not_used_with_a_different_context(self):
+        e = self.expr()
+        e.source()
+        ctx = e.print_context()
+        ctx.indent = "\t"
+        assert e._source_cache[0] != ctx.cache_key()
+
+
+class TestStructuralHashing:
+    def test_equal_trees_have_equal_hashes(self):
+        e = expr(Add(Mul(Number(1), Number(2)), Mul(Number(1), Number(2))))
+        assert hash(e.lhs) == hash(e.rhs) == structural_hash(e.rhs.copy())
+        assert hash(e.lhs) != hash(Mul(Number(2), Number(1)))
+        assert len({e.lhs, e.rhs, e.copy().lhs}) == 1
+
+    def test_hash_is_cached_and_invalidated(self):
+        e = CachedAdd(CachedAdd(CachedName("a"), CachedName("b")), CachedName("c"))
+        h = hash(e)
+        assert e._hash == h and e.lhs._hash is not None
+        e.lhs.rhs = CachedName("d")
+        assert e._hash is None and e.lhs._hash is None
+        assert hash(e) != h
+
+    def test_attributes_do_not_change_cached_hashes(self):
+        e = CachedAdd(CachedName("a"), CachedName("b"))
+        other = e.copy()
+        table = {e}
+        e.attrs["comment"] = "x"
+        other.attrs["comment"] = "x"
+        assert other in table
+        assert hash(other) == hash(e) == structural_hash(e)
+
+    def test_expressions_and_statements_cache_hashes(self):
+        e = Add(Number(1), Number(2))
+        stmt = Return(GetAttr(Name("x"), "foo"))
+        assert hash(e) == e._hash and e.lhs._hash is not None
+        assert hash(stmt) == stmt._hash and stmt.expr._hash is not None
+
+    def test_hash_cons(self):
+        table = HashCons()
+        e = Add(Mul(Number(1), Number(2)), Mul(Number(1), Number(2)))
+        ids = table.ids(e)
+        assert ids[id(e.lhs)] == ids[id(e.rhs)] != ids[id(e)]
+        assert table.intern(e.rhs) is e.lhs
+        assert table.intern(Mul(Number(1), Number(2))) is e.lhs
+        assert len(table) == 4
+
+    def test_common_subexpressions(self):
+        e = Add(Mul(Number(1), Number(2)), Sub(Mul(Number(1), Number(2)), Number(2)))
+        (group,) = common_subexpressions(e)
+        assert group == [e.lhs, e.rhs.lhs]
+        assert len(common_subexpressions(e, min_size=1)) == 3
+
+
+class Slotted(Expr):
+    class Meta:
+        abstract = True
+        root = True
+        attr_slots = True
+
+
+class SlottedName(NameMixin, Slotted):
+    class Meta:
+        types = (str,)
+
+
+class SlottedAttr(ExprNode, Slotted):
+    expr: Slotted
+    attr: str
+
+
+class TestAttrSlots:
+    def test_option_is_opt_in(self):
+        assert SlottedAttr._meta.slot_fields == ("attr",)
+        assert GetAttr._meta.slot_fields == ()
+        assert GetAttr(Name("x"), "foo").attrs == {"attr": "foo"}
+
+    def test_nodes_without_attributes_share_empty_mapping(self):
+        e = SlottedAttr(SlottedName("x"), "foo")
+        assert e._attrs is SlottedName("y")._attrs is EMPTY_ATTRS
+        assert e.copy()._attrs is EMPTY_ATTRS
+
+        e.attrs["lineno"] = 1
+        assert e.attrs == {"lineno": 1}
+        assert EMPTY_ATTRS == {}
+
+    def test_declared_attributes_are_stored_in_slots(self):
+        e = SlottedAttr(SlottedName("x"), "foo")
+        assert e.attrs == {}
+        assert e == SlottedAttr(SlottedName("x"), "foo")
+        assert e != SlottedAttr(SlottedName("x"), "bar")
+        assert e.copy().attr == "foo"
+
+    def test_empty_attrs_can_be_copied_and_pickled(self):
+        name = SlottedName("x")
+        assert name._attrs is EMPTY_ATTRS
+        for new in [
+            copy.copy(name),
+            copy.deepcopy(name),
+            pickle.loads(pickle.dumps(name)),
+        ]:
+            assert new == name and new._attrs is EMPTY_ATTRS
+        with pytest.raises(TypeError):
+            EMPTY_ATTRS["x"] = 1
+
+
+class TestToken:
+    def test_positions_are_not_stored_in_attrs(self):
+        tk = Token("+", type="PLUS", start=(1, 3), end=(1, 4))
+        assert (tk.start, tk.end) == ((1, 3), (1, 4))
+        assert tk.attrs == {}
+        assert repr(tk) == "Token('+', 'PLUS', start=(1, 3), end=(1, 4))"
+
+    def test_positions_from_offset_tokens(self):
+        lex = lexer(NAME=r"\w+", WS=r"\s+", ignore="WS")
+        src = "foo\n  bar baz"
+        for tk in lex.lex_offsets(src):
+            node = Token.from_lark_token(tk)
+            assert (node.start, node.end) == (
+                (tk.line, tk.column),
+                (tk.end_line, tk.end_column),
+            )
+            assert node.copy().start == node.start
+        assert repr(node) == "Token('baz', 'NAME', start=(2, 7), end=(2, 10))"
+
+    def test_copy_preserves_positions(self):
+        tk = Token("+", type="PLUS", start=(1, 3), end=(1, 4))
+        tk.string = "plus"
+        cp = tk.copy()
+        assert (cp.type, cp.start, cp.end, cp.string) == (
+            "PLUS",
+            (1, 3),
+            (1, 4),
+            "plus",
+        )
@@ -0,0 +1,62 @@
+import pytest
+
+import ox
+from ox.cache import cache_dir, clear_cache, grammar_key, CACHE_SUFFIX
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return tmp_path / "ox-cache"
+
+
+def make_parser(cache):
+    lexer = ox.lexer(
+        NUMBER={r"\d+": int}, OP=r"[-+]", WS=r"\s+", ignore="WS", cache=cache
+    )
+    return ox.parser(
+        lexer,
+        expr={"expr OP atom": lambda x, op, y: (op.value, x, y), "atom": None},
+        atom={"NUMBER": lambda x: x.value},
+        cache=cache,
+    )
+
+
+class TestCache:
+    def test_cache_dir_resolution(self, monkeypatch, tmp_path):
+        monkeypatch.delenv("OX_CACHE_DIR", raising=False)
+        assert cache_dir() is None
+        assert cache_dir(False) is None
+        assert cache_dir(tmp_path) == tmp_path
+        assert cache_dir(True).name == "ox"
+
+        monkeypatch.setenv("OX_CACHE_DIR", str(tmp_path))
+        assert cache_dir() == tmp_path
+        assert cache_dir(False) is None
+
+    def test_grammar_key_depends_on_grammar_and_options(self):
+        key = grammar_key("start: A", {"parser": "lalr"})
+        assert key == grammar_key("start: A", {"parser": "lalr", "transformer": 1})
+        assert key != grammar_key("start: B", {"parser": "lalr"})
+        assert key != grammar_key("start: A", {"parser": "lalr", "start": "x"})
+
+    def test_parser_is_stored_and_reloaded_from_cache(self, cache):
+        parser = make_parser(cache)
+        assert parser("1 + 2 - 3") == ("-", ("+", 1, 2), 3)
+        entries = list(cache.glob("*" + CACHE_SUFFIX))
+        assert len(entries) == 2
+
+        cached = make_parser(cache)
+        assert cached("1 + 2 - 3") == ("-", ("+", 1, 2), 3)
+        assert [tk.value for tk in cached.lex("1 + 2")] == [1, "+", 2]
+        assert sorted(cache.glob("*" + CACHE_SUFFIX)) == sorted(entries)
+
+    def test_corrupt_entries_are_rebuilt(self, cache):
+        make_parser(cache)
+        for entry in cache.glob("*" + CACHE_SUFFIX):
+            entry.write_bytes(b"garbage")
+        assert make_parser(cache)("1 + 2") == ("+", 1, 2)
+
+    def test_clear_cache(self, cache):
+        make_parser(cache)
+        assert clear_cache(cache) == 2
+        assert clear_cache(cache) == 0
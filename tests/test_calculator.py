@@ -1,11 +1,16 @@
+import asyncio
 import importlib.util
 import io
+import mmap
 from contextlib import redirect_stdout
 from pathlib import Path
 
 import builtins
+import pytest
 from mock import patch
 
+from ox import LarkError, UnexpectedInput, UnexpectedToken
+
 path = Path(__file__).parent.parent / "examples" / "calculator.py"
 spec = importlib.util.spec_from_file_location("calculator", path)
 mod = importlib.util.module_from_spec(spec)
@@ -27,6 +32,73 @@ class TestCalculator:
         assert env == {"x": 2.0}
         assert mod.eval_expr("1 + x", env) == 3.0
 
+    def test_parse_binary_sources(self, tmp_path):
+        src = "(1 + 2) * x\n  + 3"
+        expected = mod.parser(src)
+        assert mod.parser(src.encode()) == expected
+        assert mod.parser(memoryview(src.encode())) == expected
+
+        path = tmp_path / "expr.txt"
+        path.write_text(src)
+        with open(path, "rb") as fd:
+            with mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                assert mod.parser(data) == expected
+
+    @pytest.mark.parametrize("workers", [0, 2])
+    def test_parse_many(self, workers):
+        sources = ["1 + 2", "x * (y + 1)", "2 ^ 3"] * 10
+        expected = list(map(mod.parser, sources))
+        result = mod.parser.parse_many(sources, workers=workers, chunksize=4)
+        assert list(result) == expected
+
+    @pytest.mark.parametrize("workers", [0, 2])
+    def test_parse_many_return_exceptions(self, workers):
+        sources = ["1 + 2", "1 + * 2", "3"]
+        result = list(
+            mod.parser.parse_many(sources, workers=workers, return_exceptions=True)
+        )
+        assert [idx for idx, _ in result] == [0, 1, 2]
+        assert result[0][1] == mod.parser("1 + 2")
+        error = result[1][1]
+        assert type(error) is UnexpectedToken
+        assert (error.line, error.column, error.token) == (1, 5, "*")
+        with pytest.raises(UnexpectedToken) as info:
+            mod.parser("1 + * 2")
+        assert str(error) == str(info.value)
+
+        with pytest.raises(UnexpectedInput):
+            list(mod.parser.parse_many(sources, workers=workers))
+
+    def test_parse_async(self):
+        src = "(1 + 2) * x\n  + 3"
+
+        async def parse():
+            reader = asyncio.StreamReader()
+            reader.feed_data(src.encode())
+            reader.feed_eof()
+            return await mod.parser.parse_async(reader)
+
+        assert asyncio.get_event_loop().run_until_complete(parse()) == mod.parser(src)
+
+    def test_parse_many_async(self):
+        sources = ["1 + 2", "1 + * 2", "x * (y + 1)"] * 5
+
+        async def chunks(src):
+            yield src[:2]
+            yield src[2:]
+
+        async def parse(**kwargs):
+            streams = map(chunks, sources)
+            return await mod.parser.parse_many_async(streams, limit=2, **kwargs)
+
+        result = asyncio.get_event_loop().run_until_complete(
+            parse(return_exceptions=True)
+        )
+        assert result[0] == mod.parser("1 + 2")
+        assert isinstance(result[1], LarkError)
+        with pytest.raises(LarkError):
+            asyncio.get_event_loop().run_until_complete(parse())
+
     def test_mainloop(self):
         inputs = "x = 1; y = 2; (x + y) * y; ; y".split("; ")
         out = io.StringIO()
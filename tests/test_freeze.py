@@ -0,0 +1,126 @@
+import subprocess
+import sys
+import types
+from pathlib import Path
+
+import pytest
+from mock import patch
+
+from ox.cli import main, load_source
+from ox.freeze import freeze, lambda_source
+
+path = Path(__file__).parent.parent / "examples" / "calculator.py"
+
+
+def exec_module(src, name="frozen"):
+    mod = types.ModuleType(name)
+    exec(compile(src, name + ".py", "exec"), vars(mod))
+    return mod
+
+
+@pytest.fixture(scope="module")
+def calculator():
+    mod, attr, parser = load_source(str(path))
+    return mod
+
+
+class TestFreeze:
+    def test_frozen_module_recreates_parser(self, calculator):
+        src = freeze(calculator.parser, module=calculator.__name__)
+        with patch("lark.lark.load_grammar", side_effect=AssertionError):
+            frozen = exec_module(src)
+
+        for expr in ["1 + 2", "(1 + 2) * x", "x = 2^3"]:
+            assert frozen.parser(expr) == calculator.parser(expr)
+        tokens = frozen.parser.lex("1 + x")
+        assert [tk.value for tk in tokens] == [1.0, "+", "x"]
+
+    def test_frozen_module_emits_globals(self, tmp_path):
+        src = "\n".join(
+            [
+                "import operator as op",
+                "import ox",
+                "ops = {'+': op.add, '-': op.sub}",
+                "def binop(x, o, y):",
+                "    return ops[o.value](x, y)",
+                "lexer = ox.lexer(INT={r'\\d+': int}, OP=r'[-+]')",
+                "parser = ox.parser(",
+                "    lexer,",
+                "    expr={'expr OP atom': binop, 'atom': None},",
+                "    atom={'INT': lambda x: x.value},",
+                ")",
+            ]
+        )
+        source = tmp_path / "source.py"
+        source.write_text(src)
+        mod, attr, parser = load_source(str(source))
+        frozen_src = freeze(parser, module=mod.__name__)
+        assert "def binop(x, o, y):" in frozen_src
+        assert exec_module(frozen_src).parser("1+2-4") == -1
+
+    def test_frozen_module_keeps_keyword_tables(self, tmp_path):
+        src = "\n".join(
+            [
+                "import ox",
+                "lexer = ox.lexer(",
+                "    IF='if',",
+                "    THEN='then',",
+                "    NAME=r'[a-z]+',",
+                "    NUMBER=r'\\d+',",
+                "    WS=r'\\s+',",
+                "    ignore='WS',",
+                "    number=int,",
+                ")",
+                "parser = ox.parser(",
+                "    lexer,",
+                "    stmt={'IF atom THEN atom': lambda i, a, t, b: (i, a, b)},",
+                "    atom={'NAME': str, 'NUMBER': int},",
+                ")",
+            ]
+        )
+        source = tmp_path / "keywords.py"
+        source.write_text(src)
+        mod, attr, parser = load_source(str(source))
+        frozen_src = freeze(parser, module=mod.__name__)
+        assert "{'NAME': {'if': 'IF', 'then': 'THEN'}}" in frozen_src
+
+        frozen = exec_module(frozen_src)
+        assert frozen.parser.keywords == parser.keywords
+        assert frozen.parser("if iffy then 42") == ("if", "iffy", 42)
+        tokens = frozen.parser.lex("if then iffy")
+        assert [tk.type for tk in tokens] == ["IF", "THEN", "NAME"]
+
+    def test_freeze_command(self, tmp_path):
+        output = tmp_path / "calc_frozen.py"
+        main(["freeze", f"{path}:parser", "-o", str(output)])
+        frozen = exec_module(output.read_text())
+        assert frozen.parser("2 * 3") == ("*", 2.0, 3.0)
+
+    def test_freeze_command_runs_as_module(self):
+        result = subprocess.run(
+            [sys.executable, "-m", "ox.cli", "freeze", f"{path}:parser"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+            cwd=str(path.parent.parent),
+        )
+        assert result.returncode == 0, result.stderr
+        assert exec_module(result.stdout).parser("2 * 3") == ("*", 2.0, 3.0)
+
+
+class TestLambdaSource:
+    def test_selects_lambda_in_line(self):
+        fns = [lambda x: x + 1, lambda x: x * 2]
+        assert [lambda_source(f) for f in fns] == ["lambda x: x + 1", "lambda x: x * 2"]
+
+    def test_multiline_lambda(self):
+        # fmt: off
+        fn = (lambda x:
+              x + 1)
+        # fmt: on
+        assert lambda_source(fn) == "(lambda x:\n              x + 1)"
+
+    def test_ambiguous_lambdas(self):
+        fns = [lambda x: x, lambda x: x]
+        with pytest.raises(ValueError):
+            lambda_source(fns[0])
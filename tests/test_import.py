@@ -0,0 +1,67 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import ox
+
+base = Path(__file__).parent.parent
+
+
+def imported_modules(code):
+    """
+    Return the list of modules loaded after executing code in a fresh
+    interpreter.
+
+    The list is read from sys.modules, since "-X importtime" requires
+    Python 3.7.
+    """
+    code += "\nimport sys\nprint('\\n'.join(sys.modules))"
+    cmd = [sys.executable, "-c", code]
+    out = subprocess.run(
+        cmd,
+        cwd=str(base),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+    )
+    assert out.returncode == 0, out.stderr
+    return out.stdout.splitlines()
+
+
+class TestImport:
+    def test_import_ox_does_not_load_lark(self):
+        modules = imported_modules("import ox")
+        assert "ox" in modules
+        assert "lark" not in modules
+        assert "sidekick" not in modules
+
+    def test_meta_grammars_are_not_compiled_by_simple_lexers(self):
+        code = "\n".join(
+            [
+                "import ox",
+                "from ox.grammar import load_grammar",
+                "ox.lexer(INT=r'\\d+', WS=r'\\s+', ignore='WS')",
+                "assert load_grammar.cache_info().currsize == 0",
+            ]
+        )
+        assert "lark" in imported_modules(code)
+
+    def test_lazy_attributes(self):
+        assert callable(ox.lexer)
+        assert callable(ox.parser)
+        assert issubclass(ox.UnexpectedCharacters, ox.LarkError)
+        assert {"lexer", "parse", "LexError"} <= set(dir(ox))
+
+    def test_submodules_do_not_shadow_functions(self):
+        from ox.lexer import Lexer
+        from ox.parser import Parser
+
+        assert Lexer and Parser
+        assert callable(ox.lexer) and callable(ox.parser)
+
+    def test_token_regex_matches_lark_grammar(self):
+        from ox.grammar import load_grammar
+        from ox.lexer import TOKEN
+
+        (token,) = [t for t in load_grammar("lark").terminals if t.name == "TOKEN"]
+        assert token.pattern.to_regexp() == TOKEN
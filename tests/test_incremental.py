@@ -0,0 +1,166 @@
+import pytest
+
+import ox
+from ox import UnexpectedToken
+from ox.incremental import IncrementalParser
+
+lexer = ox.lexer(
+    INT={r"\d+": int},
+    NAME=r"[a-z]+",
+    OP=r"[-+*\/]",
+    EQ=r"=",
+    SEMI=r";",
+    WS=r"\s+",
+    ignore="WS",
+)
+parser_rules = dict(
+    stmts={"stmts stmt": lambda xs, x: (*xs, x), "stmt": lambda x: (x,)},
+    stmt={"NAME EQ expr SEMI": lambda n, _, e, __: (n.value, e)},
+    expr={"expr OP atom": lambda x, op, y: (op.value, x, y), "atom": None},
+    atom={"INT": lambda x: x.value, "NAME": lambda x: x.value},
+)
+parser = ox.parser(lexer, **parser_rules)
+src = "x = 1 + 2;\ny = x * 3;\nz = y - x;\n"
+
+
+class TestIncrementalParser:
+    @pytest.mark.parametrize(
+        "edit",
+        [
+            (4, 1, "42"),  # change number
+            (4, 1, "foo"),  # change token type
+            (5, 0, "0"),  # extend token
+            (3, 2, ""),  # join tokens ("x =+ 2")
+            (11, 0, "w = 0;\n"),  # insert statement
+            (0, 11, ""),  # delete first statement
+            (len(src), 0, "a = 1;"),  # append
+            (len(src) - 1, 1, " "),  # edit trailing whitespace
+        ],
+    )
+    def test_edit_matches_full_parse(self, edit):
+        offset, deleted, inserted = edit
+        new_src = src[:offset] + inserted + src[offset + deleted :]
+        try:
+            expected = parser(new_src)
+        except UnexpectedToken:
+            expected = UnexpectedToken
+
+        inc = IncrementalParser(parser, src)
+        if expected is UnexpectedToken:
+            with pytest.raises(UnexpectedToken):
+                inc.edit(*edit)
+            assert inc.source == src
+        else:
+            assert inc.edit(*edit) == expected
+            assert inc.source == new_src
+            assert info(inc.tokens) == info(parser.lex(new_src))
+
+    def test_sequence_of_edits(self):
+        inc = IncrementalParser(parser, src)
+        text = src
+        for offset, deleted, inserted in [(0, 1, "abc"), (30, 0, "+ 1"), (12, 1, "")]:
+            text = text[:offset] + inserted + text[offset + deleted :]
+            assert inc.edit(offset, deleted, inserted) == parser(text)
+
+    def test_prefix_values_are_reused(self):
+        inc = IncrementalParser(parser, src)
+        first = inc.result[0]
+        result = inc.edit(len(src), 0, "w = 0;")
+        assert result[0] is first
+
+    def test_suffix_is_not_parsed_again(self):
+        calls = []
+
+        def binop(x, op, y):
+            calls.append(op)
+            return op.value, x, y
+
+        counting = ox.parser(
+            lexer,
+            stmts=parser_rules["stmts"],
+            stmt=parser_rules["stmt"],
+            expr={"expr OP atom": binop, "atom": None},
+            atom=parser_rules["atom"],
+        )
+        text = src * 100
+        expected = counting(text[:4] + "42" + text[5:])
+        inc = IncrementalParser(counting, text)
+        del calls[:]
+        assert inc.edit(4, 1, "42") == expected
+        assert len(calls) == 1
+
+        del calls[:]
+        inc.edit(4, 2, "1")
+        assert len(calls) == 1
+        assert inc.result == counting(text)
+        assert info(inc.tokens) == info(counting.lex(text))
+
+    def test_many_edits_match_full_parse(self):
+        text = src * 5
+        inc = IncrementalParser(parser, text)
+        edits = [
+            (4, 1, "42"),
+            (20, 0, "q = 7;\n"),
+            (0, 11, ""),
+            (15, 3, "x - 1"),
+            (40, 0, "+ 2 * y"),
+            (5, 4, ""),
+            (30, 0, "\n\n"),
+        ]
+        for offset, deleted, inserted in edits:
+            text = text[:offset] + inserted + text[offset + deleted :]
+            try:
+                expected = parser(text)
+            except UnexpectedToken:
+                text = inc.source
+                with pytest.raises(UnexpectedToken):
+                    inc.edit(offset, deleted, inserted)
+            else:
+                assert inc.edit(offset, deleted, inserted) == expected
+                assert info(inc.tokens) == info(parser.lex(text))
+
+    def test_failed_edit_keeps_previous_state(self):
+        inc = IncrementalParser(parser, src)
+        with pytest.raises(UnexpectedToken):
+            inc.edit(3, 2, "")
+        assert inc.edit(4, 1, "5") == parser(src.replace("1", "5", 1))
+        with pytest.raises(UnexpectedToken):
+            inc.parse("x = ;")
+        assert inc.edit(4, 1, "1") == parser(src)
+
+    def test_uses_contextual_lexer(self):
+        # KEY and VALUE match the same text: only the contextual lexer can
+        # tell them apart.
+        ctx = ox.lexer(
+            KEY=r"[a-z]+", VALUE=r"[a-z0-9]+", EQ="=", WS=r"\s+", ignore="WS"
+        )
+        pairs = ox.parser(
+            ctx,
+            items={"items item": lambda xs, x: (*xs, x), "item": lambda x: (x,)},
+            item={"KEY EQ VALUE": lambda k, _, v: (k.value, v.value)},
+        )
+        text = "a = b\nc = d\n"
+        inc = IncrementalParser(pairs, text)
+        assert inc.result == (("a", "b"), ("c", "d"))
+        assert inc.edit(4, 1, "xy") == (("a", "xy"), ("c", "d"))
+        assert [tk.type for tk in inc.tokens] == ["KEY", "EQ", "VALUE"] * 2
+
+    def test_edit_out_of_range(self):
+        inc = IncrementalParser(parser, src)
+        with pytest.raises(ValueError):
+            inc.edit(len(src), 1, "")
+
+
+def info(tokens):
+    return [
+        (
+            tk.type,
+            tk.value,
+            tk.pos_in_stream,
+            tk.line,
+            tk.column,
+            tk.end_line,
+            tk.end_column,
+        )
+        for tk in list(tokens)
+    ]
@@ -1,11 +1,33 @@
+import asyncio
+import copy
+import io
+import mmap
+import pickle
+
 import pytest
 
 from ox import lexer, UnexpectedCharacters
+from ox.lexer import Edit, OffsetToken
 
 values = lambda xs: list(map(lambda x: x.value, xs))
 lexemes = lambda xs: list(map(lambda x: str(x), xs))
 
 
+def positions(tokens):
+    return [
+        (
+            tk.type,
+            tk.value,
+            tk.pos_in_stream,
+            tk.line,
+            tk.column,
+            tk.end_line,
+            tk.end_column,
+        )
+        for tk in list(tokens)
+    ]
+
+
 @pytest.fixture(scope="session")
 def calc():
     return lexer(
@@ -29,3 +51,301 @@ class TestLexer:
         with pytest.raises(UnexpectedCharacters):
             for tk in calc("20 ^ 2"):
                 print(tk)
+
+
+class TestRegexLexer:
+    src = "(20 + 1) * 2\n  + 3.14 *\n(42\n)"
+
+    @pytest.fixture(scope="class")
+    def fast_calc(self):
+        return lexer(
+            INT={r"\d+": int},
+            FLOAT={r"\d+\.\d+": float},
+            SUM=r"[+-]",
+            MUL=r"[*\/]",
+            CTRL=r"[()]",
+            WS=r"\s+",
+            ignore="WS",
+            engine="re",
+        )
+
+    def test_produces_same_tokens_as_lark(self, calc, fast_calc):
+        assert positions(fast_calc(self.src)) == positions(calc(self.src))
+        assert values(fast_calc(self.src)) == values(calc(self.src))
+
+    def test_respects_priorities(self):
+        rules = lambda: dict(NAME=r"\w+", INT_2_=r"\d+", WS=r"\s+", ignore="WS")
+        src = "12ab x 3"
+        slow, fast = lexer(**rules()), lexer(engine="re", **rules())
+        assert positions(fast(src)) == positions(slow(src))
+        assert [tk.type for tk in fast(src)] == ["INT", "NAME", "NAME", "INT"]
+
+    def test_streams_and_token_streams(self, calc, fast_calc):
+        chunks = iter([self.src[:5], self.src[5:]])
+        assert positions(fast_calc(chunks)) == positions(calc(self.src))
+        assert list(fast_calc.token_stream(self.src)) == list(calc(self.src))
+
+    def test_error(self, fast_calc):
+        with pytest.raises(UnexpectedCharacters) as exc:
+            list(fast_calc("20 ^ 2"))
+        assert (exc.value.line, exc.value.column) == (1, 4)
+
+    def test_invalid_engine(self):
+        with pytest.raises(ValueError):
+            lexer(INT=r"\d+", engine="pcre")
+        with pytest.raises(ValueError):
+            lexer("INT : /\\d+/", engine="re")
+        with pytest.raises(ValueError):
+            lexer(EMPTY=r"a*", engine="re")
+
+
+class TestKeywords:
+    src = "if iffy then\n  x else if"
+    types = ["IF", "NAME", "THEN", "NAME", "ELSE", "IF"]
+
+    @staticmethod
+    def rules():
+        return dict(
+            NAME=r"[a-z]+",
+            IF=r"if",
+            THEN=r"then",
+            ELSE=r"else",
+            ARROW=r"->",
+            WS=r"\s+",
+            ignore="WS",
+        )
+
+    @pytest.mark.parametrize("engine", ["lark", "re"])
+    def test_keywords_are_looked_up_in_table(self, engine):
+        lex = lexer(engine=engine, **self.rules())
+        assert lex.keywords == {"NAME": {"if": "IF", "then": "THEN", "else": "ELSE"}}
+        assert "IF :" not in lex.grammar and "%declare IF THEN ELSE" in lex.grammar
+        assert [tk.type for tk in lex(self.src)] == self.types
+
+    def test_engines_and_scanners_agree(self):
+        slow, fast = lexer(**self.rules()), lexer(engine="re", **self.rules())
+        assert positions(fast(self.src)) == positions(slow(self.src))
+        assert positions(fast(iter([self.src]))) == positions(slow(self.src))
+        assert [tk.type for tk in fast.token_stream(self.src)] == self.types
+
+    def test_all_scanning_loops_agree(self):
+        slow, fast = lexer(**self.rules()), lexer(engine="re", **self.rules())
+        expected = positions(slow(self.src))
+        assert positions(slow.lex_offsets(self.src)) == expected
+        assert positions(fast.lex_offsets(self.src)) == expected
+        assert positions(slow.lex_bytes(self.src.encode("utf8"))) == expected
+        assert positions(slow.token_stream(self.src)) == expected
+
+        src = self.src + "\n  x -> 1"
+        errors = []
+        for tokens in [slow(src), fast(src), slow(iter([src])), fast.lex_offsets(src)]:
+            with pytest.raises(UnexpectedCharacters) as exc:
+                list(tokens)
+            err = exc.value
+            errors.append((err.pos_in_stream, err.line, err.column))
+        assert errors == [(len(src) - 1, 3, 8)] * 4
+
+    @pytest.mark.parametrize("engine", ["lark", "re"])
+    def test_keywords_with_higher_priority_are_kept(self, engine):
+        rules = dict(NAME=r"[a-z]+", IF_2_="if", ELSE="else", WS=r"\s+", ignore="WS")
+        lex = lexer(engine=engine, **rules)
+        assert lex.keywords == {"NAME": {"else": "ELSE"}}
+        assert "IF.2 :" in lex.grammar
+        assert values(lex("iffy elsewhere else")) == ["if", "fy", "elsewhere", "else"]
+        assert [tk.type for tk in lex("iffy")] == ["IF", "NAME"]
+
+    def test_keywords_with_functions_are_kept(self):
+        lex = lexer(NAME=r"[a-z]+", IF_2_={"if": str.upper}, WS=r"\s+", ignore="WS")
+        assert lex.keywords == {}
+        assert values(lex("if x")) == ["IF", "x"]
+
+
+class TestStreamingLexer:
+    src = "(20 + 1) * 2\n  + 3.14 *\n(42\n)"
+
+    @pytest.mark.parametrize("size", [1, 2, 3, 7, 1000])
+    def test_chunks_produce_same_tokens_as_string(self, calc, size):
+        chunks = (self.src[i : i + size] for i in range(0, len(self.src), size))
+        expected = positions(calc(self.src))
+        assert positions(calc(chunks)) == expected
+
+    def test_lex_file_objects(self, calc):
+        expected = positions(calc(self.src))
+        tokens = calc.lex_stream(io.StringIO(self.src), chunk_size=4)
+        assert positions(tokens) == expected
+
+        # Multi-byte whitespace characters are split between chunks
+        src = self.src.replace(" ", "\u2003")
+        tokens = calc.lex_stream(io.BytesIO(src.encode("utf8")), chunk_size=2)
+        assert positions(tokens) == positions(calc(src))
+
+    def test_buffer_is_bounded_by_token_size(self, calc):
+        scanner = calc.scanner(lookahead=4)
+        for _ in range(1000):
+            scanner.feed("1 + 2 ")
+            assert len(scanner.buffer) < 20
+
+    def test_error_reports_position_in_stream(self, calc):
+        with pytest.raises(UnexpectedCharacters) as exc:
+            list(calc(iter(["1 + 2\n", "3 ^ 4"])))
+        err = exc.value
+        assert (err.pos_in_stream, err.line, err.column) == (8, 2, 3)
+
+    def test_error_is_raised_before_end_of_stream(self, calc):
+        scanner = calc.scanner()
+        scanner.feed("1 + 2\n")
+        with pytest.raises(UnexpectedCharacters) as exc:
+            scanner.feed("3 ^ " + "4" * 100)
+        assert exc.value.pos_in_stream == 8
+
+    def test_unfinished_tokens_are_buffered(self):
+        lex = lexer(STRING=r'"[^"]*"', WS=r"\s+", ignore="WS")
+        scanner = lex.scanner(lookahead=4)
+        assert scanner.feed('"' + "x" * 500) == []
+        (tk,) = scanner.feed('" ') + scanner.close()
+        assert tk == '"' + "x" * 500 + '"'
+
+
+class TestAsyncLexer:
+    src = "(20 + 1) * 2\n  + 3.14 *\n(42\n)"
+
+    def test_lex_stream_reader(self, calc):
+        async def lex():
+            reader = asyncio.StreamReader()
+            reader.feed_data(self.src.encode())
+            reader.feed_eof()
+            return [tk async for tk in calc.aiter(reader, chunk_size=4)]
+
+        tokens = asyncio.get_event_loop().run_until_complete(lex())
+        assert positions(tokens) == positions(calc(self.src))
+
+    def test_lex_async_iterable(self, calc):
+        async def chunks():
+            for i in range(0, len(self.src), 3):
+                yield self.src[i : i + 3]
+
+        async def lex():
+            return [tk async for tk in calc.aiter(chunks())]
+
+        tokens = asyncio.get_event_loop().run_until_complete(lex())
+        assert positions(tokens) == positions(calc(self.src))
+
+
+class TestBytesLexer:
+    src = "(20 + 1) * 2\n  + 3.14 *\n(42\n)"
+
+    def test_bytes_produce_same_tokens_as_string(self, calc):
+        expected = [(tk.type, tk.value, tk.line, tk.column) for tk in calc(self.src)]
+        for data in [self.src.encode(), memoryview(self.src.encode())]:
+            tokens = [tk.to_token() for tk in calc(data)]
+            assert [
+                (tk.type, tk.value, tk.line, tk.column) for tk in tokens
+            ] == expected
+            assert tokens == list(calc(self.src))
+
+    def test_lex_mmap(self, calc, tmp_path):
+        path = tmp_path / "src.txt"
+        path.write_text(self.src)
+        with open(path, "rb") as fd, mmap.mmap(
+            fd.fileno(), 0, access=mmap.ACCESS_READ
+        ) as data:
+            assert values(calc(data)) == values(calc(self.src))
+
+    def test_values_are_decoded_lazily(self):
+        lex = lexer(NAME=r"\w+", WS=r"\s+", ignore="WS")
+        tk, _ = lex(b"foo bar")
+        assert not isinstance(tk._value, str)
+        assert tk.value == "foo"
+        assert (tk.start, tk.end) == (0, 3)
+
+    def test_error_on_bad_binary_source(self, calc):
+        with pytest.raises(UnexpectedCharacters) as exc:
+            list(calc("1 + 2\n3 ^ 4".encode()))
+        assert (exc.value.pos_in_stream, exc.value.line, exc.value.column) == (8, 2, 3)
+
+
+class TestOffsetLexer:
+    src = "(20 + 1) * 2\n  + 3.14 *\n(42\n)"
+
+    @pytest.fixture(scope="class", params=["lark", "re"])
+    def lex(self, request):
+        return lexer(
+            INT={r"\d+": int},
+            FLOAT={r"\d+\.\d+": float},
+            SUM=r"[+-]",
+            MUL=r"[*\/]",
+            CTRL=r"[()]",
+            WS=r"\s+",
+            ignore="WS",
+            engine=request.param,
+        )
+
+    def test_positions_match_eager_tokens(self, lex, calc):
+        tokens = list(lex.lex_offsets(self.src))
+        assert positions(tokens) == positions(calc(self.src))
+        assert positions(tk.to_token() for tk in tokens) == positions(tokens)
+
+    def test_tokens_share_line_index(self, lex):
+        first, *rest = lex.lex_offsets(self.src)
+        assert all(tk.lines is first.lines for tk in rest)
+        assert len(first.lines) == 4
+
+    def test_tokens_can_be_copied_and_pickled(self, lex):
+        tokens = list(lex.lex_offsets(self.src))
+        for copies in [
+            [copy.copy(tk) for tk in tokens],
+            [copy.deepcopy(tk) for tk in tokens],
+            pickle.loads(pickle.dumps(tokens)),
+        ]:
+            assert all(isinstance(tk, OffsetToken) for tk in copies)
+            assert [tk.value for tk in copies] == [tk.value for tk in tokens]
+            assert positions(copies) == positions(tokens)
+
+    def test_new_borrow_pos(self, lex):
+        tk = list(lex.lex_offsets(self.src))[-2]
+        new = tk.new_borrow_pos("NAME", "x", tk)
+        assert (new.type, new.value) == ("NAME", "x")
+        assert positions([new])[0][2:] == positions([tk])[0][2:]
+        assert new.lines is tk.lines
+
+    def test_error_reports_line_and_column(self, lex):
+        with pytest.raises(UnexpectedCharacters) as exc:
+            list(lex.lex_offsets("1 + 2\n3 ^ 4"))
+        assert (exc.value.line, exc.value.column) == (2, 3)
+
+
+class TestRelex:
+    src = "".join(f"x{i} = {i} * (y + {i});\n" for i in range(500))
+
+    @pytest.fixture(scope="class")
+    def lex(self):
+        return lexer(
+            NAME=r"[a-z]\w*",
+            INT={r"\d+": int},
+            OP=r"[-+*\/=();]",
+            WS=r"\s+",
+            ignore="WS",
+        )
+
+    @pytest.mark.parametrize(
+        "edit",
+        [(0, 0, "a"), (4000, 2, ""), (4000, 0, "foo\n\n+"), (len(src) - 1, 1, "")],
+    )
+    def test_relex_matches_full_lexing(self, lex, edit):
+        offset, deleted, inserted = edit
+        new_src = self.src[:offset] + inserted + self.src[offset + deleted :]
+        tokens, start, old_stop, new_stop = lex.relex(lex(self.src), edit, new_src)
+        assert positions(tokens) == positions(lex(new_src))
+        assert new_stop - start < 10
+        assert old_stop - start < 10
+
+    def test_relex_sequence_of_edits(self, lex):
+        tokens, src = list(lex(self.src)), self.src
+        for edit in [Edit(10, 3, "abc def"), Edit(100, 0, "(1"), Edit(5000, 10, "")]:
+            src = edit.apply(src)
+            tokens = lex.relex(tokens, edit, src).tokens
+        assert tokens == list(lex(src))
+
+    def test_relex_invalid_edit(self, lex):
+        with pytest.raises(ValueError):
+            lex.relex(lex("x = 1"), (4, 0, "long insertion"), "x = 1")
@@ -0,0 +1,119 @@
+import pickle
+
+import pytest
+
+import ox
+from ox import UnexpectedToken
+from ox.parser import LarkParser, ParserRegistry, fingerprint
+from ox.cache import CACHE_SUFFIX
+
+lexer = ox.lexer(INT={r"\d+": int}, OP=r"[-+]", WS=r"\s+", ignore="WS")
+binop = lambda x, op, y: (op.value, x, y)
+value = lambda x: x.value
+
+
+def evaluate(x, op, y):
+    return x + y if op == "+" else x - y
+
+
+def get_value(x):
+    return x.value
+
+
+def rules(start="expr"):
+    return {
+        start: {f"{start} OP atom": binop, "atom": None},
+        "atom": {"INT": value},
+    }
+
+
+class TestParserRegistry:
+    def test_parse_accepts_rule_dicts(self):
+        assert ox.parse("1 + 2", lexer, rules()) == ("+", 1, 2)
+        assert ox.parse("1 + 2", lexer, **rules()) == ("+", 1, 2)
+
+    def test_registry_reuses_parsers(self):
+        registry = ParserRegistry(maxsize=2)
+        parser = registry.get(lexer, rules())
+        assert registry.get(lexer, rules()) is parser
+        assert registry.cache_info() == (1, 1, 2, 1)
+
+        # Equivalent lexers share the same parser
+        other = ox.lexer(INT={r"\d+": int}, OP=r"[-+]", WS=r"\s+", ignore="WS")
+        assert registry.get(other, rules()) is parser
+        assert registry.cache_info().hits == 2
+
+    def test_registry_evicts_least_recently_used(self):
+        registry = ParserRegistry(maxsize=2)
+        a = registry.get(lexer, rules("a"))
+        b = registry.get(lexer, rules("b"))
+        assert registry.get(lexer, rules("a")) is a
+        registry.get(lexer, rules("c"))
+        assert len(registry) == 2
+        assert registry.get(lexer, rules("a")) is a
+        assert registry.get(lexer, rules("b")) is not b
+
+        registry.cache_clear()
+        assert registry.cache_info() == (0, 0, 2, 0)
+
+    def test_registry_persists_tables(self, tmp_path):
+        registry = ParserRegistry(cache=tmp_path)
+        assert registry.get(lexer, rules())("1 + 2 - 3") == ("-", ("+", 1, 2), 3)
+        assert list(tmp_path.glob("*" + CACHE_SUFFIX))
+
+    def test_fingerprint(self):
+        assert fingerprint(rules()) == fingerprint(rules())
+        assert fingerprint(rules()) != fingerprint(rules("a"))
+        assert fingerprint(["a"]) != fingerprint(("a",))
+        with pytest.raises(TypeError):
+            fingerprint({"a": {1, 2}})
+
+
+class TestParser:
+    @pytest.mark.parametrize("engine", ["lark", "re"])
+    def test_parser_with_keywords(self, engine):
+        lex = ox.lexer(
+            NAME=r"[a-z]+",
+            LET=r"let",
+            EQ="=",
+            INT=r"\d+",
+            WS=r"\s+",
+            ignore="WS",
+            engine=engine,
+        )
+        let = lambda _, name, eq, expr: (name.value, expr.value)
+        parser = ox.parser(lex, {"stmt": {"LET NAME EQ INT": let}})
+        assert parser("let lettuce = 42") == ("lettuce", "42")
+
+    def test_bytes_are_parsed_with_the_same_lexer_as_strings(self):
+        grammar = 'start: HEX "-" NAME\nHEX: /[0-9a-f]+/\nNAME: /[a-z]+/\n'
+        contextual = LarkParser(grammar, parser="lalr")
+        assert contextual.parse(b"ab-cd") == contextual.parse("ab-cd")
+        assert contextual.parse(memoryview(b"ab-cd")) == contextual.parse("ab-cd")
+
+        standard = LarkParser(grammar, parser="lalr", lexer="standard")
+        assert standard.parse(b"ab-xy") == standard.parse("ab-xy")
+        for src in ["ab-cd", b"ab-cd"]:
+            with pytest.raises(UnexpectedToken):
+                standard.parse(src)
+
+
+class TestParserPickle:
+    def parser(self):
+        expr = {"expr OP atom": evaluate, "atom": None}
+        return ox.parser(lexer, expr=expr, atom={"INT": get_value})
+
+    def test_parsers_are_pickled_as_tables_and_functions(self):
+        parser = self.parser()
+        new = pickle.loads(pickle.dumps(parser))
+        assert new("1 + 2 - 4") == -1
+        assert new.rule_functions == parser.rule_functions
+        assert new.token_functions == parser.token_functions
+
+        with pytest.raises((pickle.PicklingError, AttributeError)):
+            pickle.dumps(ox.parser(lexer, rules()))
+
+    def test_parse_many_with_spawned_workers(self):
+        parser = self.parser()
+        result = parser.parse_many(["1 + 2", "3 - 1"], workers=1, mp_context="spawn")
+        assert list(result) == [3, 2]
@@ -1,3 +1,6 @@
+import io
+import sys
+
 import pytest
 from hypothesis import given
 
@@ -116,6 +119,46 @@ class TestExprAstNodeConstruction:
         )
         assert Lambda.from_args(Name("x"), x=Atom(1)).source() == "lambda x=1: x"
 
+    def test_emit_matches_tokens(self):
+        exprs = [
+            Atom(...),
+            GetAttr(BinOp("+", Name("x"), Atom(1)), "real"),
+            BinOp("*", BinOp("-", Name("x"), Atom(1)), Tuple([Name("y"), Atom(2)])),
+            Call.from_args(GetAttr(Atom(42), "y"), Name("x"), y=Atom(42)),
+        ]
+        for expr in exprs:
+            tokens = "".join(expr.tokens(expr.print_context()))
+            buf = io.StringIO()
+            expr.emit(buf)
+            assert buf.getvalue() == expr.source() == tokens
+
+    def test_tokens_override_in_subclass(self):
+        class Dollar(Name):
+            def tokens(self, ctx):
+                yield "$" + self.value
+
+        assert Dollar("x").source() == "$x"
+        assert BinOp("+", Dollar("x"), Atom(1)).source() == "$x + 1"
+        assert GetAttr(Dollar("x"), "y").source() == "$x.y"
+
+    def test_write_source_in_chunks(self):
+        expr = Name("x0")
+        for i in range(1, 1000):
+            expr = BinOp("+", expr, Name(f"x{i}"))
+        src = expr.source()
+
+        chunks = []
+        file = io.StringIO()
+        file.write = chunks.append
+        assert expr.write_source(file, buffer_size=100) == len(src)
+        assert "".join(chunks) == src
+        assert len(chunks) > 10
+        assert all(100 <= len(chunk) < 120 for chunk in chunks[:-1])
+
+        file = io.BytesIO()
+        GetAttr(Name("é"), "y").write_source(file)
+        assert file.getvalue() == "é.y".encode("utf8")
+
     def test_binary_operators(self):
         expr = BinOp("+", Name("x"), Name("y"))
         assert expr.tag == expr.op == expr.operators.ADD
@@ -156,6 +199,14 @@ class TestStmtNodesConstruction:
         fn = Function(Name("fn"), Tree("args", [Name("x")]), Block([Return(Name("x"))]))
         assert fn.source() == "def fn(x):\n    return x\n"
 
+    def test_tokens_are_strings(self):
+        fn = Function(Name("fn"), Tree("args", [Name("x")]), Block([Return(Name("x"))]))
+        tokens = list(fn.tokens(fn.print_context()))
+        assert all(isinstance(tk, str) for tk in tokens)
+        assert "".join(tokens) == fn.source()
+        block = "".join(fn.body.tokens_as_block(fn.print_context()))
+        assert block == ":\n    return x\n"
+
 
 class TestSExprConstructors:
     def test_create_function(self):
@@ -204,6 +255,22 @@ class TestWrapperObject:
         assert src(fn(x)) == "fn(x)"
         assert src((x + y).method()) == "(x + y).method()"
 
+    def test_wrapped_trees_are_copied_on_reuse(self):
+        x = py.x + py.y
+        ref = unwrap(x)
+        assert unwrap(x) is not ref and unwrap(x) == ref
+        assert unwrap(x * x).source() == "(x + y) * (x + y)"
+
+    def test_unwrapped_trees_can_be_modified(self):
+        e = py.x + 1
+        n = unwrap(e)
+        n.rhs = Atom(2)
+        assert repr(e) == "py['x + 1']"
+        assert repr(e * 2) == "py['(x + 1) * 2']"
+        n = unwrap(e)
+        n.lhs = Name("y")
+        assert repr(e) == "py['x + 1']"
+
     def test_function_creation(self):
         fn = unwrap(py("def", py.func, [py.x], [py("return", (2 * py.x) + 1)]))
         assert fn.source() == "def func(x):\n    return 2 * x + 1\n"
@@ -217,6 +284,25 @@ class TestUtilities:
         assert unwrap(py.x).free_vars() == {"x"}
         assert unwrap(py.x + py.y + 2).free_vars() == {"x", "y"}
 
+    def test_deep_trees_do_not_hit_recursion_limit(self):
+        n = sys.getrecursionlimit() * 2
+        expr = Name("x0")
+        for i in range(1, n):
+            expr = BinOp("+", expr, Name(f"x{i}"))
+
+        src = expr.source()
+        assert src.startswith("x0 + x1 + x2")
+        assert src.endswith(f" + x{n - 1}")
+        assert len(expr.free_vars()) == n
+        assert len(expr.copy().simplify().free_vars()) == n
+
+    def test_copy_links_children_to_new_parent(self):
+        expr = Tuple([Name("x"), BinOp("+", Name("y"), Atom(1))])
+        cp = expr.copy()
+        assert cp.source() == "(x, y + 1)"
+        assert all(child.parent is cp for child in cp.children)
+        assert cp.children[1].lhs.parent is cp.children[1]
+
 
 @pytest.mark.hypothesis
 class _TestHypothesis:
@@ -0,0 +1,119 @@
+import pytest
+
+from lark import Lark
+
+import ox
+from ox import UnexpectedCharacters
+from ox.lexer import Lexer
+from ox.parser import parse_tokens
+from ox.tokens import TokenList
+
+src = "(20 + 1) * 2\n  + 3.14 *\n(42\n)"
+
+
+def info(tokens):
+    return [
+        (
+            tk.type,
+            tk.value,
+            tk.pos_in_stream,
+            tk.line,
+            tk.column,
+            tk.end_line,
+            tk.end_column,
+        )
+        for tk in list(tokens)
+    ]
+
+
+@pytest.fixture(scope="module")
+def calc():
+    return ox.lexer(
+        INT={r"\d+": int},
+        FLOAT={r"\d+\.\d+": float},
+        SUM=r"[+-]",
+        MUL=r"[*\/]",
+        CTRL=r"[()]",
+        WS=r"\s+",
+        ignore="WS",
+    )
+
+
+class TestTokenStream:
+    def test_stream_produces_same_tokens_as_lexer(self, calc):
+        stream = calc.token_stream(src)
+        assert len(stream) == 13
+        assert info(stream) == info(calc(src))
+        assert [tk.value for tk in stream[-3:]] == ["(", 42, ")"]
+        assert stream.type(0) == "CTRL"
+
+    def test_only_converted_values_are_stored(self, calc):
+        stream = calc.token_stream(src)
+        assert sorted(stream.values) == [1, 3, 6, 8, 11]
+        assert stream.nbytes() == 26 * len(stream)
+
+    def test_index_errors(self, calc):
+        stream = calc.token_stream("1 + 2")
+        assert stream[-1].value == 2
+        with pytest.raises(IndexError):
+            stream[3]
+
+    def test_keywords_change_token_types(self):
+        grammar = 'start: (IF | NAME)*\nIF: "if"\nNAME: /[a-z]+/\n%ignore " "'
+        lexer = Lexer(Lark(grammar, parser="lalr"), grammar)
+        stream = lexer.token_stream("if x")
+        assert [stream.type(i) for i in range(len(stream))] == ["IF", "NAME"]
+
+    def test_error_on_bad_source(self, calc):
+        with pytest.raises(UnexpectedCharacters) as exc:
+            calc.token_stream("1 + 2\n3 ^ 4")
+        assert (exc.value.line, exc.value.column) == (2, 3)
+
+    def test_parse_token_stream(self):
+        parser = ox.parser(
+            ox.lexer(INT={r"\d+": int}, OP=r"[-+]", WS=r"\s+", ignore="WS"),
+            expr={"expr OP atom": lambda x, op, y: (op.value, x, y), "atom": None},
+            atom={"INT": lambda x: x.value},
+        )
+        stream = parser._lexer.token_stream("1 + 2 - 3")
+        assert parse_tokens(parser.grammar, stream) == ("-", ("+", 1, 2), 3)
+
+
+class TestTokenList:
+    def test_behaves_like_a_list(self, calc):
+        tokens = list(calc(src))
+        lst = TokenList(tokens)
+        assert len(lst) == 13
+        assert lst == tokens
+        assert lst[-1] is tokens[-1]
+        assert lst[2:5] == tokens[2:5]
+        assert isinstance(lst[2:5], TokenList)
+        with pytest.raises(IndexError):
+            lst[13]
+
+    def test_splice(self, calc):
+        tokens = list(calc(src))
+        new = list(calc("1 2"))
+        lst = TokenList(tokens).splice(1, 3, new)
+        assert lst == [tokens[0], *new, *tokens[3:]]
+        assert lst.splice(0, len(lst), []) == []
+
+    def test_shift_moves_tokens_lazily(self, calc):
+        # Insert "7 + " before "3.14" and a line before "(42"
+        tokens = TokenList(calc(src))
+        edited = src.replace("3.14", "7 + 3.14")
+        lst = tokens.shift(8, 4, 2, 9).splice(8, 8, list(calc(edited))[8:10])
+        assert info(lst) == info(calc(edited))
+
+        edited = edited.replace("(42", "\n(42")
+        lst = lst.shift(12, 1, 4, 1)
+        assert info(lst) == info(calc(edited))
+        assert info(lst[12:]) == info(list(calc(edited))[12:])
+
+    def test_segments_are_merged(self, calc):
+        tokens = list(calc(src))
+        lst = TokenList(tokens)
+        for _ in range(TokenList.max_segments):
+            lst = lst.splice(1, 2, tokens[1:2])
+        assert len(lst._segments) <= TokenList.max_segments
+        assert lst == tokens